@@ -1,54 +1,148 @@
-import json
 import os
-import psycopg2
-from typing import Dict, Any
+import sys
+from typing import Dict, Any, List
 
-def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shared import dashboard  # noqa: E402
+from shared import db  # noqa: E402
+from shared import http  # noqa: E402
+from shared import inventory  # noqa: E402
+from shared import media  # noqa: E402
+
+MAX_BULK_ITEMS = 500
+MAX_PRICE = 2 ** 31 - 1
+
+# Fields a bulk_update_products patch may carry, as they map onto the products columns
+PRODUCT_PATCH_SCHEMA = {
+    'id': (str, int),
+    'name?': str,
+    'price?': int,
+    'description?': str,
+    'inStock?': bool,
+    'sizes?': list,
+    'image?': str
+}
+
+DELETE_TABLES = {
+    'order': 't_p54427834_mission_dark_store.orders',
+    'message': 't_p54427834_mission_dark_store.contact_messages'
+}
+
+# Deletes leave a tombstone in the same statement so get-orders view=changes can report them
+DELETE_WITH_TOMBSTONE_SQL = '''
+    WITH deleted AS (DELETE FROM {table} WHERE {condition} RETURNING id)
+    INSERT INTO t_p54427834_mission_dark_store.deleted_records (entity, entity_id)
+    SELECT %s, id::text FROM deleted
+    RETURNING entity_id
+'''
+
+# Missing patch fields arrive as NULL and keep the current value
+BULK_PRODUCT_UPDATE_SQL = '''
+    UPDATE t_p54427834_mission_dark_store.products p
+    SET name = COALESCE(v.name, p.name),
+        price = COALESCE(v.price, p.price),
+        description = COALESCE(v.description, p.description),
+        in_stock = COALESCE(v.in_stock, p.in_stock),
+        sizes = COALESCE(v.sizes, p.sizes),
+        image = COALESCE(v.image, p.image),
+        updated_at = CURRENT_TIMESTAMP
+    FROM (VALUES %s) AS v(id, name, price, description, in_stock, sizes, image)
+    WHERE p.id = v.id
+    RETURNING p.id
+'''
+
+
+def bulk_results(requested_ids: List[Any], affected_ids: List[Any]) -> List[Dict[str, Any]]:
+    affected = set(affected_ids)
+    return [
+        {'id': item_id, 'success': True} if item_id in affected
+        else {'id': item_id, 'success': False, 'error': 'Not found'}
+        for item_id in requested_ids
+    ]
+
+
+def delete_items(cursor, item_type: str, ids: List[Any]) -> List[int]:
+    # Orders also come out of the dashboard summaries in the same statement
+    if item_type == 'order':
+        return dashboard.delete_orders(cursor, ids)
+    cursor.execute(
+        DELETE_WITH_TOMBSTONE_SQL.format(table=DELETE_TABLES[item_type], condition='id = ANY(%s::int[])'),
+        (ids, item_type)
+    )
+    return [int(row[0]) for row in cursor.fetchall()]
+
+
+def bulk_delete(item_type: str, ids: List[int]) -> List[Dict[str, Any]]:
+    with db.transaction() as cursor:
+        affected_ids = delete_items(cursor, item_type, ids)
+    return bulk_results(ids, affected_ids)
+
+
+def bulk_update_status(ids: List[int], status: str) -> List[Dict[str, Any]]:
+    with db.transaction() as cursor:
+        affected_ids = dashboard.update_status(cursor, ids, status)
+    return bulk_results(ids, affected_ids)
+
+
+def product_patch_problems(patch: Any) -> Dict[str, str]:
+    problems = http.validate(patch, PRODUCT_PATCH_SCHEMA)
+    if problems:
+        return problems
+    if not str(patch['id']):
+        problems['id'] = 'required'
+    if patch.get('price') is not None and not 0 <= patch['price'] <= MAX_PRICE:
+        problems['price'] = 'out of range'
+    if patch.get('sizes') is not None and not all(isinstance(size, str) for size in patch['sizes']):
+        problems['sizes'] = 'must be a list of strings'
+    return problems
+
+
+def bulk_update_products(patches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    rows = [
+        (
+            str(patch['id']),
+            patch.get('name'),
+            patch.get('price'),
+            patch.get('description'),
+            patch.get('inStock'),
+            patch.get('sizes'),
+            patch.get('image')
+        )
+        for patch in patches
+    ]
+    with db.transaction() as cursor:
+        affected = db.execute_values(
+            cursor,
+            BULK_PRODUCT_UPDATE_SQL,
+            rows,
+            template='(%s, %s::text, %s::integer, %s::text, %s::boolean, %s::text[], %s::text)',
+            page_size=MAX_BULK_ITEMS,
+            fetch=True
+        )
+        image_changed = [row[0] for row in rows if row[6] is not None]
+        if image_changed:
+            media.enqueue_product_images(cursor, image_changed)
+    return bulk_results([row[0] for row in rows], [row[0] for row in affected])
+
+
+def bulk_response(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return http.json_response(200, {
+        'success': True,
+        'affected': sum(1 for result in results if result['success']),
+        'results': results
+    })
+
+
+@http.endpoint('admin-actions', methods=['POST'], schema={'action': str})
+def handler(event: Dict[str, Any], context: Any, body_data: Dict[str, Any]) -> Dict[str, Any]:
     '''
-    Business: Handle admin operations - verify password, update status, delete orders and messages
-    Args: event - dict with httpMethod, body (action: verify/update_status/delete, password, type, id, status)
+    Business: Handle admin operations - verify password, update status, delete orders and messages, single or in bulk
+    Args: event - dict with httpMethod, body (action: verify/update_status/delete/update_product/bulk_delete/bulk_update_status/bulk_update_products, password, type, id, ids, status, products, stock)
           context - object with attributes: request_id, function_name
+          body_data - parsed JSON body with a required action
     Returns: HTTP response dict
     '''
-    method: str = event.get('httpMethod', 'GET')
-    
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': '',
-            'isBase64Encoded': False
-        }
-    
-    if method != 'POST':
-        return {
-            'statusCode': 405,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'error': 'Method not allowed'}),
-            'isBase64Encoded': False
-        }
-    
-    body_data = json.loads(event.get('body', '{}'))
-    action = body_data.get('action')
-    
-    if not action:
-        return {
-            'statusCode': 400,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'error': 'Missing action'}),
-            'isBase64Encoded': False
-        }
+    action = body_data['action']
     
     # Handle verify action
     if action == 'verify':
@@ -56,39 +150,60 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         admin_password = os.environ.get('ADMIN_PASSWORD')
         
         if not admin_password:
-            return {
-                'statusCode': 500,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'Admin password not configured'}),
-                'isBase64Encoded': False
-            }
+            return http.error(500, 'Admin password not configured')
         
         is_valid = password == admin_password
         
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'valid': is_valid,
-                'message': 'Password verified' if is_valid else 'Invalid password'
-            }),
-            'isBase64Encoded': False
-        }
+        return http.json_response(200, {
+            'valid': is_valid,
+            'message': 'Password verified' if is_valid else 'Invalid password'
+        })
+    
+    # Bulk variants run in one transaction and report a result per requested item
+    if action in ('bulk_delete', 'bulk_update_status'):
+        ids = body_data.get('ids')
+        if not isinstance(ids, list) or not ids or len(ids) > MAX_BULK_ITEMS:
+            return http.error(400, f'ids must be a non-empty list of at most {MAX_BULK_ITEMS} items')
+        if not all(isinstance(item_id, int) and not isinstance(item_id, bool) for item_id in ids):
+            return http.error(400, 'ids must be integers')
+        
+        if action == 'bulk_delete':
+            if body_data.get('type') not in DELETE_TABLES:
+                return http.error(400, 'Invalid type')
+            return bulk_response(bulk_delete(body_data['type'], ids))
+        
+        status = body_data.get('status')
+        if not status:
+            return http.error(400, 'Missing status')
+        return bulk_response(bulk_update_status(ids, status))
+    
+    if action == 'bulk_update_products':
+        patches = body_data.get('products')
+        if not isinstance(patches, list) or not patches or len(patches) > MAX_BULK_ITEMS:
+            return http.error(400, f'products must be a non-empty list of at most {MAX_BULK_ITEMS} items')
+        for index, patch in enumerate(patches):
+            problems = product_patch_problems(patch)
+            if problems:
+                return http.error(400, 'Invalid product patch', index=index, fields=problems)
+        product_ids = [str(patch['id']) for patch in patches]
+        if len(set(product_ids)) != len(product_ids):
+            return http.error(400, 'products must not repeat an id')
+        return bulk_response(bulk_update_products(patches))
     
     # Handle delete, update_status and update_product actions
     item_type = body_data.get('type')
     item_id = body_data.get('id')
     
     if action == 'update_product':
-        database_url = os.environ.get('DATABASE_URL')
-        conn = psycopg2.connect(database_url)
-        cursor = conn.cursor()
+        # stock: {size: quantity}, '' for products without sizes; null stops tracking the size
+        stock = body_data.get('stock')
+        if stock is not None and not (
+            isinstance(stock, dict) and all(
+                quantity is None or (isinstance(quantity, int) and not isinstance(quantity, bool) and quantity >= 0)
+                for quantity in stock.values()
+            )
+        ):
+            return http.error(400, 'stock must map sizes to non-negative integers or null')
         
         update_fields = []
         params = []
@@ -126,91 +241,33 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             WHERE id = %s
         '''
         
-        cursor.execute(query, params)
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'success': True, 'message': 'Product updated'}),
-            'isBase64Encoded': False
-        }
+        with db.transaction() as cursor:
+            cursor.execute(query, params)
+            if 'image' in body_data:
+                media.enqueue_product_images(cursor, [item_id])
+            if stock:
+                inventory.set_stock(cursor, item_id, stock)
+        
+        return http.json_response(200, {'success': True, 'message': 'Product updated'})
     
     if not all([item_type, item_id]):
-        return {
-            'statusCode': 400,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'error': 'Missing required fields'}),
-            'isBase64Encoded': False
-        }
-    
-    database_url = os.environ.get('DATABASE_URL')
-    conn = psycopg2.connect(database_url)
-    cursor = conn.cursor()
+        return http.error(400, 'Missing required fields')
     
     if action == 'delete':
-        if item_type == 'order':
-            cursor.execute("DELETE FROM t_p54427834_mission_dark_store.orders WHERE id = %s", (item_id,))
-        elif item_type == 'message':
-            cursor.execute("DELETE FROM t_p54427834_mission_dark_store.contact_messages WHERE id = %s", (item_id,))
-        else:
-            conn.close()
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'Invalid type'}),
-                'isBase64Encoded': False
-            }
+        if item_type not in DELETE_TABLES:
+            return http.error(400, 'Invalid type')
+        with db.transaction() as cursor:
+            delete_items(cursor, item_type, [item_id])
     elif action == 'update_status':
         status = body_data.get('status')
         if not status:
-            conn.close()
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'Missing status'}),
-                'isBase64Encoded': False
-            }
-        cursor.execute("UPDATE t_p54427834_mission_dark_store.orders SET status = %s WHERE id = %s", (status, item_id))
+            return http.error(400, 'Missing status')
+        with db.transaction() as cursor:
+            dashboard.update_status(cursor, [item_id], status)
     else:
-        conn.close()
-        return {
-            'statusCode': 400,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'error': 'Invalid action'}),
-            'isBase64Encoded': False
-        }
-    
-    conn.commit()
-    cursor.close()
-    conn.close()
+        return http.error(400, 'Invalid action')
     
-    return {
-        'statusCode': 200,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*'
-        },
-        'body': json.dumps({
-            'success': True,
-            'message': 'Action completed successfully'
-        }),
-        'isBase64Encoded': False
-    }
\ No newline at end of file
+    return http.json_response(200, {
+        'success': True,
+        'message': 'Action completed successfully'
+    })
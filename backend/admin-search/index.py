@@ -0,0 +1,115 @@
+import os
+import sys
+from typing import Dict, Any, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shared import db  # noqa: E402
+from shared import http  # noqa: E402
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Deep offsets re-rank everything before the page; nobody reads result #1000
+MAX_OFFSET = 1000
+# Shorter terms have no trigrams, so the indexes could not narrow the scan
+MIN_QUERY_LENGTH = 3
+MAX_QUERY_LENGTH = 200
+
+# These must stay identical to the V0012 index expressions or the planner falls back to a scan
+ORDERS_DOCUMENT = "to_tsvector('simple', name || ' ' || coalesce(email, '') || ' ' || coalesce(telegram, '') || ' ' || address)"
+ORDERS_TEXT = "lower(name || ' ' || phone || ' ' || coalesce(email, '') || ' ' || coalesce(telegram, '') || ' ' || address)"
+MESSAGES_DOCUMENT = "(to_tsvector('simple', name || ' ' || email) || to_tsvector('russian', message))"
+MESSAGES_TEXT = "lower(name || ' ' || email || ' ' || message)"
+
+ORDER_JSON = "json_build_object('id', id, 'name', name, 'phone', phone, 'email', email, 'telegram', telegram, 'address', address, 'items', items, 'total', total, 'status', status, 'created_at', created_at, 'rank', round(rank::numeric, 4))"
+MESSAGE_JSON = "json_build_object('id', id, 'name', name, 'email', email, 'message', message, 'created_at', created_at, 'rank', round(rank::numeric, 4))"
+
+SEARCHES = {
+    'orders': {
+        'table': 't_p54427834_mission_dark_store.orders',
+        'columns': 'id, name, phone, email, telegram, address, items, total, status, created_at',
+        'document': ORDERS_DOCUMENT,
+        'text': ORDERS_TEXT,
+        'tsquery': "websearch_to_tsquery('simple', %(q)s)",
+        'json': ORDER_JSON
+    },
+    'messages': {
+        'table': 't_p54427834_mission_dark_store.contact_messages',
+        'columns': 'id, name, email, message, created_at',
+        'document': MESSAGES_DOCUMENT,
+        'text': MESSAGES_TEXT,
+        'tsquery': "websearch_to_tsquery('simple', %(q)s) || websearch_to_tsquery('russian', %(q)s)",
+        'json': MESSAGE_JSON
+    }
+}
+
+
+def escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search(cursor, kind: str, query: str, limit: int, offset: int) -> Dict[str, Any]:
+    '''
+    Rank rows matching the query by full-text words, substring or fuzzy word similarity.
+    Each condition is served by the V0012 GIN indexes and combined with a bitmap OR.
+    '''
+    spec = SEARCHES[kind]
+    cursor.execute(
+        f'''
+        SELECT COALESCE(json_agg({spec['json']} ORDER BY rank DESC, id DESC) FILTER (WHERE rn <= %(limit)s), '[]')::text,
+               COUNT(*) > %(limit)s
+        FROM (
+            SELECT *, row_number() OVER (ORDER BY rank DESC, id DESC) AS rn
+            FROM (
+                SELECT {spec['columns']},
+                       ts_rank({spec['document']}, tsq) + word_similarity(%(term)s, {spec['text']}) AS rank
+                FROM {spec['table']}, (SELECT {spec['tsquery']} AS tsq) query
+                WHERE {spec['document']} @@ tsq
+                   OR {spec['text']} LIKE %(pattern)s
+                   OR %(term)s <%% {spec['text']}
+                ORDER BY rank DESC, id DESC
+                LIMIT %(fetch)s OFFSET %(offset)s
+            ) ranked
+        ) page
+        ''',
+        {
+            'q': query,
+            'term': query.lower(),
+            'pattern': '%' + escape_like(query.lower()) + '%',
+            'limit': limit,
+            'fetch': limit + 1,
+            'offset': offset
+        }
+    )
+    items_json, has_more = cursor.fetchone()
+    next_offset: Optional[int] = offset + limit if has_more and offset + limit <= MAX_OFFSET else None
+    return {'items': http.RawJSON(items_json), 'next_offset': next_offset}
+
+
+@http.endpoint('admin-search', methods=['GET'])
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    '''
+    Business: Ranked search over orders (name, phone, email, telegram, address) and contact messages (name, email, message)
+    Args: event - dict with httpMethod, queryStringParameters (q, type: orders/messages, limit, offset)
+          context - object with attributes: request_id, function_name
+    Returns: HTTP response dict with a ranked, paginated page of matches per searched type
+    '''
+    params = event.get('queryStringParameters') or {}
+    query = ' '.join((params.get('q') or '').split())
+
+    if not MIN_QUERY_LENGTH <= len(query) <= MAX_QUERY_LENGTH:
+        return http.error(400, f'Search query must be {MIN_QUERY_LENGTH} to {MAX_QUERY_LENGTH} characters')
+
+    kinds = [params['type']] if params.get('type') else list(SEARCHES)
+    if any(kind not in SEARCHES for kind in kinds):
+        return http.error(400, 'Unknown search type')
+
+    try:
+        limit = min(max(int(params.get('limit') or DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+        offset = min(max(int(params.get('offset') or 0), 0), MAX_OFFSET)
+    except ValueError:
+        return http.error(400, 'Invalid limit or offset')
+
+    with db.transaction() as cursor:
+        results = {kind: search(cursor, kind, query, limit, offset) for kind in kinds}
+
+    return http.json_response(200, {'query': query, **results})
@@ -0,0 +1,198 @@
+import os
+import re
+import sys
+from datetime import date, datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shared import db  # noqa: E402
+from shared import http  # noqa: E402
+from shared import instrument  # noqa: E402
+
+SCHEMA = 't_p54427834_mission_dark_store'
+# Raw events older than this many whole months are removed; the daily and all-time rollups keep their counts
+RETENTION_MONTHS = int(os.environ.get('ANALYTICS_RETENTION_MONTHS', '13'))
+MONTHS_AHEAD = int(os.environ.get('ANALYTICS_MONTHS_AHEAD', '3'))
+# Fewer future months than this at the start of a run means earlier runs have been failing
+MIN_MONTHS_AHEAD = 2
+# Catches rows outside every monthly partition (created by V0014)
+DEFAULT_PARTITION = 'analytics_default'
+# Any value other than 'drop' (e.g. 'detach') keeps expired partitions as standalone tables for archiving
+RETENTION_ACTION = os.environ.get('ANALYTICS_RETENTION_ACTION', 'drop')
+
+# Serializes concurrent runs of this function
+MAINTENANCE_LOCK_ID = 20014
+
+BOUND_PATTERN = re.compile(r"FROM \((MINVALUE|'[^']+')\) TO \((MAXVALUE|'[^']+')\)")
+
+
+def add_months(day: date, months: int) -> date:
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def parse_bound(value: str) -> Optional[date]:
+    if value in ('MINVALUE', 'MAXVALUE'):
+        return None
+    return datetime.fromisoformat(value.strip("'")).date()
+
+
+def list_partitions(cursor) -> List[Tuple[str, Optional[date], Optional[date]]]:
+    '''
+    Return (name, lower bound, upper bound) for every analytics partition; None means unbounded.
+    '''
+    cursor.execute(
+        f'''
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = '{SCHEMA}.analytics'::regclass
+        ORDER BY c.relname
+        '''
+    )
+    partitions = []
+    for name, bound in cursor.fetchall():
+        match = BOUND_PATTERN.search(bound)
+        if match:
+            partitions.append((name, parse_bound(match.group(1)), parse_bound(match.group(2))))
+    return partitions
+
+
+def is_covered(month_start: date, partitions: List[Tuple[str, Optional[date], Optional[date]]]) -> bool:
+    return any(
+        (lower is None or lower <= month_start) and (upper is None or month_start < upper)
+        for _, lower, upper in partitions
+    )
+
+
+def default_partition_months(cursor) -> List[date]:
+    '''
+    Return the months that have rows in the default partition; normally there are none.
+    '''
+    cursor.execute(
+        f"SELECT DISTINCT date_trunc('month', created_at)::date FROM {SCHEMA}.{DEFAULT_PARTITION} WHERE created_at IS NOT NULL"
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def create_partition(cursor, name: str, month_start: date, stray_rows: bool) -> None:
+    month_end = add_months(month_start, 1)
+    if not stray_rows:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {SCHEMA}.{name} PARTITION OF {SCHEMA}.analytics FOR VALUES FROM (%s) TO (%s)",
+            (month_start, month_end)
+        )
+        return
+    # A new partition cannot be created over rows the default partition holds: move them first
+    cursor.execute(f"CREATE TABLE {SCHEMA}.{name} (LIKE {SCHEMA}.analytics INCLUDING DEFAULTS)")
+    cursor.execute(
+        f'''
+        WITH moved AS (
+            DELETE FROM {SCHEMA}.{DEFAULT_PARTITION} WHERE created_at >= %s AND created_at < %s
+            RETURNING id, event_type, event_data, created_at
+        )
+        INSERT INTO {SCHEMA}.{name} (id, event_type, event_data, created_at) SELECT * FROM moved
+        ''',
+        (month_start, month_end)
+    )
+    instrument.log('analytics_default_partition_split', partition=name, rows=cursor.rowcount)
+    cursor.execute(
+        f"ALTER TABLE {SCHEMA}.analytics ATTACH PARTITION {SCHEMA}.{name} FOR VALUES FROM (%s) TO (%s)",
+        (month_start, month_end)
+    )
+
+
+def ensure_partitions(cursor, first_month: date, partitions: List[Tuple[str, Optional[date], Optional[date]]]) -> List[str]:
+    '''
+    Create monthly partitions from first_month through MONTHS_AHEAD months later, plus one for
+    every month the default partition caught rows for, skipping months already covered.
+    Logs loudly when fewer than MIN_MONTHS_AHEAD future months were left.
+    '''
+    months_ahead = 0
+    while months_ahead < MONTHS_AHEAD and is_covered(add_months(first_month, months_ahead + 1), partitions):
+        months_ahead += 1
+    if months_ahead < MIN_MONTHS_AHEAD:
+        instrument.log('analytics_partitions_running_out', months_ahead=months_ahead)
+
+    stray_months = set(default_partition_months(cursor))
+    months = {add_months(first_month, offset) for offset in range(MONTHS_AHEAD + 1)} | stray_months
+    created = []
+    for month_start in sorted(months):
+        if is_covered(month_start, partitions):
+            continue
+        name = f"analytics_p{month_start.strftime('%Y%m')}"
+        create_partition(cursor, name, month_start, month_start in stray_months)
+        created.append(name)
+    return created
+
+
+def is_rolled_up(cursor, name: str, lower: Optional[date], upper: date) -> bool:
+    '''
+    Check that analytics_daily accounts for every raw event in the partition before it goes away.
+    Only days from the first rollup on are compared: older rows (events whose created_at was
+    backfilled to the epoch by V0013_2) never had rollups and cannot get them now.
+    '''
+    cursor.execute(f"SELECT MIN(day) FROM {SCHEMA}.analytics_daily")
+    covered_from = cursor.fetchone()[0]
+    start = max((day for day in (lower, covered_from) if day is not None), default=None)
+    cursor.execute(
+        f"SELECT COUNT(*) FROM {SCHEMA}.{name} WHERE %s::date IS NULL OR created_at >= %s",
+        (start, start)
+    )
+    raw_count = cursor.fetchone()[0]
+    cursor.execute(
+        f"SELECT COALESCE(SUM(event_count), 0) FROM {SCHEMA}.analytics_daily WHERE day < %s AND (%s::date IS NULL OR day >= %s)",
+        (upper, start, start)
+    )
+    return cursor.fetchone()[0] >= raw_count
+
+
+def expire_partitions(cursor, cutoff: date, partitions: List[Tuple[str, Optional[date], Optional[date]]]) -> Tuple[List[str], List[str]]:
+    '''
+    Drop or detach partitions that end on or before cutoff. A partition whose events are
+    missing from the rollups is kept and reported instead.
+    '''
+    expired, skipped = [], []
+    for name, lower, upper in partitions:
+        if upper is None or upper > cutoff:
+            continue
+        if not is_rolled_up(cursor, name, lower, upper):
+            instrument.log('analytics_partition_not_rolled_up', partition=name)
+            skipped.append(name)
+            continue
+        if RETENTION_ACTION == 'drop':
+            cursor.execute(f"DROP TABLE {SCHEMA}.{name}")
+        else:
+            cursor.execute(f"ALTER TABLE {SCHEMA}.analytics DETACH PARTITION {SCHEMA}.{name}")
+        expired.append(name)
+
+    # Hourly buckets follow the raw retention; daily and all-time rollups are kept
+    cursor.execute(f"DELETE FROM {SCHEMA}.analytics_hourly WHERE bucket < %s", (cutoff,))
+    return expired, skipped
+
+
+@http.endpoint('analytics-maintenance', methods=['GET', 'POST'])
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    '''
+    Business: Keep the monthly analytics partitions ahead of time and expire raw events past the retention window
+    Args: event - dict with httpMethod (timer trigger invocations have none)
+          context - object with attributes: request_id, function_name
+    Returns: HTTP response dict with created, expired and skipped partition names
+    '''
+    with db.transaction() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MAINTENANCE_LOCK_ID,))
+        # created_at defaults to CURRENT_TIMESTAMP in the session time zone, so months are taken on that clock too
+        cursor.execute("SELECT date_trunc('month', LOCALTIMESTAMP)::date")
+        this_month = cursor.fetchone()[0]
+        cutoff = add_months(this_month, -RETENTION_MONTHS)
+        partitions = list_partitions(cursor)
+        created = ensure_partitions(cursor, this_month, partitions)
+        expired, skipped = expire_partitions(cursor, cutoff, partitions)
+
+    return http.json_response(200, {
+        'success': True,
+        'created': created,
+        'expired': expired,
+        'skipped': skipped,
+        'action': RETENTION_ACTION,
+        'retention_cutoff': cutoff.isoformat()
+    })
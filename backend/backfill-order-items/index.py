@@ -0,0 +1,109 @@
+import json
+import os
+import sys
+import time
+from typing import Dict, Any
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shared import dashboard  # noqa: E402
+from shared import db  # noqa: E402
+from shared import http  # noqa: E402
+
+JOB_NAME = 'order_items'
+BATCH_SIZE = int(os.environ.get('BACKFILL_BATCH_SIZE', '500'))
+MAX_RUN_SECONDS = float(os.environ.get('BACKFILL_MAX_RUN_SECONDS', '20'))
+
+# Expands orders.items into order_items for one id window. Malformed lines are skipped
+# and ON CONFLICT makes re-running a window (or racing submit-order) harmless. Only lines
+# actually inserted are added to the dashboard product summary.
+BACKFILL_BATCH_SQL = rf'''
+    WITH inserted AS (
+        INSERT INTO t_p54427834_mission_dark_store.order_items (order_id, line_no, product_id, size, quantity, unit_price)
+        SELECT o.id, line.line_no, line.item->>'id', NULLIF(line.item->>'size', ''),
+               (line.item->>'quantity')::int, round((line.item->>'price')::numeric)::int
+        FROM t_p54427834_mission_dark_store.orders o
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(o.items) = 'array' THEN o.items ELSE '[]'::jsonb END
+        ) WITH ORDINALITY AS line(item, line_no)
+        WHERE o.id > %s AND o.id <= %s
+          AND line.item->>'id' IS NOT NULL
+          AND line.item->>'quantity' ~ '^[0-9]+$'
+          AND line.item->>'price' ~ '^[0-9]+(\.[0-9]+)?$'
+        ON CONFLICT (order_id, line_no) DO NOTHING
+        RETURNING product_id, quantity, unit_price
+    ),
+    product_deltas AS (
+        SELECT product_id, quantity, quantity * unit_price AS revenue, 1 AS sign FROM inserted
+    ),
+    {dashboard.PRODUCT_SUMMARY_CTES}
+    SELECT COUNT(*) FROM inserted
+'''
+
+
+def run_backfill() -> Dict[str, Any]:
+    '''
+    Copy JSONB order lines into order_items in short id-keyset batches.
+    Each batch is its own transaction and only reads orders, so writers are never blocked.
+    Progress is persisted in backfill_progress, so timer-driven runs resume where the last one stopped.
+    '''
+    with db.transaction() as cursor:
+        cursor.execute(
+            "INSERT INTO t_p54427834_mission_dark_store.backfill_progress (name) VALUES (%s) ON CONFLICT (name) DO NOTHING",
+            (JOB_NAME,)
+        )
+        cursor.execute(
+            "SELECT last_id, done FROM t_p54427834_mission_dark_store.backfill_progress WHERE name = %s",
+            (JOB_NAME,)
+        )
+        last_id, done = cursor.fetchone()
+        # Orders created after this point are written with their items by submit-order
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM t_p54427834_mission_dark_store.orders")
+        target_id = cursor.fetchone()[0]
+
+    stats = {'batches': 0, 'inserted': 0, 'last_id': last_id, 'done': done}
+    started = time.monotonic()
+
+    while not stats['done'] and time.monotonic() - started < MAX_RUN_SECONDS:
+        with db.transaction() as cursor:
+            cursor.execute(
+                "SELECT MAX(id) FROM (SELECT id FROM t_p54427834_mission_dark_store.orders WHERE id > %s ORDER BY id LIMIT %s) batch",
+                (stats['last_id'], BATCH_SIZE)
+            )
+            upper_id = cursor.fetchone()[0]
+
+            if upper_id is None or stats['last_id'] >= target_id:
+                stats['done'] = True
+                upper_id = stats['last_id']
+            else:
+                cursor.execute(BACKFILL_BATCH_SQL, (stats['last_id'], upper_id))
+                stats['inserted'] += cursor.fetchone()[0]
+                stats['batches'] += 1
+
+            cursor.execute(
+                "UPDATE t_p54427834_mission_dark_store.backfill_progress SET last_id = %s, done = %s, updated_at = CURRENT_TIMESTAMP WHERE name = %s",
+                (upper_id, stats['done'], JOB_NAME)
+            )
+            stats['last_id'] = upper_id
+
+    return stats
+
+
+@http.endpoint('backfill-order-items', methods=['GET', 'POST'])
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    '''
+    Business: Backfill normalized order_items from orders.items JSONB in resumable batches
+    Args: event - dict with httpMethod (timer trigger invocations have none)
+          context - object with attributes: request_id, function_name
+    Returns: HTTP response dict with batch count, inserted lines and progress
+    '''
+    stats = run_backfill()
+
+    return http.json_response(200, {'success': True, **stats})
+
+
+if __name__ == '__main__':
+    while True:
+        result = run_backfill()
+        print(json.dumps(result))
+        if result['done']:
+            break
@@ -0,0 +1,181 @@
+import os
+import sys
+import time
+import random
+from typing import Dict, Any, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shared import db  # noqa: E402
+from shared import http  # noqa: E402
+from shared import instrument  # noqa: E402
+from shared import telegram as telegram_api  # noqa: E402
+
+BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', '20'))
+MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '8'))
+# Claimed rows become visible again after the lease if the dispatcher dies mid-batch
+LEASE_SECONDS = 120
+BASE_BACKOFF_SECONDS = 5
+MAX_BACKOFF_SECONDS = 3600
+MAX_RUN_SECONDS = float(os.environ.get('OUTBOX_MAX_RUN_SECONDS', '20'))
+# A claimed backlog of at least this many orders goes out as digest messages instead of one per order
+DIGEST_THRESHOLD = int(os.environ.get('OUTBOX_DIGEST_THRESHOLD', '5'))
+MAX_RATE_LIMIT_RETRIES = 3
+
+
+def backoff_seconds(attempts: int) -> float:
+    delay = min(BASE_BACKOFF_SECONDS * (2 ** (attempts - 1)), MAX_BACKOFF_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_batch(limit: int) -> List[Tuple[int, str, Dict[str, Any], int]]:
+    with db.transaction() as cursor:
+        cursor.execute(
+            '''
+            UPDATE t_p54427834_mission_dark_store.notification_outbox
+            SET attempts = attempts + 1,
+                next_attempt_at = CURRENT_TIMESTAMP + %s * INTERVAL '1 second'
+            WHERE id IN (
+                SELECT id FROM t_p54427834_mission_dark_store.notification_outbox
+                WHERE status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP
+                ORDER BY next_attempt_at, id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, kind, payload, attempts
+            ''',
+            (LEASE_SECONDS, limit)
+        )
+        return sorted(cursor.fetchall())
+
+
+def render_message(kind: str, payload: Dict[str, Any]) -> str:
+    if kind == 'order':
+        return telegram_api.format_order_message(payload.get('order', {}))
+    raise ValueError(f'Unknown notification kind: {kind}')
+
+
+def build_messages(batch: List[Tuple[int, str, Dict[str, Any], int]]) -> Tuple[List[Tuple[List[int], str]], List[Tuple[int, int, str]]]:
+    '''
+    Turn a claimed batch into (outbox ids, message) units, coalescing order notifications into
+    digests when the backlog reaches DIGEST_THRESHOLD. Rows that cannot be rendered are returned as failures.
+    '''
+    units: List[Tuple[List[int], str]] = []
+    failures: List[Tuple[int, int, str]] = []
+    orders = [(outbox_id, payload.get('order', {})) for outbox_id, kind, payload, _ in batch if kind == 'order']
+
+    if len(orders) >= DIGEST_THRESHOLD:
+        offset = 0
+        for count, message in telegram_api.format_order_digest([order for _, order in orders]):
+            units.append(([outbox_id for outbox_id, _ in orders[offset:offset + count]], message))
+            offset += count
+        batch = [row for row in batch if row[1] != 'order']
+
+    for outbox_id, kind, payload, attempts in batch:
+        try:
+            units.append(([outbox_id], render_message(kind, payload)))
+        except ValueError as e:
+            failures.append((outbox_id, attempts, str(e)))
+    return units, failures
+
+
+def send_within(message: str, credentials: Dict[str, str], deadline: float) -> None:
+    '''
+    Send one message, waiting out Telegram's retry_after while the run budget allows.
+    Raises TelegramRateLimited when the wait would overrun the deadline.
+    '''
+    for attempt in range(MAX_RATE_LIMIT_RETRIES):
+        try:
+            telegram_api.send_message(message, credentials, max_wait=max(deadline - time.monotonic(), 0.0))
+            return
+        except telegram_api.TelegramRateLimited as e:
+            # The chat's bucket is now paused, so the next send_message sleeps through retry_after
+            if attempt == MAX_RATE_LIMIT_RETRIES - 1 or e.retry_after >= deadline - time.monotonic():
+                raise
+
+
+def record_results(sent_ids: List[int], failures: List[Tuple[int, int, str]],
+                   deferred_ids: List[int], deferred_seconds: float) -> None:
+    with db.transaction() as cursor:
+        if sent_ids:
+            cursor.execute(
+                "UPDATE t_p54427834_mission_dark_store.notification_outbox SET status = 'sent', sent_at = CURRENT_TIMESTAMP, last_error = NULL WHERE id = ANY(%s)",
+                (sent_ids,)
+            )
+        if deferred_ids:
+            # Rate limiting is not a delivery failure, so the claim does not count as an attempt
+            cursor.execute(
+                "UPDATE t_p54427834_mission_dark_store.notification_outbox SET attempts = attempts - 1, next_attempt_at = CURRENT_TIMESTAMP + %s * INTERVAL '1 second' WHERE id = ANY(%s)",
+                (deferred_seconds, deferred_ids)
+            )
+        for outbox_id, attempts, error in failures:
+            if attempts >= MAX_ATTEMPTS:
+                cursor.execute(
+                    "UPDATE t_p54427834_mission_dark_store.notification_outbox SET status = 'failed', last_error = %s WHERE id = %s",
+                    (error, outbox_id)
+                )
+            else:
+                cursor.execute(
+                    "UPDATE t_p54427834_mission_dark_store.notification_outbox SET next_attempt_at = CURRENT_TIMESTAMP + %s * INTERVAL '1 second', last_error = %s WHERE id = %s",
+                    (backoff_seconds(attempts), error, outbox_id)
+                )
+
+
+def drain(credentials: Dict[str, str]) -> Dict[str, int]:
+    stats = {'sent': 0, 'messages': 0, 'retried': 0, 'failed': 0, 'deferred': 0}
+    deadline = time.monotonic() + MAX_RUN_SECONDS
+
+    while time.monotonic() < deadline:
+        batch = claim_batch(BATCH_SIZE)
+        if not batch:
+            break
+
+        attempts_by_id = {row[0]: row[3] for row in batch}
+        units, failures = build_messages(batch)
+        sent_ids: List[int] = []
+        deferred_ids: List[int] = []
+        deferred_seconds = 0.0
+
+        for index, (outbox_ids, message) in enumerate(units):
+            try:
+                send_within(message, credentials, deadline)
+                sent_ids.extend(outbox_ids)
+                stats['messages'] += 1
+            except telegram_api.TelegramRateLimited as e:
+                deferred_ids = [outbox_id for unit_ids, _ in units[index:] for outbox_id in unit_ids]
+                deferred_seconds = e.retry_after
+                instrument.log('notification_rate_limited', retry_after=e.retry_after, deferred=len(deferred_ids))
+                break
+            except Exception as e:
+                for outbox_id in outbox_ids:
+                    failures.append((outbox_id, attempts_by_id[outbox_id], str(e)[:1000]))
+                    instrument.log('notification_failed', outbox_id=outbox_id, attempts=attempts_by_id[outbox_id], error=str(e)[:200])
+
+        record_results(sent_ids, failures, deferred_ids, deferred_seconds)
+        stats['sent'] += len(sent_ids)
+        stats['deferred'] += len(deferred_ids)
+        stats['failed'] += sum(1 for failure in failures if failure[1] >= MAX_ATTEMPTS)
+        stats['retried'] += sum(1 for failure in failures if failure[1] < MAX_ATTEMPTS)
+
+        if failures or deferred_ids:
+            # Telegram is failing or throttling; leave the rest of the queue for the next run
+            break
+
+    return stats
+
+
+@http.endpoint('dispatch-notifications', methods=['GET', 'POST'])
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    '''
+    Business: Drain the notification outbox and deliver pending messages to Telegram with retries
+    Args: event - dict with httpMethod (timer trigger invocations have none)
+          context - object with attributes: request_id, function_name
+    Returns: HTTP response dict with sent/messages/retried/failed/deferred counts
+    '''
+    try:
+        credentials = telegram_api.get_credentials()
+    except telegram_api.TelegramNotConfigured as e:
+        return http.json_response(500, {'success': False, 'error': str(e)})
+
+    stats = drain(credentials)
+
+    return http.json_response(200, {'success': True, **stats})
@@ -1,73 +1,253 @@
 import json
 import os
-import psycopg2
-from typing import Dict, Any
+import sys
+import base64
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
 
-def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shared import dashboard  # noqa: E402
+from shared import db  # noqa: E402
+from shared import http  # noqa: E402
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+ANALYTICS_DAYS = 30
+TOP_PRODUCTS_LIMIT = 10
+
+# view=changes: a larger delta than this tells the client to reload instead
+MAX_CHANGED_ORDERS = 500
+# updated_at is the writer's transaction start, so a row can become visible slightly after
+# its timestamp; re-reading a short window before the watermark keeps those from being missed
+CHANGES_OVERLAP_SECONDS = 10
+# Tombstones of these entities carry serial ids and are sent as numbers; any other entity is
+# reported under its plural name with ids as stored (text), so new tombstone types pass through
+SERIAL_ID_ENTITIES = ('order', 'message')
+
+ORDER_COLUMNS = "id, name, phone, email, telegram, address, items, total, status, created_at"
+
+# Let Postgres build the large JSON arrays (json_agg) instead of dicts + json.dumps in Python;
+# GET_ORDERS_SQL_JSON=0 falls back to the row-by-row path
+SQL_JSON = os.environ.get('GET_ORDERS_SQL_JSON', '1') != '0'
+
+# Per-size stock (shared/inventory.py) for the products editor
+PRODUCT_STOCK_JSON = "COALESCE((SELECT json_object_agg(s.size, s.quantity) FROM t_p54427834_mission_dark_store.product_stock s WHERE s.product_id = products.id), '{}')"
+
+ORDER_JSON = "json_build_object('id', id, 'name', name, 'phone', phone, 'email', email, 'telegram', telegram, 'address', address, 'items', items, 'total', total, 'status', status, 'created_at', created_at)"
+
+
+def encode_cursor(created_at: datetime, order_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), order_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor_value: str) -> Tuple[datetime, int]:
+    raw = base64.urlsafe_b64decode(cursor_value.encode('ascii'))
+    created_at, order_id = json.loads(raw)
+    return datetime.fromisoformat(created_at), int(order_id)
+
+
+def escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def parse_params(params: Dict[str, Any]) -> Dict[str, Any]:
     '''
-    Business: Get all orders and messages from database
-    Args: event - dict with httpMethod
-          context - object with attributes: request_id, function_name
-    Returns: HTTP response dict with orders and messages lists
+    Validate and convert the query parameters before any query runs, so only malformed
+    input becomes a 400. Raises ValueError, TypeError or KeyError (view=changes without since).
+    '''
+    view = params.get('view')
+    return {
+        'view': view,
+        'limit': min(max(int(params.get('limit') or DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE),
+        'cursor': decode_cursor(params['cursor']) if params.get('cursor') else None,
+        'since': datetime.fromisoformat(params['since']) if view == 'changes' else None,
+        'status': str(params['status']) if params.get('status') else None,
+        'date_from': datetime.fromisoformat(params['date_from']) if params.get('date_from') else None,
+        'date_to': datetime.fromisoformat(params['date_to']) if params.get('date_to') else None,
+        'search': str(params.get('search') or '').strip()
+    }
+
+
+def build_order_filters(query: Dict[str, Any]) -> Tuple[List[str], List[Any]]:
     '''
-    method: str = event.get('httpMethod', 'GET')
-    
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': '',
-            'isBase64Encoded': False
-        }
-    
-    if method != 'GET':
-        return {
-            'statusCode': 405,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'error': 'Method not allowed'}),
-            'isBase64Encoded': False
-        }
-    
-    database_url = os.environ.get('DATABASE_URL')
-    conn = psycopg2.connect(database_url)
-    cursor = conn.cursor()
-    
+    Translate parsed query parameters into WHERE conditions that match the V0005 indexes.
+    '''
+    conditions: List[str] = []
+    args: List[Any] = []
+
+    if query['status']:
+        conditions.append('status = %s')
+        args.append(query['status'])
+
+    if query['date_from']:
+        conditions.append('created_at >= %s')
+        args.append(query['date_from'])
+
+    if query['date_to']:
+        conditions.append('created_at < %s')
+        args.append(query['date_to'])
+
+    # Prefix search keeps the text_pattern_ops indexes usable
+    search = query['search']
+    if search:
+        pattern = escape_like(search) + '%'
+        if '@' in search:
+            conditions.append('lower(email) LIKE lower(%s)')
+            args.append(pattern)
+        else:
+            conditions.append('(phone LIKE %s OR lower(email) LIKE lower(%s))')
+            args.extend([pattern, pattern])
+
+    return conditions, args
+
+
+def fetch_orders_page(cursor, query: Dict[str, Any]) -> Dict[str, Any]:
+    conditions, args = build_order_filters(query)
+    filter_conditions, filter_args = list(conditions), list(args)
+
+    limit = query['limit']
+
+    if query['cursor']:
+        cursor_created_at, cursor_id = query['cursor']
+        conditions.append('(created_at, id) < (%s, %s)')
+        args.extend([cursor_created_at, cursor_id])
+
+    where_sql = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    orders: Any
+    # One extra row tells whether another page exists without a second query
+    if SQL_JSON:
+        cursor.execute(
+            f'''
+            WITH page AS (
+                SELECT {ORDER_COLUMNS}, row_number() OVER (ORDER BY created_at DESC, id DESC) AS rn
+                FROM (
+                    SELECT {ORDER_COLUMNS} FROM t_p54427834_mission_dark_store.orders {where_sql}
+                    ORDER BY created_at DESC, id DESC LIMIT %s
+                ) limited
+            )
+            SELECT COALESCE(json_agg({ORDER_JSON} ORDER BY rn) FILTER (WHERE rn <= %s), '[]')::text,
+                   COUNT(*) > %s, MAX(created_at) FILTER (WHERE rn = %s), MAX(id) FILTER (WHERE rn = %s)
+            FROM page
+            ''',
+            args + [limit + 1, limit, limit, limit, limit]
+        )
+        orders_json, has_more, last_created_at, last_id = cursor.fetchone()
+        orders = http.RawJSON(orders_json)
+    else:
+        cursor.execute(
+            f"SELECT {ORDER_COLUMNS} FROM t_p54427834_mission_dark_store.orders {where_sql} ORDER BY created_at DESC, id DESC LIMIT %s",
+            args + [limit + 1]
+        )
+
+        rows = cursor.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        orders = []
+
+        for row in rows:
+            orders.append({
+                'id': row[0],
+                'name': row[1],
+                'phone': row[2],
+                'email': row[3],
+                'telegram': row[4],
+                'address': row[5],
+                'items': row[6],
+                'total': row[7],
+                'status': row[8],
+                'created_at': row[9].isoformat() if row[9] else None
+            })
+        last_created_at, last_id = (rows[-1][9], rows[-1][0]) if rows else (None, None)
+
+    next_cursor: Optional[str] = encode_cursor(last_created_at, last_id) if has_more else None
+
+    return {
+        'orders': orders,
+        'next_cursor': next_cursor,
+        **fetch_status_counts(cursor, filter_conditions, filter_args)
+    }
+
+
+def fetch_status_counts(cursor, conditions: List[str], args: List[Any]) -> Dict[str, Any]:
+    if conditions:
+        cursor.execute(
+            f"SELECT status, COUNT(*) FROM t_p54427834_mission_dark_store.orders WHERE {' AND '.join(conditions)} GROUP BY status",
+            args
+        )
+    else:
+        # Unfiltered counts come from the dashboard summary instead of scanning every order
+        cursor.execute("SELECT status, order_count FROM t_p54427834_mission_dark_store.order_summary_status WHERE order_count > 0")
+    status_counts = {row[0]: row[1] for row in cursor.fetchall()}
+    return {
+        'orders_total': sum(status_counts.values()),
+        'orders_status_counts': status_counts
+    }
+
+
+def fetch_changes(cursor, query: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Rows inserted, updated or deleted after the since watermark, for incremental admin refresh.
+    The returned watermark is passed back as since on the next call; overlapping rows are
+    re-sent, so clients merge by id. reset=true means the delta is too large to merge.
+    '''
+    since = query['since']
+    cursor.execute("SELECT CURRENT_TIMESTAMP::timestamp, %s::timestamp - %s * INTERVAL '1 second'", (since, CHANGES_OVERLAP_SECONDS))
+    watermark, read_from = cursor.fetchone()
+
+    conditions, args = build_order_filters(query)
     cursor.execute(
-        "SELECT id, name, phone, email, telegram, address, items, total, status, created_at FROM t_p54427834_mission_dark_store.orders ORDER BY created_at DESC"
+        f'''
+        SELECT COALESCE(json_agg({ORDER_JSON} ORDER BY updated_at, id), '[]')::text, COUNT(*)
+        FROM (
+            SELECT {ORDER_COLUMNS}, updated_at FROM t_p54427834_mission_dark_store.orders
+            WHERE {' AND '.join(conditions + ['updated_at > %s'])}
+            ORDER BY updated_at, id LIMIT %s
+        ) changed
+        ''',
+        args + [read_from, MAX_CHANGED_ORDERS + 1]
     )
-    
-    rows = cursor.fetchall()
-    orders = []
-    
-    for row in rows:
-        orders.append({
-            'id': row[0],
-            'name': row[1],
-            'phone': row[2],
-            'email': row[3],
-            'telegram': row[4],
-            'address': row[5],
-            'items': row[6],
-            'total': row[7],
-            'status': row[8],
-            'created_at': row[9].isoformat() if row[9] else None
-        })
-    
+    orders_json, changed_count = cursor.fetchone()
+    if changed_count > MAX_CHANGED_ORDERS:
+        return {'reset': True, 'watermark': watermark.isoformat()}
+
+    cursor.execute(
+        "SELECT entity, array_agg(entity_id ORDER BY id) FROM t_p54427834_mission_dark_store.deleted_records WHERE deleted_at > %s GROUP BY entity",
+        (read_from,)
+    )
+    deleted: Dict[str, List[Any]] = {'orders': [], 'messages': []}
+    for entity, entity_ids in cursor.fetchall():
+        deleted[f'{entity}s'] = [int(entity_id) for entity_id in entity_ids] if entity in SERIAL_ID_ENTITIES else entity_ids
+
+    return {
+        'reset': False,
+        'watermark': watermark.isoformat(),
+        'orders': http.RawJSON(orders_json),
+        'messages': fetch_messages(cursor, since=read_from),
+        'products': fetch_products(cursor, since=read_from),
+        'deleted': deleted,
+        **fetch_status_counts(cursor, conditions, args)
+    }
+
+
+def fetch_messages(cursor, since: Optional[datetime] = None) -> Any:
+    where_sql, args = ('WHERE updated_at > %s', [since]) if since else ('', [])
+    if SQL_JSON:
+        cursor.execute(
+            f"SELECT COALESCE(json_agg(json_build_object('id', id, 'name', name, 'email', email, 'message', message, 'created_at', created_at) ORDER BY created_at DESC), '[]')::text FROM t_p54427834_mission_dark_store.contact_messages {where_sql}",
+            args
+        )
+        return http.RawJSON(cursor.fetchone()[0])
+
     cursor.execute(
-        "SELECT id, name, email, message, created_at FROM t_p54427834_mission_dark_store.contact_messages ORDER BY created_at DESC"
+        f"SELECT id, name, email, message, created_at FROM t_p54427834_mission_dark_store.contact_messages {where_sql} ORDER BY created_at DESC",
+        args
     )
-    
+
     rows = cursor.fetchall()
     messages = []
-    
+
     for row in rows:
         messages.append({
             'id': row[0],
@@ -76,14 +256,26 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'message': row[3],
             'created_at': row[4].isoformat() if row[4] else None
         })
-    
+    return messages
+
+
+def fetch_products(cursor, since: Optional[datetime] = None) -> Any:
+    where_sql, args = ('WHERE updated_at > %s', [since]) if since else ('', [])
+    if SQL_JSON:
+        cursor.execute(
+            f"SELECT COALESCE(json_agg(json_build_object('id', id, 'name', name, 'price', price, 'image', image, 'images', COALESCE(images, '{{}}'), 'category', category, 'description', description, 'sizes', COALESCE(sizes, '{{}}'), 'inStock', in_stock, 'stock', {PRODUCT_STOCK_JSON}) ORDER BY created_at DESC), '[]')::text FROM t_p54427834_mission_dark_store.products {where_sql}",
+            args
+        )
+        return http.RawJSON(cursor.fetchone()[0])
+
     cursor.execute(
-        "SELECT id, name, price, image, images, category, description, sizes, in_stock FROM t_p54427834_mission_dark_store.products ORDER BY created_at DESC"
+        f"SELECT id, name, price, image, images, category, description, sizes, in_stock, {PRODUCT_STOCK_JSON} FROM t_p54427834_mission_dark_store.products {where_sql} ORDER BY created_at DESC",
+        args
     )
-    
+
     rows = cursor.fetchall()
     products = []
-    
+
     for row in rows:
         products.append({
             'id': row[0],
@@ -94,38 +286,100 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'category': row[5],
             'description': row[6],
             'sizes': row[7] if row[7] else [],
-            'inStock': row[8]
+            'inStock': row[8],
+            'stock': row[9]
         })
-    
+    return products
+
+
+def fetch_analytics(cursor) -> Dict[str, Any]:
+    '''
+    Read admin statistics from the rollup tables maintained by track-analytics.
+    Every query touches a bounded number of rows regardless of raw event volume.
+    '''
     cursor.execute(
-        "SELECT COUNT(*) FROM t_p54427834_mission_dark_store.analytics WHERE event_type = 'page_view'"
+        "SELECT event_type, SUM(event_count) FROM t_p54427834_mission_dark_store.analytics_totals WHERE event_type IN ('page_view', 'add_to_cart') GROUP BY event_type"
     )
-    page_views = cursor.fetchone()[0]
-    
+    totals = {row[0]: int(row[1]) for row in cursor.fetchall()}
+
     cursor.execute(
-        "SELECT COUNT(*) FROM t_p54427834_mission_dark_store.analytics WHERE event_type = 'add_to_cart'"
+        "SELECT day, event_type, SUM(event_count) FROM t_p54427834_mission_dark_store.analytics_daily WHERE event_type IN ('page_view', 'add_to_cart') AND day > CURRENT_DATE - %s GROUP BY day, event_type ORDER BY day",
+        (ANALYTICS_DAYS,)
     )
-    add_to_cart = cursor.fetchone()[0]
-    
-    cursor.close()
-    conn.close()
-    
-    analytics = {
-        'page_views': page_views,
-        'add_to_cart': add_to_cart
-    }
-    
+    daily: Dict[str, Dict[str, Any]] = {}
+    for row in cursor.fetchall():
+        day = row[0].isoformat()
+        daily.setdefault(day, {'day': day, 'page_views': 0, 'add_to_cart': 0})
+        daily[day]['page_views' if row[1] == 'page_view' else 'add_to_cart'] = int(row[2])
+
+    cursor.execute(
+        "SELECT t.product_id, p.name, t.event_count FROM t_p54427834_mission_dark_store.analytics_totals t LEFT JOIN t_p54427834_mission_dark_store.products p ON p.id = t.product_id WHERE t.event_type = 'add_to_cart' AND t.product_id <> '' ORDER BY t.event_count DESC LIMIT %s",
+        (TOP_PRODUCTS_LIMIT,)
+    )
+    add_to_cart_by_product = []
+    for row in cursor.fetchall():
+        add_to_cart_by_product.append({
+            'product_id': row[0],
+            'name': row[1],
+            'add_to_cart': int(row[2])
+        })
+
     return {
-        'statusCode': 200,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*'
-        },
-        'body': json.dumps({
-            'orders': orders,
-            'messages': messages,
-            'products': products,
-            'analytics': analytics
-        }),
-        'isBase64Encoded': False
-    }
\ No newline at end of file
+        'page_views': totals.get('page_view', 0),
+        'add_to_cart': totals.get('add_to_cart', 0),
+        'daily': list(daily.values()),
+        'add_to_cart_by_product': add_to_cart_by_product,
+        'orders': fetch_order_summary(cursor)
+    }
+
+
+def fetch_order_summary(cursor) -> Any:
+    '''
+    Revenue and order counts by status and by day plus the best-selling products, read in one
+    statement from the summary tables that order writes keep current (shared/dashboard.py).
+    '''
+    cursor.execute(dashboard.READ_SUMMARY_SQL, {'days': ANALYTICS_DAYS, 'limit': TOP_PRODUCTS_LIMIT})
+    return http.RawJSON(cursor.fetchone()[0])
+
+
+@http.endpoint('get-orders', methods=['GET'])
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    '''
+    Business: Get orders (keyset-paginated and filterable), messages, products and analytics, or only what changed since a watermark
+    Args: event - dict with httpMethod, queryStringParameters (view: orders/changes/dashboard, limit, cursor, since, status, date_from, date_to, search)
+          context - object with attributes: request_id, function_name
+    Returns: HTTP response dict with an orders page, messages, products, analytics and a changes watermark
+    '''
+    try:
+        query = parse_params(event.get('queryStringParameters') or {})
+    except (ValueError, TypeError, KeyError):
+        return http.error(400, 'Invalid pagination or filter parameters')
+
+    with db.transaction() as cursor:
+        if query['view'] == 'changes':
+            return http.json_response(200, fetch_changes(cursor, query))
+
+        # view=dashboard refreshes the statistics cards without any order rows
+        if query['view'] == 'dashboard':
+            return http.json_response(200, {'analytics': fetch_analytics(cursor)})
+
+        orders_page = fetch_orders_page(cursor, query)
+
+        # view=orders serves "load more" and filter changes without the other sections
+        if query['view'] == 'orders':
+            return http.json_response(200, orders_page)
+
+        messages = fetch_messages(cursor)
+        products = fetch_products(cursor)
+        analytics = fetch_analytics(cursor)
+        # Starting point for view=changes polling
+        cursor.execute("SELECT CURRENT_TIMESTAMP::timestamp")
+        watermark = cursor.fetchone()[0]
+
+    return http.json_response(200, {
+        **orders_page,
+        'watermark': watermark.isoformat(),
+        'messages': messages,
+        'products': products,
+        'analytics': analytics
+    })
@@ -0,0 +1,82 @@
+import json
+import os
+import sys
+import hashlib
+from typing import Dict, Any
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shared import db  # noqa: E402
+from shared import http  # noqa: E402
+from shared import instrument  # noqa: E402
+from shared.catalog import catalog_version  # noqa: E402
+
+# Warm-container cache: serialized catalog body keyed on the products version
+_catalog_cache: Dict[str, Any] = {'version': None, 'body': None, 'etag': None}
+
+CACHE_CONTROL = 'public, max-age=60, stale-while-revalidate=300'
+
+
+def load_catalog(cursor) -> str:
+    cursor.execute(
+        "SELECT id, name, price, image, images, category, description, sizes, in_stock, media FROM t_p54427834_mission_dark_store.products ORDER BY created_at DESC"
+    )
+
+    products = []
+    for row in cursor.fetchall():
+        products.append({
+            'id': row[0],
+            'name': row[1],
+            'price': row[2],
+            'image': row[3],
+            'images': row[4] if row[4] else [],
+            'category': row[5],
+            'description': row[6],
+            'sizes': row[7] if row[7] else [],
+            'inStock': row[8],
+            # srcset-ready AVIF/WebP variants per image, filled in by process-media
+            'media': row[9]
+        })
+
+    with instrument.span('serialize'):
+        return json.dumps({'products': products})
+
+
+@http.endpoint('get-products', methods=['GET'], allow_headers=['Content-Type', 'If-None-Match'])
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    '''
+    Business: Read-only product catalog for the storefront with ETag caching
+    Args: event - dict with httpMethod, headers (If-None-Match)
+          context - object with attributes: request_id, function_name
+    Returns: HTTP response dict with products list or 304 Not Modified
+    '''
+    with db.transaction() as cursor:
+        version = catalog_version(cursor)
+
+        if _catalog_cache['version'] != version:
+            body = load_catalog(cursor)
+            _catalog_cache['version'] = version
+            _catalog_cache['body'] = body
+            # Weak: http.endpoint may send the same catalog gzip- or brotli-encoded, which is not byte-identical
+            _catalog_cache['etag'] = 'W/"' + hashlib.sha1(body.encode('utf-8')).hexdigest() + '"'
+
+    etag = _catalog_cache['etag']
+    if_none_match = http.get_header(event, 'If-None-Match')
+
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    if if_none_match and etag.removeprefix('W/') in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]:
+        return http.response(304, '', {
+            'ETag': etag,
+            'Vary': 'Accept-Encoding',
+            'Cache-Control': CACHE_CONTROL,
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'ETag'
+        })
+
+    return http.response(200, _catalog_cache['body'], {
+        'Content-Type': 'application/json',
+        'ETag': etag,
+        'Vary': 'Accept-Encoding',
+        'Cache-Control': CACHE_CONTROL,
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Expose-Headers': 'ETag'
+    })
@@ -0,0 +1,114 @@
+import os
+import select
+import sys
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shared import db  # noqa: E402
+from shared import http  # noqa: E402
+from shared import instrument  # noqa: E402
+
+NEW_ORDER_CHANNEL = 'new_order'
+# Stay below the function timeout; clients reconnect right after an empty answer
+MAX_WAIT_SECONDS = float(os.environ.get('ORDER_EVENTS_MAX_WAIT', '25'))
+MAX_ORDERS_PER_RESPONSE = 100
+SSE_RETRY_MS = 1000
+
+ORDER_JSON = "json_build_object('id', id, 'name', name, 'phone', phone, 'email', email, 'telegram', telegram, 'address', address, 'items', items, 'total', total, 'status', status, 'created_at', created_at)"
+
+
+def fetch_orders_after(cursor, after_id: int) -> List[Tuple[int, str]]:
+    cursor.execute(
+        f"SELECT id, {ORDER_JSON}::text FROM t_p54427834_mission_dark_store.orders WHERE id > %s ORDER BY id LIMIT %s",
+        (after_id, MAX_ORDERS_PER_RESPONSE)
+    )
+    return cursor.fetchall()
+
+
+def wait_for_orders(after_id: int, timeout: float) -> List[Tuple[int, str]]:
+    '''
+    Block on LISTEN new_order until an order newer than after_id exists or the timeout passes.
+    submit-order sends the NOTIFY inside its transaction, so a wake-up always sees the row.
+    '''
+    with db.connection() as conn:
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN {NEW_ORDER_CHANNEL}')
+                try:
+                    # Checked after LISTEN so an order committed just before it is not missed
+                    orders = fetch_orders_after(cursor, after_id)
+                    deadline = time.monotonic() + timeout
+                    while not orders:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        with instrument.span('wait'):
+                            ready, _, _ = select.select([conn], [], [], remaining)
+                        if not ready:
+                            break
+                        conn.poll()
+                        if conn.notifies:
+                            conn.notifies.clear()
+                            orders = fetch_orders_after(cursor, after_id)
+                finally:
+                    cursor.execute('UNLISTEN *')
+        finally:
+            conn.autocommit = False
+    return orders
+
+
+def sse_body(orders: List[Tuple[int, str]], last_id: int) -> str:
+    parts = [f'retry: {SSE_RETRY_MS}\n\n']
+    for order_id, order_json in orders:
+        parts.append(f'id: {order_id}\nevent: order\ndata: {order_json}\n\n')
+    if not orders:
+        # An id without data dispatches nothing but still sets Last-Event-ID for the reconnect
+        parts.append(f'id: {last_id}\n\n')
+    return ''.join(parts)
+
+
+@http.endpoint('order-events', methods=['GET'], allow_headers=['Content-Type', 'Last-Event-ID'])
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    '''
+    Business: Push new orders to the admin panel via long-poll or Server-Sent Events on Postgres LISTEN/NOTIFY
+    Args: event - dict with httpMethod, headers (Accept, Last-Event-ID), queryStringParameters (after_id, timeout)
+          context - object with attributes: request_id, function_name
+    Returns: HTTP response dict with orders newer than after_id, as JSON or a text/event-stream body
+    '''
+    params = event.get('queryStringParameters') or {}
+    last_event_id = http.get_header(event, 'Last-Event-ID')
+
+    try:
+        after_value: Optional[str] = last_event_id or params.get('after_id')
+        after_id = int(after_value) if after_value else None
+        timeout = min(max(float(params.get('timeout') or MAX_WAIT_SECONDS), 0.0), MAX_WAIT_SECONDS)
+    except ValueError:
+        return http.error(400, 'Invalid after_id or timeout')
+
+    with db.transaction() as cursor:
+        if after_id is None:
+            # First connection: only orders placed from now on
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM t_p54427834_mission_dark_store.orders")
+            after_id = cursor.fetchone()[0]
+            orders = []
+        else:
+            orders = fetch_orders_after(cursor, after_id)
+
+    if not orders and timeout > 0:
+        orders = wait_for_orders(after_id, timeout)
+
+    last_id = orders[-1][0] if orders else after_id
+
+    if 'text/event-stream' in (http.get_header(event, 'Accept') or ''):
+        return http.response(200, sse_body(orders, last_id), {
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'Access-Control-Allow-Origin': '*'
+        })
+
+    return http.json_response(200, {
+        'orders': http.RawJSON('[' + ','.join(order_json for _, order_json in orders) + ']'),
+        'last_id': last_id
+    })
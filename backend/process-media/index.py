@@ -0,0 +1,220 @@
+import base64
+import hashlib
+import io
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Tuple
+
+from PIL import Image, ImageOps, features
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shared import blurhash  # noqa: E402
+from shared import db  # noqa: E402
+from shared import http  # noqa: E402
+from shared import instrument  # noqa: E402
+from shared import media  # noqa: E402
+
+BATCH_SIZE = int(os.environ.get('MEDIA_BATCH_SIZE', '8'))
+MAX_ATTEMPTS = int(os.environ.get('MEDIA_MAX_ATTEMPTS', '5'))
+# Claimed rows become visible again after the lease if the worker dies mid-batch
+LEASE_SECONDS = 300
+BASE_BACKOFF_SECONDS = 30
+MAX_BACKOFF_SECONDS = 6 * 3600
+MAX_RUN_SECONDS = float(os.environ.get('MEDIA_MAX_RUN_SECONDS', '20'))
+# Pillow releases the GIL while decoding, resizing and encoding, so a thread pool uses every core
+WORKERS = int(os.environ.get('MEDIA_WORKERS') or os.cpu_count() or 2)
+DOWNLOAD_TIMEOUT = 15
+MAX_SOURCE_BYTES = 25 * 1024 * 1024
+
+# Variant name -> widths for srcset (displayed width and its 2x); never upscaled past the source
+VARIANTS = {
+    'thumbnail': (160, 320),
+    'card': (480, 960),
+    'zoom': (1200, 2000)
+}
+# Listed in the order browsers should prefer them; AVIF needs a Pillow build with libavif
+ENCODERS = [
+    (ext, mime, options)
+    for ext, mime, options in [
+        ('avif', 'image/avif', {'quality': 55, 'speed': 6}),
+        ('webp', 'image/webp', {'quality': 80, 'method': 4})
+    ]
+    if features.check(ext)
+]
+BLURHASH_SIZE = 32
+PLACEHOLDER_WIDTH = 16
+
+
+def backoff_seconds(attempts: int) -> float:
+    delay = min(BASE_BACKOFF_SECONDS * (2 ** (attempts - 1)), MAX_BACKOFF_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_batch(limit: int) -> List[Tuple[str, int]]:
+    with db.transaction() as cursor:
+        cursor.execute(
+            '''
+            UPDATE t_p54427834_mission_dark_store.product_media
+            SET attempts = attempts + 1,
+                next_attempt_at = CURRENT_TIMESTAMP + %s * INTERVAL '1 second'
+            WHERE source_url IN (
+                SELECT source_url FROM t_p54427834_mission_dark_store.product_media
+                WHERE status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP
+                ORDER BY next_attempt_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING source_url, attempts
+            ''',
+            (LEASE_SECONDS, limit)
+        )
+        return cursor.fetchall()
+
+
+def download(url: str) -> bytes:
+    return media.download_source(url, DOWNLOAD_TIMEOUT, MAX_SOURCE_BYTES)
+
+
+def encode(image: Image.Image, ext: str, options: Dict[str, Any]) -> bytes:
+    output = io.BytesIO()
+    image.save(output, format=ext.upper(), **options)
+    return output.getvalue()
+
+
+def resize_to_width(image: Image.Image, width: int) -> Image.Image:
+    if width >= image.width:
+        return image
+    return image.resize((width, max(1, round(image.height * width / image.width))), Image.Resampling.LANCZOS)
+
+
+def placeholders(image: Image.Image) -> Dict[str, str]:
+    small = image.convert('RGB')
+    small.thumbnail((BLURHASH_SIZE, BLURHASH_SIZE))
+    raw = small.tobytes()
+    pixels = [tuple(raw[i:i + 3]) for i in range(0, len(raw), 3)]
+    x_components, y_components = (4, 3) if small.width >= small.height else (3, 4)
+
+    tiny = resize_to_width(image, PLACEHOLDER_WIDTH)
+    return {
+        'blurhash': blurhash.encode(pixels, small.width, small.height, x_components, y_components),
+        'placeholder': 'data:image/webp;base64,' + base64.b64encode(encode(tiny, 'webp', {'quality': 40})).decode('ascii')
+    }
+
+
+def render_variants(source_url: str, data: bytes, storage: media.LocalStorage) -> Dict[str, Any]:
+    '''
+    Decode a source image, write every variant width in every supported format and return its manifest.
+    Files are keyed by the source content hash, so reprocessing the same image rewrites the same files.
+    '''
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    digest = hashlib.sha256(data).hexdigest()[:24]
+
+    variants: Dict[str, Any] = {}
+    for name, widths in VARIANTS.items():
+        srcsets: Dict[str, List[str]] = {mime: [] for _, mime, _ in ENCODERS}
+        fallback = None
+        for width in sorted({min(width, image.width) for width in widths}):
+            resized = resize_to_width(image, width)
+            for ext, mime, options in ENCODERS:
+                url = storage.put(f'{digest}/{name}-{width}.{ext}', encode(resized, ext, options))
+                srcsets[mime].append(f'{url} {width}w')
+                if fallback is None and ext == 'webp':
+                    fallback = {'src': url, 'width': resized.width, 'height': resized.height}
+        variants[name] = {
+            **(fallback or {'src': source_url, 'width': image.width, 'height': image.height}),
+            'sources': [{'type': mime, 'srcset': ', '.join(entries)} for mime, entries in srcsets.items()]
+        }
+
+    return {
+        'source': source_url,
+        'width': image.width,
+        'height': image.height,
+        **placeholders(image),
+        'variants': variants
+    }
+
+
+def process_image(source_url: str, storage: media.LocalStorage) -> Dict[str, Any]:
+    return render_variants(source_url, download(source_url), storage)
+
+
+def record_results(ready: Dict[str, Dict[str, Any]], failures: List[Tuple[str, int, str]]) -> int:
+    '''
+    Store manifests and failures; returns how many products got a new media manifest.
+    '''
+    with db.transaction() as cursor:
+        for source_url, manifest in ready.items():
+            cursor.execute(
+                "UPDATE t_p54427834_mission_dark_store.product_media SET status = 'ready', manifest = %s::jsonb, last_error = NULL, updated_at = CURRENT_TIMESTAMP WHERE source_url = %s",
+                (json.dumps(manifest), source_url)
+            )
+        for source_url, attempts, error in failures:
+            if attempts >= MAX_ATTEMPTS:
+                cursor.execute(
+                    "UPDATE t_p54427834_mission_dark_store.product_media SET status = 'failed', last_error = %s, updated_at = CURRENT_TIMESTAMP WHERE source_url = %s",
+                    (error, source_url)
+                )
+            else:
+                cursor.execute(
+                    "UPDATE t_p54427834_mission_dark_store.product_media SET next_attempt_at = CURRENT_TIMESTAMP + %s * INTERVAL '1 second', last_error = %s WHERE source_url = %s",
+                    (backoff_seconds(attempts), error, source_url)
+                )
+        return len(media.refresh_manifests_for_sources(cursor, list(ready))) if ready else 0
+
+
+def drain(storage: media.LocalStorage) -> Dict[str, int]:
+    stats = {'processed': 0, 'retried': 0, 'failed': 0, 'products_updated': 0}
+    deadline = time.monotonic() + MAX_RUN_SECONDS
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        while time.monotonic() < deadline:
+            batch = claim_batch(BATCH_SIZE)
+            if not batch:
+                break
+
+            futures = [(source_url, attempts, pool.submit(process_image, source_url, storage)) for source_url, attempts in batch]
+            ready: Dict[str, Dict[str, Any]] = {}
+            failures: List[Tuple[str, int, str]] = []
+            with instrument.span('render'):
+                for source_url, attempts, future in futures:
+                    try:
+                        ready[source_url] = future.result()
+                    except media.UnsafeSource as e:
+                        # Refused URLs fail at once instead of being retried
+                        failures.append((source_url, MAX_ATTEMPTS, str(e)[:1000]))
+                        instrument.log('media_source_refused', source_url=source_url[:200], error=str(e)[:200])
+                    except Exception as e:
+                        failures.append((source_url, attempts, str(e)[:1000]))
+                        instrument.log('media_failed', source_url=source_url, attempts=attempts, error=str(e)[:200])
+
+            stats['products_updated'] += record_results(ready, failures)
+            stats['processed'] += len(ready)
+            stats['failed'] += sum(1 for failure in failures if failure[1] >= MAX_ATTEMPTS)
+            stats['retried'] += sum(1 for failure in failures if failure[1] < MAX_ATTEMPTS)
+
+    return stats
+
+
+@http.endpoint('process-media', methods=['GET', 'POST'])
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    '''
+    Business: Generate resized AVIF/WebP variants and blur placeholders for queued product images
+    Args: event - dict with httpMethod (timer trigger invocations have none)
+          context - object with attributes: request_id, function_name
+    Returns: HTTP response dict with processed/retried/failed counts and updated products, or 503 while
+             persistent media storage is not configured (queued images stay pending)
+    '''
+    # Manifests pointing at files the storefront cannot load would replace working original images
+    problem = media.storage_problem()
+    if problem:
+        instrument.log('media_storage_not_configured', error=problem)
+        return http.error(503, 'Media storage is not configured', detail=problem)
+
+    stats = drain(media.LocalStorage())
+
+    return http.json_response(200, {'success': True, **stats})
@@ -0,0 +1,33 @@
+import os
+import sys
+import time
+from typing import Dict, Any
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shared import db  # noqa: E402
+from shared import http  # noqa: E402
+from shared import inventory  # noqa: E402
+
+BATCH_SIZE = int(os.environ.get('STOCK_RELEASE_BATCH_SIZE', '500'))
+MAX_RUN_SECONDS = float(os.environ.get('STOCK_RELEASE_MAX_RUN_SECONDS', '20'))
+
+
+@http.endpoint('release-stock-holds', methods=['GET', 'POST'])
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    '''
+    Business: Put stock held by abandoned checkouts back on sale once the holds expire
+    Args: event - dict with httpMethod (timer trigger invocations have none)
+          context - object with attributes: request_id, function_name
+    Returns: HTTP response dict with the number of released holds
+    '''
+    released = 0
+    deadline = time.monotonic() + MAX_RUN_SECONDS
+    # Checkouts release expired holds of the SKUs they touch themselves; this catches the rest
+    while time.monotonic() < deadline:
+        with db.transaction() as cursor:
+            batch = inventory.release_expired(cursor, BATCH_SIZE)
+        released += batch
+        if batch < BATCH_SIZE:
+            break
+
+    return http.json_response(200, {'success': True, 'released': released})
@@ -0,0 +1,53 @@
+import os
+import sys
+from typing import Dict, Any
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shared import db  # noqa: E402
+from shared import http  # noqa: E402
+from shared import inventory  # noqa: E402
+from shared import ratelimit  # noqa: E402
+from shared.catalog import get_product_index, price_items  # noqa: E402
+
+MAX_RESERVATION_LENGTH = 128
+# Per client IP; checkout re-holds whenever the cart changes, so this is looser than submit-order
+HOLD_RATE_LIMIT = ratelimit.RateLimit(
+    'reserve-stock',
+    rate=float(os.environ.get('RESERVE_STOCK_RATE_PER_MINUTE', '30')) / 60,
+    burst=int(os.environ.get('RESERVE_STOCK_BURST', '20'))
+)
+
+
+@http.endpoint('reserve-stock', methods=['POST'], schema={'reservation': str, 'items': list},
+               rate_limit=HOLD_RATE_LIMIT)
+def handler(event: Dict[str, Any], context: Any, body_data: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Business: Hold per-size stock for an open checkout until it expires or the order is submitted
+    Args: event - dict with httpMethod, body (reservation - the checkout Idempotency-Key, items - cart lines; empty releases the hold)
+          context - object with attributes: request_id, function_name
+          body_data - parsed JSON body with reservation and items
+    Returns: HTTP response dict with the hold expiry, 422 with per-line errors, 409 for carts over
+             MAX_HOLD_LINES, or 429 while the client IP has MAX_HOLDS_PER_IP other open holds
+    '''
+    reservation = body_data['reservation']
+    if not reservation or len(reservation) > MAX_RESERVATION_LENGTH:
+        return http.error(400, 'Invalid reservation')
+
+    if len(body_data['items']) > inventory.MAX_HOLD_LINES:
+        return http.error(409, 'Too many items to hold', max_items=inventory.MAX_HOLD_LINES)
+
+    try:
+        with db.transaction() as cursor:
+            pricing = price_items(body_data['items'], get_product_index(cursor))
+            if pricing['errors']:
+                return http.error(422, 'Cart validation failed', errors=pricing['errors'])
+            expires_at = inventory.hold(cursor, reservation, pricing['items'], http.client_ip(event))
+    except inventory.OutOfStock as e:
+        return http.error(422, 'Not enough stock', errors=e.errors)
+    except inventory.TooManyHolds as e:
+        return http.rate_limited(e.retry_after)
+
+    return http.json_response(200, {
+        'success': True,
+        'expires_at': expires_at.isoformat() if expires_at else None
+    })
@@ -0,0 +1,100 @@
+import os
+from typing import Dict, Any, List
+
+# Per cart line, for orders and checkout holds alike; keeps one client from holding a whole drop
+MAX_LINE_QUANTITY = int(os.environ.get('MAX_LINE_QUANTITY', '10'))
+# orders.total is an INTEGER column
+MAX_ORDER_TOTAL = 2 ** 31 - 1
+# Warm-container product index, rebuilt only when the products table changes
+_product_index: Dict[str, Any] = {'version': None, 'products': {}}
+
+
+def catalog_version(cursor) -> str:
+    '''
+    Cheap version stamp for the products table; the row count makes deletes visible too.
+    '''
+    cursor.execute(
+        "SELECT MAX(updated_at), COUNT(*) FROM t_p54427834_mission_dark_store.products"
+    )
+    max_updated_at, product_count = cursor.fetchone()
+    return f"{max_updated_at.isoformat() if max_updated_at else ''}:{product_count}"
+
+
+def get_product_index(cursor) -> Dict[str, Dict[str, Any]]:
+    version = catalog_version(cursor)
+    if _product_index['version'] != version:
+        cursor.execute(
+            "SELECT id, name, price, image, sizes, in_stock FROM t_p54427834_mission_dark_store.products"
+        )
+        products = {}
+        for row in cursor.fetchall():
+            products[row[0]] = {
+                'id': row[0],
+                'name': row[1],
+                'price': row[2],
+                'image': row[3],
+                'sizes': row[4] if row[4] else [],
+                'inStock': row[5] is not False
+            }
+        _product_index['products'] = products
+        _product_index['version'] = version
+    return _product_index['products']
+
+
+def price_items(items: List[Dict[str, Any]], products: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    '''
+    Re-price cart items against the product index.
+    Returns priced line items, the server-side total and a list of structured errors.
+    '''
+    errors: List[Dict[str, Any]] = []
+    priced: List[Dict[str, Any]] = []
+    total = 0
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'code': 'invalid_item', 'message': 'Item must be an object'})
+            continue
+
+        product_id = str(item.get('id', ''))
+        product = products.get(product_id)
+        if product is None:
+            errors.append({'index': index, 'product_id': product_id, 'code': 'unknown_product', 'message': 'Product not found'})
+            continue
+
+        quantity = item.get('quantity')
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+            errors.append({'index': index, 'product_id': product_id, 'code': 'invalid_quantity', 'message': 'Quantity must be a positive integer'})
+            continue
+        if quantity > MAX_LINE_QUANTITY:
+            errors.append({'index': index, 'product_id': product_id, 'code': 'quantity_limit', 'message': 'Quantity is over the per-item limit', 'max_quantity': MAX_LINE_QUANTITY})
+            continue
+
+        if not product['inStock']:
+            errors.append({'index': index, 'product_id': product_id, 'code': 'out_of_stock', 'message': 'Product is out of stock'})
+            continue
+
+        size = item.get('size')
+        if product['sizes'] and size not in product['sizes']:
+            errors.append({'index': index, 'product_id': product_id, 'code': 'invalid_size', 'message': 'Size is not available', 'available_sizes': product['sizes']})
+            continue
+
+        if 'price' in item and item['price'] != product['price']:
+            errors.append({'index': index, 'product_id': product_id, 'code': 'price_changed', 'message': 'Price has changed', 'price': product['price']})
+            continue
+
+        line = {
+            'id': product_id,
+            'name': product['name'],
+            'price': product['price'],
+            'image': product['image'],
+            'quantity': quantity
+        }
+        if size:
+            line['size'] = size
+        priced.append(line)
+        total += product['price'] * quantity
+
+    if total > MAX_ORDER_TOTAL:
+        errors.append({'code': 'total_limit', 'message': 'Order total is too large', 'max_total': MAX_ORDER_TOTAL})
+
+    return {'items': priced, 'total': total, 'errors': errors}
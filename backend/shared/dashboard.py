@@ -0,0 +1,145 @@
+from typing import Any, List
+
+# Order summaries are maintained like the analytics rollups: in the same statement as the write,
+# so they never drift from the orders table. A writer exposes what it changed as CTEs and appends
+# these fragments:
+#   order_deltas(created_at, status, total, sign)      sign +1 for an order entering a status, -1 for leaving it
+#   product_deltas(product_id, quantity, revenue, sign) sign +1 for order lines added, -1 for removed
+# ORDER BY keeps the upsert lock order stable across concurrent writers.
+ORDER_SUMMARY_CTES = '''
+    order_summary_daily_delta AS (
+        INSERT INTO t_p54427834_mission_dark_store.order_summary_daily AS s (day, status, order_count, revenue)
+        SELECT created_at::date, COALESCE(status, 'new'), SUM(sign), SUM(sign * total)
+        FROM order_deltas WHERE created_at IS NOT NULL
+        GROUP BY 1, 2 HAVING SUM(sign) <> 0 ORDER BY 1, 2
+        ON CONFLICT (day, status)
+        DO UPDATE SET order_count = s.order_count + EXCLUDED.order_count, revenue = s.revenue + EXCLUDED.revenue
+    ),
+    order_summary_status_delta AS (
+        INSERT INTO t_p54427834_mission_dark_store.order_summary_status AS s (status, order_count, revenue)
+        SELECT COALESCE(status, 'new'), SUM(sign), SUM(sign * total)
+        FROM order_deltas
+        GROUP BY 1 HAVING SUM(sign) <> 0 ORDER BY 1
+        ON CONFLICT (status)
+        DO UPDATE SET order_count = s.order_count + EXCLUDED.order_count, revenue = s.revenue + EXCLUDED.revenue
+    )
+'''
+
+PRODUCT_SUMMARY_CTES = '''
+    order_summary_products_delta AS (
+        INSERT INTO t_p54427834_mission_dark_store.order_summary_products AS s (product_id, quantity, revenue)
+        SELECT product_id, SUM(sign * quantity), SUM(sign * revenue)
+        FROM product_deltas
+        GROUP BY 1 ORDER BY 1
+        ON CONFLICT (product_id)
+        DO UPDATE SET quantity = s.quantity + EXCLUDED.quantity, revenue = s.revenue + EXCLUDED.revenue
+    )
+'''
+
+# Status changes read the previous status under the row lock, so a concurrent change is
+# counted against the status it actually left
+UPDATE_STATUS_SQL = f'''
+    WITH previous AS (
+        SELECT id, status FROM t_p54427834_mission_dark_store.orders
+        WHERE id = ANY(%(ids)s::int[]) ORDER BY id FOR UPDATE
+    ),
+    changed AS (
+        UPDATE t_p54427834_mission_dark_store.orders o
+        SET status = %(status)s, updated_at = CURRENT_TIMESTAMP
+        FROM previous WHERE o.id = previous.id
+        RETURNING o.id, o.created_at, o.total, previous.status AS old_status, o.status AS new_status
+    ),
+    order_deltas AS (
+        SELECT created_at, old_status AS status, total, -1 AS sign FROM changed
+        UNION ALL
+        SELECT created_at, new_status, total, 1 FROM changed
+    ),
+    {ORDER_SUMMARY_CTES}
+    SELECT id FROM changed
+'''
+
+# Deleted orders and their lines (still visible to this statement before the cascade) are
+# subtracted, and a tombstone is left for get-orders view=changes
+DELETE_ORDERS_SQL = f'''
+    WITH deleted AS (
+        DELETE FROM t_p54427834_mission_dark_store.orders
+        WHERE id = ANY(%(ids)s::int[])
+        RETURNING id, created_at, status, total
+    ),
+    order_deltas AS (
+        SELECT created_at, status, total, -1 AS sign FROM deleted
+    ),
+    product_deltas AS (
+        SELECT i.product_id, i.quantity, i.quantity * i.unit_price AS revenue, -1 AS sign
+        FROM t_p54427834_mission_dark_store.order_items i JOIN deleted ON deleted.id = i.order_id
+    ),
+    {ORDER_SUMMARY_CTES},
+    {PRODUCT_SUMMARY_CTES}
+    INSERT INTO t_p54427834_mission_dark_store.deleted_records (entity, entity_id)
+    SELECT 'order', id::text FROM deleted
+    RETURNING entity_id
+'''
+
+RECORD_ORDER_SQL = f'''
+    WITH order_deltas AS (
+        SELECT created_at, status, total, 1 AS sign
+        FROM t_p54427834_mission_dark_store.orders WHERE id = %(id)s
+    ),
+    product_deltas AS (
+        SELECT product_id, quantity, quantity * unit_price AS revenue, 1 AS sign
+        FROM t_p54427834_mission_dark_store.order_items WHERE order_id = %(id)s
+    ),
+    {ORDER_SUMMARY_CTES},
+    {PRODUCT_SUMMARY_CTES}
+    SELECT 1
+'''
+
+# Every part is an index range or a handful of rows: statuses, the last %(days)s days, top %(limit)s products
+READ_SUMMARY_SQL = '''
+    SELECT json_build_object(
+        'by_status', (
+            SELECT COALESCE(json_object_agg(status, json_build_object('orders', order_count, 'revenue', revenue)), '{}')
+            FROM t_p54427834_mission_dark_store.order_summary_status WHERE order_count > 0
+        ),
+        'daily', (
+            SELECT COALESCE(json_agg(json_build_object('day', day, 'orders', orders, 'revenue', revenue) ORDER BY day), '[]')
+            FROM (
+                SELECT day, SUM(order_count) AS orders, SUM(revenue) AS revenue
+                FROM t_p54427834_mission_dark_store.order_summary_daily
+                WHERE day > CURRENT_DATE - %(days)s
+                GROUP BY day
+            ) days
+        ),
+        'top_products', (
+            SELECT COALESCE(json_agg(json_build_object('product_id', t.product_id, 'name', p.name, 'quantity', t.quantity, 'revenue', t.revenue) ORDER BY t.quantity DESC), '[]')
+            FROM (
+                SELECT product_id, quantity, revenue FROM t_p54427834_mission_dark_store.order_summary_products
+                WHERE quantity > 0 ORDER BY quantity DESC LIMIT %(limit)s
+            ) t
+            LEFT JOIN t_p54427834_mission_dark_store.products p ON p.id = t.product_id
+        )
+    )::text
+'''
+
+
+def record_order(cursor, order_id: int) -> None:
+    '''
+    Add a new order and its lines to the summaries. Call in the transaction that inserted them.
+    '''
+    cursor.execute(RECORD_ORDER_SQL, {'id': order_id})
+
+
+def update_status(cursor, order_ids: List[Any], status: str) -> List[int]:
+    '''
+    Set the status of orders and move them between status summaries; returns the updated ids.
+    '''
+    cursor.execute(UPDATE_STATUS_SQL, {'ids': order_ids, 'status': status})
+    return [row[0] for row in cursor.fetchall()]
+
+
+def delete_orders(cursor, order_ids: List[Any]) -> List[int]:
+    '''
+    Delete orders with tombstones and take them out of the summaries; returns the deleted ids.
+    '''
+    cursor.execute(DELETE_ORDERS_SQL, {'ids': order_ids})
+    return [int(row[0]) for row in cursor.fetchall()]
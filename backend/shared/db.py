@@ -0,0 +1,231 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+from . import instrument
+
+SCHEMA = 't_p54427834_mission_dark_store'
+
+# Pool settings, overridable per function through environment variables
+POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', '1'))
+POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '4'))
+CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', '5'))
+# Connections idle for longer than this are pinged before being handed out
+HEALTH_CHECK_INTERVAL = float(os.environ.get('DB_HEALTH_CHECK_INTERVAL', '30'))
+
+# psycopg2 is imported on first use, so preflights and requests rejected before any
+# query never pay for loading the driver
+psycopg2: Any = None
+_timed_cursor: Any = None
+
+# Module-level state survives between invocations of a warm container
+_pool: Any = None
+_pool_lock = threading.Lock()
+_last_used: Dict[int, float] = {}
+# Extra psycopg2.connect() arguments, e.g. cursor_factory for benchmarks
+_connect_kwargs: Dict[str, Any] = {}
+
+
+def driver() -> Any:
+    global psycopg2
+    if psycopg2 is None:
+        import psycopg2.extensions
+        import psycopg2.extras
+        import psycopg2.pool
+    return psycopg2
+
+
+def timed_cursor() -> Any:
+    '''
+    Cursor class that reports each statement's duration and row count to the current request.
+    '''
+    global _timed_cursor
+    if _timed_cursor is None:
+        class TimedCursor(driver().extensions.cursor):
+            def execute(self, query: Any, vars: Any = None) -> Any:
+                started = time.perf_counter()
+                try:
+                    return super().execute(query, vars)
+                finally:
+                    instrument.record_query(time.perf_counter() - started, self.rowcount)
+
+            def executemany(self, query: Any, vars_list: Any) -> Any:
+                started = time.perf_counter()
+                try:
+                    return super().executemany(query, vars_list)
+                finally:
+                    instrument.record_query(time.perf_counter() - started, self.rowcount)
+
+        _timed_cursor = TimedCursor
+    return _timed_cursor
+
+
+def execute_values(cursor: Any, sql: str, rows: Any, **kwargs: Any) -> Any:
+    return driver().extras.execute_values(cursor, sql, rows, **kwargs)
+
+
+def get_pool() -> Any:
+    global _pool
+    if _pool is None or _pool.closed:
+        with _pool_lock:
+            if _pool is None or _pool.closed:
+                _pool = driver().pool.ThreadedConnectionPool(
+                    POOL_MIN_SIZE,
+                    POOL_MAX_SIZE,
+                    os.environ.get('DATABASE_URL'),
+                    connect_timeout=CONNECT_TIMEOUT,
+                    keepalives=1,
+                    keepalives_idle=30,
+                    keepalives_interval=10,
+                    keepalives_count=3,
+                    **{'cursor_factory': timed_cursor(), **_connect_kwargs}
+                )
+    return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _pool = None
+        _last_used.clear()
+
+
+def configure(**connect_kwargs: Any) -> None:
+    '''
+    Replace the extra connect arguments and drop the current pool so they take effect.
+    '''
+    close_pool()
+    _connect_kwargs.clear()
+    _connect_kwargs.update(connect_kwargs)
+
+
+def is_healthy(conn: Any) -> bool:
+    if conn.closed:
+        return False
+    last_used = _last_used.get(id(conn))
+    if last_used is None or time.monotonic() - last_used < HEALTH_CHECK_INTERVAL:
+        return True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def release(conn: Any, broken: bool = False) -> None:
+    pool = get_pool()
+    if not broken and not conn.closed:
+        try:
+            if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except psycopg2.Error:
+            broken = True
+    if broken or conn.closed:
+        _last_used.pop(id(conn), None)
+        pool.putconn(conn, close=True)
+        return
+    _last_used[id(conn)] = time.monotonic()
+    pool.putconn(conn)
+
+
+def acquire() -> Any:
+    '''
+    Take a connection from the pool, replacing it if the health check fails.
+    A dead connection is retried once with a fresh one before giving up.
+    '''
+    with instrument.span('connect'):
+        pool = get_pool()
+        for _ in range(2):
+            conn = pool.getconn()
+            if is_healthy(conn):
+                return conn
+            release(conn, broken=True)
+        return pool.getconn()
+
+
+@contextmanager
+def connection() -> Iterator[Any]:
+    conn = acquire()
+    broken = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    finally:
+        release(conn, broken=broken)
+
+
+class TransactionCursor:
+    '''
+    Cursor yielded by transaction(). Until one of its statements has succeeded, a connection
+    found dead (closed by the server, reset by the network) is replaced and the statement sent
+    again once: nothing can have run on the dead connection, so the caller never sees it.
+    Errors on a live connection (timeouts, deadlocks) are not retried.
+    '''
+
+    def __init__(self, conn: Any):
+        self.connection = conn
+        self.cursor = conn.cursor()
+        self.confirmed = False
+
+    def _run(self, method: str, *args: Any) -> Any:
+        if not self.confirmed:
+            try:
+                result = getattr(self.cursor, method)(*args)
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                if not self.connection.closed:
+                    raise
+                instrument.log('db_reconnect')
+                self.cursor.close()
+                release(self.connection, broken=True)
+                # Nothing left to release if no replacement can be had
+                self.connection = None
+                self.connection = acquire()
+                self.cursor = self.connection.cursor()
+            else:
+                self.confirmed = True
+                return result
+        result = getattr(self.cursor, method)(*args)
+        self.confirmed = True
+        return result
+
+    def execute(self, query: Any, vars: Any = None) -> Any:
+        return self._run('execute', query, vars)
+
+    def executemany(self, query: Any, vars_list: Any) -> Any:
+        return self._run('executemany', query, vars_list)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.cursor)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.cursor, name)
+
+
+@contextmanager
+def transaction() -> Iterator[Any]:
+    '''
+    Borrow a pooled connection and yield a cursor inside one transaction.
+    Commits on success and rolls back if the block raises.
+    '''
+    cursor = TransactionCursor(acquire())
+    broken = False
+    try:
+        yield cursor
+        with instrument.span('commit'):
+            cursor.connection.commit()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        # Timeouts and deadlocks leave the connection usable; only a lost one is discarded
+        broken = cursor.connection is not None and bool(cursor.connection.closed)
+        raise
+    finally:
+        cursor.cursor.close()
+        if cursor.connection is not None:
+            release(cursor.connection, broken=broken)
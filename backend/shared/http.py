@@ -0,0 +1,241 @@
+import base64
+import functools
+import gzip
+import json
+import math
+import os
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from . import instrument
+from .ratelimit import RateLimit
+
+# Optional accelerators: used when the function's requirements.txt ships them
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*'
+}
+
+# Bodies smaller than this are sent as is; compressing them costs more than it saves
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))
+
+
+class RawJSON(str):
+    '''
+    JSON text that is already serialized, e.g. built by Postgres with json_agg.
+    dumps() splices it into the output instead of encoding it again.
+    '''
+
+
+def _encode(value: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(value).decode('utf-8')
+    return json.dumps(value)
+
+
+def dumps(payload: Any) -> str:
+    '''
+    Serialize a response payload with the fastest available encoder.
+    Dicts are walked so RawJSON values at any dict nesting level are embedded verbatim.
+    '''
+    if isinstance(payload, RawJSON):
+        return str(payload)
+    if isinstance(payload, dict) and any(isinstance(value, (RawJSON, dict)) for value in payload.values()):
+        return '{' + ','.join(f'{json.dumps(str(key))}:{dumps(value)}' for key, value in payload.items()) + '}'
+    return _encode(payload)
+
+
+def get_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    headers = event.get('headers') or {}
+    lowered = name.lower()
+    for key, value in headers.items():
+        if key.lower() == lowered:
+            return value
+    return None
+
+
+def client_ip(event: Dict[str, Any]) -> Optional[str]:
+    '''
+    The caller's address as seen by the gateway, falling back to proxy headers; None when unknown.
+    '''
+    identity = (event.get('requestContext') or {}).get('identity') or {}
+    forwarded = get_header(event, 'X-Forwarded-For')
+    return identity.get('sourceIp') or (forwarded.split(',')[0].strip() if forwarded else None) or get_header(event, 'X-Real-IP')
+
+
+def response(status: int, body: str = '', headers: Optional[Dict[str, str]] = None,
+             is_base64: bool = False) -> Dict[str, Any]:
+    return {
+        'statusCode': status,
+        'headers': dict(headers if headers is not None else JSON_HEADERS),
+        'body': body,
+        'isBase64Encoded': is_base64
+    }
+
+
+def json_response(status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    with instrument.span('serialize'):
+        body = dumps(payload)
+    return response(status, body, {**JSON_HEADERS, **headers} if headers else JSON_HEADERS)
+
+
+def error(status: int, message: str, **extra: Any) -> Dict[str, Any]:
+    return response(status, json.dumps({'error': message, **extra}))
+
+
+def parse_json_body(event: Dict[str, Any]) -> Any:
+    '''
+    Decode the request body (base64 or plain) as JSON; an empty body is {}.
+    Raises ValueError on malformed input.
+    '''
+    raw_body = event.get('body') or ''
+    if event.get('isBase64Encoded') and raw_body:
+        raw_body = base64.b64decode(raw_body).decode('utf-8')
+    if not raw_body.strip():
+        return {}
+    return json.loads(raw_body)
+
+
+def _type_matches(value: Any, expected: Any) -> bool:
+    expected_types = expected if isinstance(expected, tuple) else (expected,)
+    if isinstance(value, bool) and bool not in expected_types:
+        return False
+    return isinstance(value, expected_types)
+
+
+def validate(body: Any, schema: Dict[str, Any]) -> Dict[str, str]:
+    '''
+    Check a JSON object against a declared schema of {field: type or tuple of types}.
+    Fields ending in "?" are optional; null counts as missing. Returns {field: problem}.
+    '''
+    if not isinstance(body, dict):
+        return {'': 'must be a JSON object'}
+    problems: Dict[str, str] = {}
+    for key, expected in schema.items():
+        optional = key.endswith('?')
+        field = key.rstrip('?')
+        value = body.get(field)
+        if value is None:
+            if not optional:
+                problems[field] = 'required'
+        elif not _type_matches(value, expected):
+            problems[field] = 'invalid type'
+    return problems
+
+
+def accepted_encodings(event: Dict[str, Any]) -> Tuple[str, ...]:
+    encodings = []
+    for token in (get_header(event, 'Accept-Encoding') or '').split(','):
+        name, _, params = token.partition(';')
+        params = params.replace(' ', '')
+        try:
+            quality = float(params[2:]) if params.startswith('q=') else 1.0
+        except ValueError:
+            quality = 1.0
+        if name.strip() and quality > 0:
+            encodings.append(name.strip().lower())
+    return tuple(encodings)
+
+
+def compress(event: Dict[str, Any], resp: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Compress a text body with brotli or gzip when the client accepts it.
+    Bodies that are small, already binary or already encoded are returned untouched.
+    '''
+    body = resp.get('body')
+    headers = resp.get('headers') or {}
+    if not isinstance(body, str) or resp.get('isBase64Encoded') or 'Content-Encoding' in headers:
+        return resp
+    if len(body) < COMPRESS_MIN_BYTES:
+        return resp
+
+    accepted = accepted_encodings(event)
+    if brotli is not None and 'br' in accepted:
+        encoding = 'br'
+    elif 'gzip' in accepted:
+        encoding = 'gzip'
+    else:
+        return resp
+
+    with instrument.span('compress'):
+        raw = body.encode('utf-8')
+        data = brotli.compress(raw, quality=5) if encoding == 'br' else gzip.compress(raw, compresslevel=6)
+
+    return {
+        **resp,
+        'headers': {**headers, 'Content-Encoding': encoding, 'Vary': 'Accept-Encoding'},
+        'body': base64.b64encode(data).decode('ascii'),
+        'isBase64Encoded': True
+    }
+
+
+def _preflight_response(methods: Tuple[str, ...], allow_headers: Sequence[str]) -> Dict[str, Any]:
+    return response(200, '', {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Methods': ', '.join(methods + ('OPTIONS',)),
+        'Access-Control-Allow-Headers': ', '.join(allow_headers),
+        'Access-Control-Max-Age': '86400'
+    })
+
+
+def rate_limited(retry_after: float) -> Dict[str, Any]:
+    seconds = max(1, math.ceil(retry_after))
+    return response(429, json.dumps({'error': 'Too many requests', 'retry_after': seconds}),
+                    {**JSON_HEADERS, 'Retry-After': str(seconds)})
+
+
+def endpoint(function_name: str, methods: Sequence[str], allow_headers: Sequence[str] = ('Content-Type',),
+             schema: Optional[Dict[str, Any]] = None, rate_limit: Optional[RateLimit] = None) -> Callable:
+    '''
+    Turn a function into a handler(event, context) for the listed methods.
+    Preflight and 405 responses are built once at import and returned without touching the
+    database. With a rate_limit, a client over its budget gets a 429 before the body is read.
+    With a schema the JSON body is parsed and validated once and passed as a
+    third argument; malformed or invalid bodies get a 400 before the function runs.
+    Timer triggers carry no httpMethod and are treated as GET. Responses are compressed
+    per Accept-Encoding on the way out.
+    '''
+    allowed = tuple(methods)
+    preflight = _preflight_response(allowed, allow_headers)
+    not_allowed = response(405, json.dumps({'error': 'Method not allowed'}))
+
+    def decorator(fn: Callable) -> Callable[[Dict[str, Any], Any], Dict[str, Any]]:
+        @instrument.instrumented(function_name)
+        @functools.wraps(fn)
+        def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+            method = event.get('httpMethod') or 'GET'
+            if method == 'OPTIONS':
+                return {**preflight, 'headers': dict(preflight['headers'])}
+            if method not in allowed:
+                return {**not_allowed, 'headers': dict(not_allowed['headers'])}
+            if rate_limit is not None:
+                client = client_ip(event)
+                if client is None:
+                    # Never throttle everyone together because the gateway left out the address
+                    instrument.increment(f'rate_limit_unidentified.{function_name}')
+                else:
+                    retry_after = rate_limit.check(client)
+                    if retry_after:
+                        return rate_limited(retry_after)
+            if schema is None:
+                return compress(event, fn(event, context))
+
+            try:
+                body = parse_json_body(event)
+            except (ValueError, UnicodeDecodeError):
+                return error(400, 'Invalid JSON body')
+            problems = validate(body, schema)
+            if problems:
+                return error(400, 'Invalid request body', fields=problems)
+            return compress(event, fn(event, context, body))
+        return handler
+    return decorator
@@ -0,0 +1,172 @@
+import bisect
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# One JSON line per request on stdout; set REQUEST_LOG=0 to silence (e.g. in benchmarks)
+REQUEST_LOG = os.environ.get('REQUEST_LOG', '1') != '0'
+# In-process latency histograms per function and phase, flushed with the counters
+HISTOGRAMS_ENABLED = os.environ.get('METRICS_HISTOGRAMS', '0') == '1'
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Histograms and counters are written as one `metrics` log line per container this often, then reset
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', '60'))
+
+_current: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar('request_record', default=None)
+_histograms: Dict[str, List[int]] = {}
+_histograms_lock = threading.Lock()
+# Event counters (e.g. dropped requests) since the last metrics line
+_counters: Dict[str, int] = {}
+_last_flush = time.monotonic()
+
+
+def current() -> Optional[Dict[str, Any]]:
+    return _current.get()
+
+
+def _add_ms(record: Dict[str, Any], key: str, seconds: float) -> None:
+    record['timings'][key] = record['timings'].get(key, 0.0) + seconds * 1000
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    '''
+    Add the duration of the block to the current request under `<name>_ms`.
+    Outside an instrumented request this is a no-op apart from the timer.
+    '''
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record = _current.get()
+        if record is not None:
+            _add_ms(record, name, time.perf_counter() - started)
+
+
+def record_query(seconds: float, rowcount: int) -> None:
+    record = _current.get()
+    if record is None:
+        return
+    _add_ms(record, 'query', seconds)
+    record['queries'] += 1
+    if rowcount > 0:
+        record['rows'] += rowcount
+
+
+def log(event: str, **fields: Any) -> None:
+    '''
+    Emit a structured log line tagged with the current request id.
+    '''
+    record = _current.get()
+    line = {'event': event, **fields}
+    if record is not None:
+        line.setdefault('request_id', record['request_id'])
+        line.setdefault('function', record['function'])
+    print(json.dumps(line, ensure_ascii=False, default=str), file=sys.stdout, flush=True)
+
+
+def _observe(name: str, value_ms: float) -> None:
+    index = bisect.bisect_left(HISTOGRAM_BUCKETS_MS, value_ms)
+    with _histograms_lock:
+        counts = _histograms.setdefault(name, [0] * (len(HISTOGRAM_BUCKETS_MS) + 1))
+        counts[index] += 1
+
+
+def increment(name: str, amount: int = 1) -> None:
+    '''
+    Count an event; it also appears under `counters` on the current request's log line.
+    '''
+    record = _current.get()
+    if record is not None:
+        record['counters'][name] = record['counters'].get(name, 0) + amount
+    with _histograms_lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def flush_metrics() -> None:
+    '''
+    Write the histograms ({"<function>.<phase>": {"le_<ms>": count, ..., "le_inf": count}}) and
+    counters collected since the last flush as one `metrics` log line and start over. Called after
+    every request; does nothing until METRICS_FLUSH_SECONDS have passed.
+    '''
+    global _last_flush
+    now = time.monotonic()
+    with _histograms_lock:
+        if now - _last_flush < METRICS_FLUSH_SECONDS:
+            return
+        interval = now - _last_flush
+        _last_flush = now
+        labels = [f'le_{bucket}' for bucket in HISTOGRAM_BUCKETS_MS] + ['le_inf']
+        snapshot_histograms = {name: dict(zip(labels, counts)) for name, counts in _histograms.items()}
+        snapshot_counters = dict(_counters)
+        _histograms.clear()
+        _counters.clear()
+    if snapshot_histograms or snapshot_counters:
+        line = {'event': 'metrics', 'interval_s': round(interval, 1),
+                'histograms': snapshot_histograms, 'counters': snapshot_counters}
+        print(json.dumps(line), file=sys.stdout, flush=True)
+
+
+def instrumented(function_name: str) -> Callable:
+    '''
+    Decorate a handler(event, context) so connect, query and serialize time, query and row
+    counts are collected for the invocation and written as one JSON log line when it ends.
+    '''
+    def decorator(handler: Callable[[Dict[str, Any], Any], Dict[str, Any]]) -> Callable:
+        @functools.wraps(handler)
+        def wrapper(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+            record: Dict[str, Any] = {
+                'request_id': getattr(context, 'request_id', None),
+                'function': function_name,
+                'method': event.get('httpMethod'),
+                'timings': {},
+                'queries': 0,
+                'rows': 0,
+                'counters': {}
+            }
+            token = _current.set(record)
+            started = time.perf_counter()
+            status: Optional[int] = None
+            error: Optional[str] = None
+            try:
+                response = handler(event, context)
+                status = response.get('statusCode')
+                return response
+            except Exception as exc:
+                error = type(exc).__name__
+                raise
+            finally:
+                duration_ms = (time.perf_counter() - started) * 1000
+                _current.reset(token)
+                timings = {f'{key}_ms': round(value, 2) for key, value in record['timings'].items()}
+
+                if HISTOGRAMS_ENABLED:
+                    _observe(f'{function_name}.total', duration_ms)
+                    for key, value in record['timings'].items():
+                        _observe(f'{function_name}.{key}', value)
+
+                if REQUEST_LOG:
+                    line = {
+                        'event': 'request',
+                        'request_id': record['request_id'],
+                        'function': function_name,
+                        'method': record['method'],
+                        'status': status,
+                        'duration_ms': round(duration_ms, 2),
+                        **timings,
+                        'queries': record['queries'],
+                        'rows': record['rows']
+                    }
+                    if record['counters']:
+                        line['counters'] = record['counters']
+                    if error:
+                        line['error'] = error
+                    print(json.dumps(line), file=sys.stdout, flush=True)
+                    flush_metrics()
+        return wrapper
+    return decorator
@@ -0,0 +1,237 @@
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Stock held for a checkout goes back on sale if no order arrives within this many seconds
+HOLD_SECONDS = int(os.environ.get('STOCK_HOLD_SECONDS', '900'))
+# Open checkouts (distinct tokens) holding stock per client IP, and cart lines per checkout
+MAX_HOLDS_PER_IP = int(os.environ.get('MAX_STOCK_HOLDS_PER_IP', '5'))
+MAX_HOLD_LINES = int(os.environ.get('MAX_STOCK_HOLD_LINES', '20'))
+
+# (product_id, size); size is '' for products without sizes
+Sku = Tuple[str, str]
+
+
+class OutOfStock(Exception):
+    '''
+    Raised inside the order or hold transaction, so everything taken before it is rolled back.
+    errors holds one {product_id, size, code, message, available} entry per short SKU.
+    '''
+
+    def __init__(self, errors: List[Dict[str, Any]]):
+        super().__init__('Not enough stock')
+        self.errors = errors
+
+
+class TooManyHolds(Exception):
+    '''
+    Raised before anything is held when the client IP already has MAX_HOLDS_PER_IP open
+    checkouts. retry_after is the number of seconds until the first of them expires.
+    '''
+
+    def __init__(self, retry_after: float):
+        super().__init__('Too many open checkouts')
+        self.retry_after = retry_after
+
+
+def sku_quantities(items: Iterable[Dict[str, Any]]) -> Dict[Sku, int]:
+    quantities: Dict[Sku, int] = defaultdict(int)
+    for item in items:
+        quantities[(str(item['id']), item.get('size') or '')] += item['quantity']
+    return dict(quantities)
+
+
+def _sku_arrays(skus: Iterable[Sku]) -> Tuple[List[str], List[str]]:
+    skus = list(skus)
+    return [sku[0] for sku in skus], [sku[1] for sku in skus]
+
+
+def _sum_returned(rows: Iterable[Tuple[str, str, int]], into: Optional[Dict[Sku, int]] = None) -> Dict[Sku, int]:
+    returned: Dict[Sku, int] = defaultdict(int, into or {})
+    for product_id, size, quantity in rows:
+        returned[(product_id, size)] += quantity
+    return dict(returned)
+
+
+def _release_token(cursor, token: str) -> List[Tuple[str, str, int]]:
+    # All holds of the token, expired or not; each row is deleted (and counted) by one transaction only
+    cursor.execute(
+        "DELETE FROM t_p54427834_mission_dark_store.stock_holds WHERE token = %s RETURNING product_id, size, quantity",
+        (token,)
+    )
+    return cursor.fetchall()
+
+
+def _release_expired(cursor, skus: Iterable[Sku]) -> List[Tuple[str, str, int]]:
+    # Expired holds of these SKUs only, skipping any another checkout has locked (it is releasing them):
+    # waiting here could deadlock against a _release_token. release-stock-holds sweeps the rest.
+    product_ids, sizes = _sku_arrays(skus)
+    if not product_ids:
+        return []
+    cursor.execute(
+        '''
+        DELETE FROM t_p54427834_mission_dark_store.stock_holds
+        WHERE id IN (
+            SELECT id FROM t_p54427834_mission_dark_store.stock_holds
+            WHERE (product_id, size) IN (SELECT * FROM unnest(%s::text[], %s::text[]))
+              AND expires_at <= CURRENT_TIMESTAMP
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING product_id, size, quantity
+        ''',
+        (product_ids, sizes)
+    )
+    return cursor.fetchall()
+
+
+def _apply(cursor, needed: Dict[Sku, int], released: Dict[Sku, int]) -> List[Sku]:
+    '''
+    Take needed minus released from each tracked SKU (a negative difference puts stock back).
+    Rows are locked in key order so concurrent multi-SKU checkouts cannot deadlock, and
+    nothing is written unless every SKU has enough. Returns the stock-tracked SKUs.
+    '''
+    skus = sorted(set(needed) | set(released))
+    if not skus:
+        return []
+    product_ids, sizes = _sku_arrays(skus)
+    cursor.execute(
+        '''
+        SELECT product_id, size, quantity FROM t_p54427834_mission_dark_store.product_stock
+        WHERE (product_id, size) IN (SELECT * FROM unnest(%s::text[], %s::text[]))
+        ORDER BY product_id, size
+        FOR UPDATE
+        ''',
+        (product_ids, sizes)
+    )
+    current = {(row[0], row[1]): row[2] for row in cursor.fetchall()}
+
+    deltas = {sku: needed.get(sku, 0) - released.get(sku, 0) for sku in skus if sku in current}
+    errors = [
+        {
+            'product_id': sku[0],
+            'size': sku[1] or None,
+            'code': 'out_of_stock',
+            'message': 'Not enough stock',
+            'available': current[sku] + released.get(sku, 0)
+        }
+        for sku, delta in deltas.items() if delta > current[sku]
+    ]
+    if errors:
+        raise OutOfStock(errors)
+
+    changed = [sku for sku, delta in deltas.items() if delta]
+    if changed:
+        product_ids, sizes = _sku_arrays(changed)
+        cursor.execute(
+            '''
+            UPDATE t_p54427834_mission_dark_store.product_stock s
+            SET quantity = s.quantity - v.delta, updated_at = CURRENT_TIMESTAMP
+            FROM unnest(%s::text[], %s::text[], %s::int[]) AS v(product_id, size, delta)
+            WHERE s.product_id = v.product_id AND s.size = v.size
+            ''',
+            (product_ids, sizes, [deltas[sku] for sku in changed])
+        )
+    return list(current)
+
+
+def hold(cursor, token: str, items: List[Dict[str, Any]], client_ip: Optional[str] = None) -> Optional[datetime]:
+    '''
+    Replace the token's holds with the given cart lines, taking stock for them now.
+    An empty cart just releases the holds. Returns when the holds expire, or None when
+    nothing in the cart is stock-tracked. Raises OutOfStock, or TooManyHolds when
+    client_ip already holds stock for MAX_HOLDS_PER_IP other tokens.
+    '''
+    needed = sku_quantities(items)
+    if needed and client_ip:
+        # Serialises the count and the insert per IP, so a burst of new tokens cannot slip past the cap
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f'stock_holds:{client_ip}',))
+        cursor.execute(
+            '''
+            SELECT COUNT(DISTINCT token), EXTRACT(EPOCH FROM MIN(expires_at) - CURRENT_TIMESTAMP)
+            FROM t_p54427834_mission_dark_store.stock_holds
+            WHERE client_ip = %s AND token <> %s AND expires_at > CURRENT_TIMESTAMP
+            ''',
+            (client_ip, token)
+        )
+        open_tokens, retry_after = cursor.fetchone()
+        if open_tokens >= MAX_HOLDS_PER_IP:
+            raise TooManyHolds(float(retry_after))
+
+    released = _sum_returned(_release_token(cursor, token))
+    released = _sum_returned(_release_expired(cursor, needed), into=released)
+    tracked = [sku for sku in _apply(cursor, needed, released) if needed.get(sku)]
+    if not tracked:
+        return None
+
+    product_ids, sizes = _sku_arrays(tracked)
+    cursor.execute(
+        '''
+        INSERT INTO t_p54427834_mission_dark_store.stock_holds (token, product_id, size, quantity, expires_at, client_ip)
+        SELECT %s, v.product_id, v.size, v.quantity, CURRENT_TIMESTAMP + %s * INTERVAL '1 second', %s
+        FROM unnest(%s::text[], %s::text[], %s::int[]) AS v(product_id, size, quantity)
+        RETURNING expires_at
+        ''',
+        (token, HOLD_SECONDS, client_ip, product_ids, sizes, [needed[sku] for sku in tracked])
+    )
+    return cursor.fetchall()[0][0]
+
+
+def take(cursor, token: Optional[str], items: List[Dict[str, Any]]) -> None:
+    '''
+    Take stock for an order inside its transaction. Holds made under the order's
+    Idempotency-Key are converted; whatever they do not cover is taken now. Raises OutOfStock.
+    '''
+    needed = sku_quantities(items)
+    released = _sum_returned(_release_token(cursor, token)) if token else {}
+    released = _sum_returned(_release_expired(cursor, needed), into=released)
+    _apply(cursor, needed, released)
+
+
+def release_expired(cursor, limit: int) -> int:
+    '''
+    Put up to `limit` expired holds back on sale; returns how many were released.
+    Holds being converted by a checkout right now are skipped, not waited for.
+    '''
+    cursor.execute(
+        '''
+        DELETE FROM t_p54427834_mission_dark_store.stock_holds
+        WHERE id IN (
+            SELECT id FROM t_p54427834_mission_dark_store.stock_holds
+            WHERE expires_at <= CURRENT_TIMESTAMP
+            ORDER BY expires_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING product_id, size, quantity
+        ''',
+        (limit,)
+    )
+    rows = cursor.fetchall()
+    _apply(cursor, {}, _sum_returned(rows))
+    return len(rows)
+
+
+def set_stock(cursor, product_id: str, stock: Dict[str, Optional[int]]) -> None:
+    '''
+    Set the sellable quantity per size (key '' for products without sizes); None stops
+    tracking that size. Quantities exclude stock currently held by open checkouts.
+    '''
+    tracked = {size: quantity for size, quantity in stock.items() if quantity is not None}
+    untracked = [size for size, quantity in stock.items() if quantity is None]
+    if tracked:
+        cursor.execute(
+            '''
+            INSERT INTO t_p54427834_mission_dark_store.product_stock (product_id, size, quantity)
+            SELECT %s, v.size, v.quantity FROM unnest(%s::text[], %s::int[]) AS v(size, quantity)
+            ORDER BY v.size
+            ON CONFLICT (product_id, size)
+            DO UPDATE SET quantity = EXCLUDED.quantity, updated_at = CURRENT_TIMESTAMP
+            ''',
+            (product_id, list(tracked), list(tracked.values()))
+        )
+    if untracked:
+        cursor.execute(
+            "DELETE FROM t_p54427834_mission_dark_store.product_stock WHERE product_id = %s AND size = ANY(%s)",
+            (product_id, untracked)
+        )
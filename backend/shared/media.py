@@ -0,0 +1,213 @@
+import base64
+import http.client
+import ipaddress
+import os
+import socket
+import tempfile
+from typing import Any, List, Optional, Tuple
+from urllib.parse import SplitResult, unquote_to_bytes, urljoin, urlsplit
+
+# Filesystem storage standing in for the CDN: MEDIA_ROOT must outlive the function instance (a function's
+# own /tmp does not) and be served at the absolute MEDIA_BASE_URL. The devserver sets both for itself.
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', '')
+MEDIA_BASE_URL = os.environ.get('MEDIA_BASE_URL', '').rstrip('/')
+
+# Hosts process-media may download source images from, comma-separated; '.example.com' also
+# matches its subdomains. Image URLs are set through the admin panel, so anything else is refused.
+MEDIA_SOURCE_HOSTS = tuple(
+    host.strip().lower() for host in os.environ.get('MEDIA_SOURCE_HOSTS', 'cdn.poehali.dev').split(',') if host.strip()
+)
+MEDIA_SOURCE_SCHEMES = ('https', 'http') if os.environ.get('MEDIA_SOURCE_ALLOW_HTTP') == '1' else ('https',)
+MAX_SOURCE_REDIRECTS = 3
+
+# Every image a product shows: the main image first, then the gallery
+PRODUCT_IMAGE_URLS = 'array_prepend(p.image, COALESCE(p.images, ARRAY[]::text[]))'
+
+# Rebuild products.media from the ready variant manifests, keeping the product's image order.
+# Rows whose manifest did not change are left alone, so the catalog version only moves on real changes.
+REFRESH_MANIFESTS_SQL = f'''
+    WITH manifests AS (
+        SELECT p.id,
+               COALESCE(jsonb_agg(m.manifest ORDER BY u.position) FILTER (WHERE m.manifest IS NOT NULL), '[]'::jsonb) AS media
+        FROM t_p54427834_mission_dark_store.products p
+        CROSS JOIN LATERAL (
+            SELECT url, MIN(position) AS position
+            FROM unnest({PRODUCT_IMAGE_URLS}) WITH ORDINALITY AS image_urls(url, position)
+            GROUP BY url
+        ) u
+        LEFT JOIN t_p54427834_mission_dark_store.product_media m ON m.source_url = u.url AND m.status = 'ready'
+        WHERE {{condition}}
+        GROUP BY p.id
+    )
+    UPDATE t_p54427834_mission_dark_store.products p
+    SET media = manifests.media, updated_at = CURRENT_TIMESTAMP
+    FROM manifests
+    WHERE p.id = manifests.id AND p.media IS DISTINCT FROM manifests.media
+    RETURNING p.id
+'''
+
+
+def storage_problem() -> Optional[str]:
+    '''
+    Explain why variants written now would not be reachable from the storefront, or return None.
+    '''
+    if not MEDIA_ROOT:
+        return 'MEDIA_ROOT is not set to persistent storage'
+    base_url = urlsplit(MEDIA_BASE_URL)
+    if base_url.scheme not in ('http', 'https') or not base_url.netloc:
+        return 'MEDIA_BASE_URL must be an absolute http(s) URL'
+    return None
+
+
+class UnsafeSource(ValueError):
+    '''
+    Raised for a source image URL the worker must not fetch; retrying cannot help.
+    '''
+
+
+def host_allowed(host: str) -> bool:
+    return any(host == allowed or (allowed.startswith('.') and host.endswith(allowed)) for allowed in MEDIA_SOURCE_HOSTS)
+
+
+def resolve_source(url: str) -> Tuple[SplitResult, str]:
+    '''
+    Check a source URL against the scheme and host allowlists and resolve its host. Every address
+    must be public, so DNS cannot point the worker at internal or metadata endpoints.
+    Returns the parsed URL and the address to connect to. Raises UnsafeSource.
+    '''
+    parts = urlsplit(url)
+    if parts.scheme not in MEDIA_SOURCE_SCHEMES:
+        raise UnsafeSource(f'Scheme {parts.scheme!r} is not allowed for source images')
+    host = (parts.hostname or '').lower()
+    if not host_allowed(host):
+        raise UnsafeSource(f'Host {host!r} is not in MEDIA_SOURCE_HOSTS')
+    try:
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        addresses = sorted({info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)})
+    except (OSError, ValueError) as e:
+        raise UnsafeSource(f'Cannot resolve {host!r}: {e}')
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%')[0])
+        if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global:
+            raise UnsafeSource(f'Host {host!r} resolves to non-public address {address}')
+    return parts, addresses[0]
+
+
+class _PinnedHTTPConnection(http.client.HTTPConnection):
+    # Connects to the address resolve_source() checked, not whatever DNS answers next
+    def __init__(self, host: str, address: str, **kwargs: Any):
+        super().__init__(host, **kwargs)
+        self.address = address
+
+    def connect(self) -> None:
+        self.sock = socket.create_connection((self.address, self.port), self.timeout)
+
+
+class _PinnedHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, host: str, address: str, **kwargs: Any):
+        super().__init__(host, **kwargs)
+        self.address = address
+
+    def connect(self) -> None:
+        sock = socket.create_connection((self.address, self.port), self.timeout)
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+
+def download_source(url: str, timeout: float, max_bytes: int) -> bytes:
+    '''
+    Fetch a source image. data: URLs (admin uploads) are decoded locally; network URLs must pass
+    resolve_source(), as must every redirect. Raises UnsafeSource or ValueError.
+    '''
+    if url.startswith('data:'):
+        header, _, payload = url.partition(',')
+        data = base64.b64decode(payload) if header.endswith(';base64') else unquote_to_bytes(payload)
+        if len(data) > max_bytes:
+            raise ValueError(f'Source image is larger than {max_bytes} bytes')
+        return data
+
+    for _ in range(MAX_SOURCE_REDIRECTS + 1):
+        parts, address = resolve_source(url)
+        connection_class = _PinnedHTTPSConnection if parts.scheme == 'https' else _PinnedHTTPConnection
+        connection = connection_class(parts.hostname, address, port=parts.port, timeout=timeout)
+        try:
+            connection.request('GET', (parts.path or '/') + (f'?{parts.query}' if parts.query else ''))
+            response = connection.getresponse()
+            location = response.getheader('Location')
+            if response.status in (301, 302, 303, 307, 308) and location:
+                url = urljoin(url, location)
+                continue
+            if response.status != 200:
+                raise ValueError(f'Source image request failed with HTTP {response.status}')
+            data = response.read(max_bytes + 1)
+        finally:
+            connection.close()
+        if len(data) > max_bytes:
+            raise ValueError(f'Source image is larger than {max_bytes} bytes')
+        return data
+    raise ValueError('Too many redirects for source image')
+
+
+class LocalStorage:
+    '''
+    Content-addressed file store: put() writes under MEDIA_ROOT and returns the public URL.
+    '''
+
+    def __init__(self, root: str = MEDIA_ROOT, base_url: str = MEDIA_BASE_URL):
+        self.root = root
+        self.base_url = base_url
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split('/'))
+
+    def put(self, key: str, data: bytes) -> str:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so readers never see a partial file; worker threads of one process
+        # may write the same key at once, so each gets its own temp file
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix='.tmp', delete=False) as output:
+            output.write(data)
+        try:
+            # mkstemp files are private; variants are served to everyone
+            os.chmod(output.name, 0o644)
+            os.replace(output.name, path)
+        except OSError:
+            os.unlink(output.name)
+            raise
+        return f'{self.base_url}/{key}'
+
+
+def enqueue_product_images(cursor, product_ids: List[Any]) -> None:
+    '''
+    Queue the products' images for variant generation and drop manifests of images they no
+    longer show. Images that failed before are queued again with fresh attempts.
+    Call inside the transaction that changed the images.
+    '''
+    cursor.execute(
+        f'''
+        INSERT INTO t_p54427834_mission_dark_store.product_media AS m (source_url)
+        SELECT DISTINCT unnest({PRODUCT_IMAGE_URLS})
+        FROM t_p54427834_mission_dark_store.products p
+        WHERE p.id = ANY(%s)
+        ON CONFLICT (source_url) DO UPDATE
+        SET status = 'pending', attempts = 0, next_attempt_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+        WHERE m.status = 'failed'
+        ''',
+        ([str(product_id) for product_id in product_ids],)
+    )
+    cursor.execute(
+        REFRESH_MANIFESTS_SQL.format(condition='p.id = ANY(%s)'),
+        ([str(product_id) for product_id in product_ids],)
+    )
+
+
+def refresh_manifests_for_sources(cursor, source_urls: List[str]) -> List[str]:
+    '''
+    Rebuild products.media for every product showing one of the source images; returns product ids.
+    '''
+    cursor.execute(
+        REFRESH_MANIFESTS_SQL.format(condition='(p.image = ANY(%s) OR p.images && %s)'),
+        (source_urls, source_urls)
+    )
+    return [row[0] for row in cursor.fetchall()]
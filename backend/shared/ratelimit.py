@@ -0,0 +1,108 @@
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+from . import db
+from . import instrument
+
+# RATE_LIMIT_SHARED=0 keeps the limits per warm container and skips the rate_limits table
+SHARED = os.environ.get('RATE_LIMIT_SHARED', '1') != '0'
+# Least recently seen clients are forgotten past this many per container
+MAX_LOCAL_CLIENTS = 10000
+# Rows idle this long describe a full bucket and are pruned now and then
+IDLE_SECONDS = 24 * 3600
+PRUNE_PROBABILITY = 0.001
+# Drops refused by the in-process bucket reach rate_limits.dropped with the client's next shared
+# check, or in one write once this many have piled up
+LOCAL_DROP_FLUSH = 100
+
+_REFILLED = 'LEAST(%(burst)s, r.tokens + EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - r.updated_at)) * %(rate)s)'
+
+# Refill, take a token if one is there and count the drop otherwise (plus any local drops), in one round trip
+TAKE_TOKEN_SQL = f'''
+    INSERT INTO t_p54427834_mission_dark_store.rate_limits AS r (bucket, tokens, allowed, dropped, updated_at)
+    VALUES (%(bucket)s, %(burst)s - 1, true, %(local_dropped)s, CURRENT_TIMESTAMP)
+    ON CONFLICT (bucket) DO UPDATE SET
+        tokens = {_REFILLED} - CASE WHEN {_REFILLED} >= 1 THEN 1 ELSE 0 END,
+        allowed = {_REFILLED} >= 1,
+        dropped = r.dropped + %(local_dropped)s + CASE WHEN {_REFILLED} >= 1 THEN 0 ELSE 1 END,
+        updated_at = CURRENT_TIMESTAMP
+    RETURNING allowed, tokens
+'''
+
+ADD_DROPS_SQL = '''
+    INSERT INTO t_p54427834_mission_dark_store.rate_limits AS r (bucket, tokens, allowed, dropped, updated_at)
+    VALUES (%(bucket)s, 0, false, %(local_dropped)s, CURRENT_TIMESTAMP)
+    ON CONFLICT (bucket) DO UPDATE SET dropped = r.dropped + EXCLUDED.dropped
+'''
+
+
+class RateLimit:
+    '''
+    Token bucket per client for one scope: `rate` requests per second on average, up to `burst` at once.
+    Checked in process first, so a flood against a warm container is refused without touching the
+    database, then against the rate_limits table so every container shares one budget per client.
+    '''
+
+    def __init__(self, scope: str, rate: float, burst: int, shared: bool = SHARED):
+        self.scope = scope
+        self.rate = rate
+        self.burst = burst
+        self.shared = shared
+        # client -> (tokens, last refill, drops not yet counted in rate_limits)
+        self._buckets: 'OrderedDict[str, Tuple[float, float, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _take_local(self, client: str) -> Tuple[float, int]:
+        '''
+        Returns the wait (0 when a token was taken) and the local drops to add to rate_limits now.
+        '''
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, dropped = self._buckets.pop(client, (float(self.burst), now, 0))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                wait, tokens, flush = 0.0, tokens - 1, dropped
+            else:
+                wait, dropped = (1 - tokens) / self.rate, dropped + 1
+                flush = dropped if dropped >= LOCAL_DROP_FLUSH else 0
+            self._buckets[client] = (tokens, now, dropped - flush)
+            if len(self._buckets) > MAX_LOCAL_CLIENTS:
+                self._buckets.popitem(last=False)
+        return wait, flush
+
+    def _take_shared(self, client: str, local_dropped: int) -> float:
+        with db.transaction() as cursor:
+            cursor.execute(TAKE_TOKEN_SQL, {'bucket': f'{self.scope}:{client}', 'rate': self.rate, 'burst': self.burst,
+                                            'local_dropped': local_dropped})
+            allowed, tokens = cursor.fetchone()
+            if random.random() < PRUNE_PROBABILITY:
+                cursor.execute(
+                    "DELETE FROM t_p54427834_mission_dark_store.rate_limits WHERE updated_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 second'",
+                    (IDLE_SECONDS,)
+                )
+        return 0.0 if allowed else (1 - tokens) / self.rate
+
+    def _add_drops(self, client: str, local_dropped: int) -> None:
+        with db.transaction() as cursor:
+            cursor.execute(ADD_DROPS_SQL, {'bucket': f'{self.scope}:{client}', 'local_dropped': local_dropped})
+
+    def check(self, client: str) -> float:
+        '''
+        Take a token for the client. Returns 0 when the request may proceed, otherwise the
+        seconds until it may retry. Drops are counted as rate_limited.<scope> on the request
+        log line and, with shared limits, in rate_limits.dropped.
+        '''
+        wait, local_dropped = self._take_local(client)
+        if self.shared and not wait:
+            with instrument.span('rate_limit'):
+                wait = self._take_shared(client, local_dropped)
+        elif self.shared and local_dropped:
+            with instrument.span('rate_limit'):
+                self._add_drops(client, local_dropped)
+        if wait:
+            instrument.increment(f'rate_limited.{self.scope}')
+        return wait
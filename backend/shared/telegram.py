@@ -0,0 +1,228 @@
+import html
+import http.client
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from . import instrument
+
+TELEGRAM_API_URL = os.environ.get('TELEGRAM_API_URL', 'https://api.telegram.org')
+REQUEST_TIMEOUT = float(os.environ.get('TELEGRAM_TIMEOUT', '10'))
+# Telegram allows about one message per second into a single chat, with short bursts
+RATE_PER_SECOND = float(os.environ.get('TELEGRAM_RATE_PER_SECOND', '1'))
+BURST = int(os.environ.get('TELEGRAM_BURST', '3'))
+MAX_MESSAGE_LENGTH = 4096
+
+
+class TelegramNotConfigured(Exception):
+    pass
+
+
+class TelegramError(Exception):
+    pass
+
+
+class TelegramRateLimited(TelegramError):
+    def __init__(self, retry_after: float):
+        super().__init__(f'Telegram rate limit, retry after {retry_after:g}s')
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    '''
+    Blocking token bucket; pause() empties it for a 429 retry_after window.
+    '''
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _wait_time(self, now: float) -> float:
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def acquire(self, max_wait: float) -> float:
+        '''
+        Take a token, sleeping up to max_wait for one. Returns 0 on success, otherwise the
+        wait that would have been needed.
+        '''
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._wait_time(now)
+                if wait == 0.0:
+                    self.tokens -= 1
+                    return 0.0
+            if now + wait > deadline:
+                return wait
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+            self.updated = self.blocked_until
+
+
+# Warm-container state: one bucket per chat, one keep-alive connection per thread
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_credentials() -> Dict[str, str]:
+    bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
+    chat_id = os.environ.get('TELEGRAM_CHAT_ID')
+    if not bot_token or not chat_id:
+        raise TelegramNotConfigured('Telegram bot token or chat ID not configured')
+    return {'bot_token': bot_token, 'chat_id': chat_id}
+
+
+def _escape(value: Any) -> str:
+    # Messages are sent with parse_mode=HTML: unescaped customer text ('<', '&') makes Telegram reject them
+    return html.escape(str(value))
+
+
+def format_order_message(order_data: Dict[str, Any]) -> str:
+    order_id = _escape(order_data.get('id'))
+    name = _escape(order_data.get('name'))
+    phone = _escape(order_data.get('phone'))
+    email = _escape(order_data.get('email', ''))
+    telegram = _escape(order_data.get('telegram', ''))
+    address = _escape(order_data.get('address', ''))
+    items = order_data.get('items', [])
+    total = _escape(order_data.get('total', 0))
+
+    items_text = '\n'.join([
+        f"  • {_escape(item['name'])}{' - ' + _escape(item['size']) if item.get('size') else ''} "
+        f"(x{_escape(item['quantity'])}) - {_escape(item['price'])}₽"
+        for item in items
+    ])
+
+    telegram_text = f"\n💬 <b>Telegram:</b> @{telegram}" if telegram else ""
+
+    return f"""<b>🛍️ Новый заказ #{order_id}</b>
+
+👤 <b>Клиент:</b> {name}
+📱 <b>Телефон:</b> {phone}
+📧 <b>Email:</b> {email}{telegram_text}
+📍 <b>Адрес:</b> {address}
+
+<b>Товары:</b>
+{items_text}
+
+💰 <b>Итого:</b> {total}₽"""
+
+
+def format_order_digest(orders: List[Dict[str, Any]]) -> List[Tuple[int, str]]:
+    '''
+    Summarize many orders as short lines, split into as few messages as Telegram's length limit allows.
+    Returns (number of orders covered, message) pairs in input order.
+    '''
+    lines = [
+        f"• <b>#{_escape(order.get('id'))}</b> {_escape(order.get('name', ''))}, "
+        f"{_escape(order.get('phone', ''))} — {_escape(order.get('total', 0))}₽"
+        for order in orders
+    ]
+    # Leave room for the header line
+    budget = MAX_MESSAGE_LENGTH - 64
+    chunks: List[List[str]] = [[]]
+    size = 0
+    for line in lines:
+        if chunks[-1] and size + len(line) + 1 > budget:
+            chunks.append([])
+            size = 0
+        chunks[-1].append(line)
+        size += len(line) + 1
+    return [(len(chunk), f"<b>📦 Новые заказы: {len(chunk)}</b>\n\n" + '\n'.join(chunk)) for chunk in chunks if chunk]
+
+
+def get_bucket(chat_id: str) -> TokenBucket:
+    with _buckets_lock:
+        if chat_id not in _buckets:
+            _buckets[chat_id] = TokenBucket(RATE_PER_SECOND, BURST)
+        return _buckets[chat_id]
+
+
+def _connection() -> Tuple[http.client.HTTPConnection, bool]:
+    '''
+    Return this thread's keep-alive connection to the API and whether it was reused.
+    '''
+    parts = urlsplit(TELEGRAM_API_URL)
+    key = (parts.scheme, parts.netloc)
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and getattr(_local, 'key', None) == key:
+        return conn, True
+    if conn is not None:
+        conn.close()
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    _local.conn = connection_class(parts.netloc, timeout=REQUEST_TIMEOUT)
+    _local.key = key
+    return _local.conn, False
+
+
+def _post_json(path: str, payload: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+    data = json.dumps(payload).encode('utf-8')
+    headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+    base_path = urlsplit(TELEGRAM_API_URL).path.rstrip('/')
+    for _ in range(2):
+        conn, reused = _connection()
+        try:
+            conn.request('POST', base_path + path, body=data, headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            _local.conn = None
+            # A kept-alive socket may have been closed by the server; retry once on a fresh one
+            if reused:
+                continue
+            raise
+        if response.getheader('Connection', '').lower() == 'close':
+            conn.close()
+            _local.conn = None
+        try:
+            return response.status, json.loads(body.decode('utf-8') or '{}')
+        except ValueError:
+            return response.status, {'ok': False, 'description': body[:200].decode('utf-8', 'replace')}
+    raise TelegramError('Telegram connection failed')
+
+
+def send_message(message: str, credentials: Optional[Dict[str, str]] = None,
+                 max_wait: float = REQUEST_TIMEOUT) -> Dict[str, Any]:
+    '''
+    Send an HTML message to the configured chat over a keep-alive connection.
+    Waits up to max_wait for the chat's token bucket. Raises TelegramRateLimited when the
+    bucket or a 429 answer says to back off, TelegramError on other API errors and
+    TelegramNotConfigured without credentials.
+    '''
+    credentials = credentials or get_credentials()
+    bucket = get_bucket(credentials['chat_id'])
+    wait = bucket.acquire(max_wait)
+    if wait:
+        raise TelegramRateLimited(wait)
+
+    with instrument.span('telegram'):
+        status, body = _post_json(
+            f"/bot{credentials['bot_token']}/sendMessage",
+            {'chat_id': credentials['chat_id'], 'text': message, 'parse_mode': 'HTML'}
+        )
+
+    if status == 429:
+        retry_after = float((body.get('parameters') or {}).get('retry_after', 1))
+        bucket.pause(retry_after)
+        raise TelegramRateLimited(retry_after)
+    if status >= 400 or not body.get('ok', False):
+        raise TelegramError(f"Telegram API error {status}: {body.get('description', '')}")
+    return body
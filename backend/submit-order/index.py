@@ -1,110 +1,166 @@
+import hashlib
 import json
 import os
-import psycopg2
-import urllib.request
-from typing import Dict, Any
+import sys
+from typing import Dict, Any, Optional
 
-def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shared import dashboard  # noqa: E402
+from shared import db  # noqa: E402
+from shared import http  # noqa: E402
+from shared import inventory  # noqa: E402
+from shared import ratelimit  # noqa: E402
+from shared.catalog import get_product_index, price_items  # noqa: E402
+
+MAX_IDEMPOTENCY_KEY_LENGTH = 128
+NEW_ORDER_CHANNEL = 'new_order'
+# Per client IP; generous enough for shoppers sharing a carrier NAT, tight enough to stop scripted checkouts
+ORDER_RATE_LIMIT = ratelimit.RateLimit(
+    'submit-order',
+    rate=float(os.environ.get('SUBMIT_ORDER_RATE_PER_MINUTE', '10')) / 60,
+    burst=int(os.environ.get('SUBMIT_ORDER_BURST', '10'))
+)
+
+ORDER_SCHEMA = {
+    'name': str,
+    'phone': str,
+    'address': str,
+    'items': list,
+    'email?': str,
+    'telegram?': str,
+    'total?': (int, float),
+    'idempotency_key?': str
+}
+
+
+def request_hash(body_data: Dict[str, Any]) -> str:
+    '''
+    Fingerprint of the order body (without the key itself) stored next to the Idempotency-Key.
+    '''
+    fields = {key: value for key, value in body_data.items() if key != 'idempotency_key'}
+    canonical = json.dumps(fields, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def replay_response(order_id: int, stored_hash: Optional[str], body_hash: str) -> Dict[str, Any]:
+    # Orders from before request hashes were stored replay unchecked
+    if stored_hash is not None and stored_hash != body_hash:
+        return http.error(422, 'Idempotency key was already used for a different order', code='idempotency_key_reused')
+    return order_created_response(order_id, replayed=True)
+
+
+def order_created_response(order_id: int, replayed: bool) -> Dict[str, Any]:
+    return http.json_response(200, {
+        'success': True,
+        'order_id': order_id,
+        'replayed': replayed,
+        'message': 'Order successfully created'
+    })
+
+
+@http.endpoint('submit-order', methods=['POST'], allow_headers=['Content-Type', 'Idempotency-Key'], schema=ORDER_SCHEMA,
+               rate_limit=ORDER_RATE_LIMIT)
+def handler(event: Dict[str, Any], context: Any, body_data: Dict[str, Any]) -> Dict[str, Any]:
     '''
-    Business: Process customer orders and save to database
-    Args: event - dict with httpMethod, body, queryStringParameters
+    Business: Process customer orders and save to database, taking per-size stock and deduplicating retries by Idempotency-Key
+    Args: event - dict with httpMethod, headers (Idempotency-Key), body, queryStringParameters
           context - object with attributes: request_id, function_name
-    Returns: HTTP response dict
+          body_data - order body validated against ORDER_SCHEMA
+    Returns: HTTP response dict; 422 when the Idempotency-Key already belongs to a different order body
     '''
-    method: str = event.get('httpMethod', 'GET')
+    name = body_data['name']
+    phone = body_data['phone']
+    email = body_data.get('email') or ''
+    telegram = body_data.get('telegram') or ''
+    address = body_data['address']
+    items = body_data['items']
+    # Optional; null means the client did not compute one
+    total = body_data.get('total')
+    idempotency_key = http.get_header(event, 'Idempotency-Key') or body_data.get('idempotency_key') or None
     
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': '',
-            'isBase64Encoded': False
-        }
+    if idempotency_key and len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        return http.error(400, 'Idempotency key too long')
     
-    if method != 'POST':
-        return {
-            'statusCode': 405,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'error': 'Method not allowed'}),
-            'isBase64Encoded': False
-        }
-    
-    body_data = json.loads(event.get('body', '{}'))
-    name = body_data.get('name')
-    phone = body_data.get('phone')
-    email = body_data.get('email', '')
-    telegram = body_data.get('telegram', '')
-    address = body_data.get('address')
-    items = body_data.get('items', [])
-    total = body_data.get('total', 0)
+    body_hash = request_hash(body_data)
+    # Fast path for retries: a single index lookup, no insert and no notification
+    if idempotency_key:
+        with db.transaction() as cursor:
+            cursor.execute(
+                "SELECT id, request_hash FROM t_p54427834_mission_dark_store.orders WHERE idempotency_key = %s",
+                (idempotency_key,)
+            )
+            existing = cursor.fetchone()
+        if existing:
+            return replay_response(existing[0], existing[1], body_hash)
     
     if not all([name, phone, address, items]):
-        return {
-            'statusCode': 400,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'error': 'Missing required fields'}),
-            'isBase64Encoded': False
-        }
-    
-    database_url = os.environ.get('DATABASE_URL')
-    conn = psycopg2.connect(database_url)
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "INSERT INTO orders (name, phone, email, telegram, address, items, total) VALUES (%s, %s, %s, %s, %s, %s, %s) RETURNING id",
-        (name, phone, email, telegram, address, json.dumps(items), total)
-    )
-    order_id = cursor.fetchone()[0]
-    
-    conn.commit()
-    cursor.close()
-    conn.close()
+        return http.error(400, 'Missing required fields')
     
     try:
-        telegram_url = 'https://functions.poehali.dev/0e6b6337-025c-497b-be1b-06db7d51d141'
-        telegram_data = {
-            'type': 'order',
-            'order': {
-                'id': order_id,
-                'name': name,
-                'phone': phone,
-                'email': email,
-                'telegram': telegram,
-                'address': address,
-                'items': items,
-                'total': total
+        with db.transaction() as cursor:
+            # Prices, stock and sizes come from the cached product index, never from the client
+            pricing = price_items(items, get_product_index(cursor))
+            if not pricing['errors'] and total is not None and total != pricing['total']:
+                pricing['errors'].append({'code': 'total_mismatch', 'message': 'Order total has changed', 'total': pricing['total']})
+            
+            if pricing['errors']:
+                return http.error(422, 'Order validation failed', errors=pricing['errors'])
+            
+            items = pricing['items']
+            total = pricing['total']
+            
+            # A concurrent request with the same key loses on the unique index and reuses the winner's id
+            cursor.execute(
+                "INSERT INTO orders (name, phone, email, telegram, address, items, total, idempotency_key, request_hash) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) ON CONFLICT (idempotency_key) WHERE idempotency_key IS NOT NULL DO NOTHING RETURNING id",
+                (name, phone, email, telegram, address, json.dumps(items), total, idempotency_key, body_hash if idempotency_key else None)
+            )
+            inserted = cursor.fetchone()
+            
+            if inserted is None:
+                cursor.execute(
+                    "SELECT id, request_hash FROM t_p54427834_mission_dark_store.orders WHERE idempotency_key = %s",
+                    (idempotency_key,)
+                )
+                existing = cursor.fetchone()
+                return replay_response(existing[0], existing[1], body_hash)
+            
+            order_id = inserted[0]
+            
+            # Converts the stock held for this checkout (same key) and takes the rest; raises OutOfStock
+            inventory.take(cursor, idempotency_key, items)
+            
+            db.execute_values(
+                cursor,
+                "INSERT INTO t_p54427834_mission_dark_store.order_items (order_id, line_no, product_id, size, quantity, unit_price) VALUES %s",
+                [
+                    (order_id, line_no, item['id'], item.get('size'), item['quantity'], item['price'])
+                    for line_no, item in enumerate(items, start=1)
+                ]
+            )
+            dashboard.record_order(cursor, order_id)
+            
+            # Telegram delivery happens in dispatch-notifications; the outbox row commits with the order
+            notification = {
+                'type': 'order',
+                'order': {
+                    'id': order_id,
+                    'name': name,
+                    'phone': phone,
+                    'email': email,
+                    'telegram': telegram,
+                    'address': address,
+                    'items': items,
+                    'total': total
+                }
             }
-        }
-        telegram_req = urllib.request.Request(
-            telegram_url,
-            data=json.dumps(telegram_data).encode('utf-8'),
-            headers={'Content-Type': 'application/json'}
-        )
-        urllib.request.urlopen(telegram_req)
-    except Exception as e:
-        print(f"Failed to send telegram notification: {e}")
+            cursor.execute(
+                "INSERT INTO t_p54427834_mission_dark_store.notification_outbox (kind, payload) VALUES (%s, %s)",
+                ('order', json.dumps(notification))
+            )
+            # Wakes order-events listeners; Postgres delivers it only if this transaction commits
+            cursor.execute("SELECT pg_notify(%s, %s)", (NEW_ORDER_CHANNEL, str(order_id)))
+    except inventory.OutOfStock as e:
+        # Raised inside the transaction, so the order row and any stock taken are rolled back
+        return http.error(422, 'Not enough stock', errors=e.errors)
     
-    return {
-        'statusCode': 200,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*'
-        },
-        'body': json.dumps({
-            'success': True,
-            'order_id': order_id,
-            'message': 'Order successfully created'
-        }),
-        'isBase64Encoded': False
-    }
\ No newline at end of file
+    return order_created_response(order_id, replayed=False)
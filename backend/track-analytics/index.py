@@ -1,75 +1,92 @@
 import json
 import os
-import psycopg2
-from typing import Dict, Any
+import sys
+from typing import Dict, Any, List, Tuple
 
-def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shared import db  # noqa: E402
+from shared import http  # noqa: E402
+from shared import ratelimit  # noqa: E402
+
+MAX_BATCH_SIZE = 100
+# Per client IP; a browser flushes one batch every few seconds
+EVENTS_RATE_LIMIT = ratelimit.RateLimit(
+    'track-analytics',
+    rate=float(os.environ.get('TRACK_ANALYTICS_RATE_PER_SECOND', '2')),
+    burst=int(os.environ.get('TRACK_ANALYTICS_BURST', '60'))
+)
+
+# Raw events and their hourly/daily/all-time rollups are written in one statement,
+# so the rollups never drift from the analytics table. ORDER BY keeps the upsert
+# lock order stable across concurrent batches.
+INSERT_EVENTS_SQL = '''
+    WITH inserted AS (
+        INSERT INTO analytics (event_type, event_data) VALUES %s
+        RETURNING event_type, COALESCE(event_data->>'product_id', '') AS product_id, created_at
+    ),
+    hourly AS (
+        INSERT INTO analytics_hourly (event_type, bucket, product_id, event_count)
+        SELECT event_type, date_trunc('hour', created_at), product_id, COUNT(*)
+        FROM inserted GROUP BY 1, 2, 3 ORDER BY 1, 2, 3
+        ON CONFLICT (event_type, bucket, product_id)
+        DO UPDATE SET event_count = analytics_hourly.event_count + EXCLUDED.event_count
+    ),
+    daily AS (
+        INSERT INTO analytics_daily (event_type, day, product_id, event_count)
+        SELECT event_type, created_at::date, product_id, COUNT(*)
+        FROM inserted GROUP BY 1, 2, 3 ORDER BY 1, 2, 3
+        ON CONFLICT (event_type, day, product_id)
+        DO UPDATE SET event_count = analytics_daily.event_count + EXCLUDED.event_count
+    )
+    INSERT INTO analytics_totals (event_type, product_id, event_count)
+    SELECT event_type, product_id, COUNT(*)
+    FROM inserted GROUP BY 1, 2 ORDER BY 1, 2
+    ON CONFLICT (event_type, product_id)
+    DO UPDATE SET event_count = analytics_totals.event_count + EXCLUDED.event_count
+'''
+
+
+def parse_events(body_data: Dict[str, Any]) -> List[Tuple[str, str]]:
+    '''
+    Accept either a single event or {"events": [...]} from the batching client.
+    Events without event_type are skipped; returns (event_type, event_data JSON) rows.
+    '''
+    raw_events = body_data.get('events')
+    if raw_events is None:
+        raw_events = [body_data]
+    if not isinstance(raw_events, list):
+        return []
+
+    rows = []
+    for item in raw_events[:MAX_BATCH_SIZE]:
+        if not isinstance(item, dict) or not item.get('event_type'):
+            continue
+        rows.append((str(item['event_type'])[:50], json.dumps(item.get('event_data', {}))))
+    return rows
+
+
+@http.endpoint('track-analytics', methods=['POST'], schema={'event_type?': str, 'events?': list},
+               rate_limit=EVENTS_RATE_LIMIT)
+def handler(event: Dict[str, Any], context: Any, body_data: Dict[str, Any]) -> Dict[str, Any]:
     '''
-    Business: Track website analytics events (page views, cart additions)
-    Args: event - dict with httpMethod, body, queryStringParameters
+    Business: Track website analytics events (page views, cart additions), single or batched
+    Args: event - dict with httpMethod, body (event_type/event_data or events list), queryStringParameters
           context - object with attributes: request_id, function_name
+          body_data - parsed JSON body
     Returns: HTTP response dict
     '''
-    method: str = event.get('httpMethod', 'GET')
-    
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': '',
-            'isBase64Encoded': False
-        }
-    
-    if method != 'POST':
-        return {
-            'statusCode': 405,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'error': 'Method not allowed'}),
-            'isBase64Encoded': False
-        }
+    rows = parse_events(body_data)
     
-    body_data = json.loads(event.get('body', '{}'))
-    event_type = body_data.get('event_type')
-    event_data = body_data.get('event_data', {})
-    
-    if not event_type:
-        return {
-            'statusCode': 400,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'error': 'Missing event_type'}),
-            'isBase64Encoded': False
-        }
-    
-    database_url = os.environ.get('DATABASE_URL')
-    conn = psycopg2.connect(database_url)
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "INSERT INTO analytics (event_type, event_data) VALUES (%s, %s)",
-        (event_type, json.dumps(event_data))
-    )
+    if not rows:
+        return http.error(400, 'Missing event_type')
     
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with db.transaction() as cursor:
+        db.execute_values(
+            cursor,
+            INSERT_EVENTS_SQL,
+            rows,
+            template="(%s, %s::jsonb)",
+            page_size=MAX_BATCH_SIZE
+        )
     
-    return {
-        'statusCode': 200,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*'
-        },
-        'body': json.dumps({'success': True}),
-        'isBase64Encoded': False
-    }
+    return http.json_response(200, {'success': True, 'accepted': len(rows)})
@@ -0,0 +1,86 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+
+class FakeTelegram:
+    '''
+    Local stand-in for api.telegram.org/bot<token>/sendMessage.
+    Point TELEGRAM_API_URL at .url; received messages are kept in .messages.
+    rate_limit_every=N answers every Nth request with 429 and retry_after.
+    '''
+
+    def __init__(self, latency: float = 0.0, rate_limit_every: Optional[int] = None, retry_after: int = 1):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.messages: List[Dict[str, Any]] = []
+        self.requests = 0
+        self.rate_limited = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'FakeTelegram':
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self) -> None:
+                super().setup()
+                with fake._lock:
+                    fake.connections += 1
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+                with fake._lock:
+                    fake.requests += 1
+                    limited = bool(fake.rate_limit_every) and fake.requests % fake.rate_limit_every == 0
+                    if limited:
+                        fake.rate_limited += 1
+                    else:
+                        fake.messages.append(payload)
+
+                if limited:
+                    self._reply(429, {
+                        'ok': False,
+                        'error_code': 429,
+                        'description': f'Too Many Requests: retry after {fake.retry_after}',
+                        'parameters': {'retry_after': fake.retry_after}
+                    })
+                else:
+                    self._reply(200, {'ok': True, 'result': {'message_id': fake.requests}})
+
+            def _reply(self, status: int, body: Dict[str, Any]) -> None:
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
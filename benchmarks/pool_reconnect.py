@@ -0,0 +1,108 @@
+'''
+Broken-connection check for the shared connection pool.
+
+Terminates the backend of a pooled connection from another session, as a Postgres restart
+or failover would, and checks that the next db.transaction() still succeeds on a fresh
+connection. Also checks that a connection dying after a statement has succeeded fails the
+transaction instead of replaying it, and that a cancelled statement on a live connection is
+raised rather than retried.
+
+    BENCH_DATABASE_URL=postgresql://localhost/bench python benchmarks/pool_reconnect.py
+
+Only pg_backend_pid(), pg_sleep() and pg_terminate_backend() are run; no tables are touched.
+'''
+import os
+import sys
+import threading
+import time
+from typing import List, Optional
+
+import psycopg2
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'backend'))
+os.environ.setdefault('REQUEST_LOG', '0')
+
+from shared import db  # noqa: E402
+
+
+def backend_pid() -> int:
+    with db.transaction() as cursor:
+        cursor.execute('SELECT pg_backend_pid()')
+        return cursor.fetchone()[0]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    dsn = os.environ.get('BENCH_DATABASE_URL')
+    if not dsn:
+        print('BENCH_DATABASE_URL is required', file=sys.stderr)
+        return 2
+    os.environ['DATABASE_URL'] = dsn
+    # One pooled connection, so the terminated one is the one handed out next
+    db.POOL_MIN_SIZE = db.POOL_MAX_SIZE = 1
+    db.close_pool()
+
+    admin_conn = psycopg2.connect(dsn)
+    admin_conn.autocommit = True
+
+    def terminate(pid: int) -> None:
+        with admin_conn.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', (pid,))
+        # Let the backend exit before the pool touches the connection
+        time.sleep(0.2)
+
+    problems = []
+    try:
+        # Dead while idle in the pool, inside the health-check interval
+        pid = backend_pid()
+        terminate(pid)
+        try:
+            new_pid = backend_pid()
+            print(f'idle connection terminated: pid {pid} -> {new_pid}')
+            if new_pid == pid:
+                problems.append('transaction ran on the terminated connection')
+        except psycopg2.Error as e:
+            problems.append(f'transaction after an idle connection was terminated failed: {e}')
+
+        # Dead after a statement succeeded: the transaction must fail, not be replayed
+        try:
+            with db.transaction() as cursor:
+                cursor.execute('SELECT pg_backend_pid()')
+                terminate(cursor.fetchone()[0])
+                cursor.execute('SELECT 1')
+            problems.append('transaction was replayed after its connection died mid-way')
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            print(f'connection terminated mid-transaction: raised {type(e).__name__}')
+        try:
+            backend_pid()
+        except psycopg2.Error as e:
+            problems.append(f'pool did not recover after a mid-transaction failure: {e}')
+
+        # Cancelled on a live connection: raised once, connection kept
+        pid = backend_pid()
+        timer = threading.Timer(0.3, lambda: admin_conn.cursor().execute('SELECT pg_cancel_backend(%s)', (pid,)))
+        timer.start()
+        started = time.perf_counter()
+        try:
+            with db.transaction() as cursor:
+                cursor.execute('SELECT pg_sleep(3)')
+            problems.append('cancelled statement did not raise')
+        except psycopg2.extensions.QueryCanceledError:
+            elapsed = time.perf_counter() - started
+            print(f'statement cancelled on a live connection: raised after {elapsed:.1f}s')
+            if elapsed > 1.5:
+                problems.append('cancelled statement was retried')
+        timer.join()
+        if backend_pid() != pid:
+            problems.append('live connection was discarded after a cancelled statement')
+    finally:
+        db.close_pool()
+        admin_conn.close()
+
+    for problem in problems:
+        print(f'FAIL: {problem}', file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,248 @@
+'''
+Benchmark and load-test harness for the backend handlers.
+
+Seeds a scratch Postgres schema at several scales, runs each handler(event, context)
+in-process with a thread pool, and reports p50/p95/p99 latency, throughput, SQL
+queries per request and peak Python memory per request. Telegram calls go to a local
+stub server, so nothing leaves the machine.
+
+    BENCH_DATABASE_URL=postgresql://localhost/bench python benchmarks/run.py --scales 1000,100000
+
+The schema t_p54427834_mission_dark_store in BENCH_DATABASE_URL is dropped and recreated.
+'''
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import types
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import psycopg2
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(BENCH_DIR, '..', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('REQUEST_LOG', '0')
+
+from shared import db  # noqa: E402
+from fake_telegram import FakeTelegram  # noqa: E402
+from seed import SCHEMA, reset_schema, seed  # noqa: E402
+
+_query_counter = threading.local()
+
+
+class CountingCursor(db.timed_cursor()):
+    def execute(self, query: Any, vars: Any = None) -> Any:
+        _query_counter.count = getattr(_query_counter, 'count', 0) + 1
+        return super().execute(query, vars)
+
+    def executemany(self, query: Any, vars_list: Any) -> Any:
+        _query_counter.count = getattr(_query_counter, 'count', 0) + 1
+        return super().executemany(query, vars_list)
+
+
+def load_function(function_name: str) -> types.ModuleType:
+    path = os.path.join(BACKEND_DIR, function_name, 'index.py')
+    spec = importlib.util.spec_from_file_location(f"bench_{function_name.replace('-', '_')}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def build_scenarios(product: Dict[str, Any]) -> List[Dict[str, Any]]:
+    order_body = {
+        'name': 'Bench Customer',
+        'phone': '+79990000000',
+        'email': 'bench@example.com',
+        'telegram': 'bench',
+        'address': 'Москва, ул. Тестовая, 1',
+        'items': [{'id': product['id'], 'name': product['name'], 'size': 'M', 'quantity': 1, 'price': product['price']}],
+        'total': product['price']
+    }
+    analytics_batch = {
+        'events': [
+            {'event_type': 'page_view', 'event_data': {'page': '/'}} if i % 4 else
+            {'event_type': 'add_to_cart', 'event_data': {'product_id': product['id']}}
+            for i in range(20)
+        ]
+    }
+
+    return [
+        {'name': 'get-orders', 'function': 'get-orders',
+         'event': lambda: {'httpMethod': 'GET', 'queryStringParameters': {}}},
+        {'name': 'get-orders python json', 'function': 'get-orders', 'overrides': {'SQL_JSON': False},
+         'event': lambda: {'httpMethod': 'GET', 'queryStringParameters': {}}},
+        {'name': 'get-orders gzip', 'function': 'get-orders',
+         'event': lambda: {'httpMethod': 'GET', 'headers': {'Accept-Encoding': 'gzip, deflate, br'}, 'queryStringParameters': {}}},
+        {'name': 'get-orders changes', 'function': 'get-orders',
+         'event': lambda: {'httpMethod': 'GET', 'queryStringParameters': {
+             'view': 'changes', 'since': (datetime.now() - timedelta(minutes=5)).isoformat()}}},
+        {'name': 'get-orders filtered page', 'function': 'get-orders',
+         'event': lambda: {'httpMethod': 'GET', 'queryStringParameters': {'view': 'orders', 'status': 'new', 'search': '+79990'}}},
+        {'name': 'get-orders dashboard', 'function': 'get-orders',
+         'event': lambda: {'httpMethod': 'GET', 'queryStringParameters': {'view': 'dashboard'}}},
+        {'name': 'get-products', 'function': 'get-products',
+         'event': lambda: {'httpMethod': 'GET', 'headers': {}}},
+        {'name': 'submit-order', 'function': 'submit-order',
+         'event': lambda: {'httpMethod': 'POST', 'headers': {'Idempotency-Key': uuid.uuid4().hex}, 'body': json.dumps(order_body)}},
+        {'name': 'track-analytics batch(20)', 'function': 'track-analytics',
+         'event': lambda: {'httpMethod': 'POST', 'body': json.dumps(analytics_batch)}},
+        {'name': 'dispatch-notifications', 'function': 'dispatch-notifications',
+         'event': lambda: {'httpMethod': 'GET'}},
+        {'name': 'admin-search phone', 'function': 'admin-search',
+         'event': lambda: {'httpMethod': 'GET', 'queryStringParameters': {'q': '9990000123', 'type': 'orders'}}},
+        {'name': 'admin-search email', 'function': 'admin-search',
+         'event': lambda: {'httpMethod': 'GET', 'queryStringParameters': {'q': 'user4242@example'}}},
+        {'name': 'export-data orders(10k)', 'function': 'export-data',
+         'event': lambda: {'httpMethod': 'GET', 'queryStringParameters': {'dataset': 'orders', 'format': 'ndjson', 'limit': '10000'}}},
+    ]
+
+
+def invoke(handler: Callable, event: Dict[str, Any]) -> Dict[str, Any]:
+    _query_counter.count = 0
+    context = types.SimpleNamespace(request_id=uuid.uuid4().hex, function_name='bench')
+    started = time.perf_counter()
+    size = 0
+    try:
+        response = handler(event, context)
+        ok = response.get('statusCode', 500) < 400
+        size = len(response.get('body') or '')
+    except Exception:
+        ok = False
+    return {'latency': time.perf_counter() - started, 'queries': _query_counter.count, 'ok': ok, 'bytes': size}
+
+
+def run_scenario(handler: Callable, make_event: Callable[[], Dict[str, Any]],
+                 requests: int, concurrency: int, memory_samples: int) -> Dict[str, Any]:
+    for _ in range(min(5, requests)):
+        invoke(handler, make_event())
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: invoke(handler, make_event()), range(requests)))
+    elapsed = time.perf_counter() - started
+
+    # Memory is sampled sequentially afterwards so tracemalloc does not skew latency
+    peak_bytes = 0
+    for _ in range(memory_samples):
+        tracemalloc.start()
+        invoke(handler, make_event())
+        peak_bytes = max(peak_bytes, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    latencies = sorted(result['latency'] * 1000 for result in results)
+    return {
+        'requests': requests,
+        'errors': sum(1 for result in results if not result['ok']),
+        'rps': round(requests / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'queries_per_request': round(sum(result['queries'] for result in results) / len(results), 2),
+        'body_kb': round(sum(result['bytes'] for result in results) / len(results) / 1024, 1),
+        'peak_kb': round(peak_bytes / 1024, 1)
+    }
+
+
+def print_table(rows: List[Dict[str, Any]]) -> None:
+    columns = ['scale', 'scenario', 'requests', 'errors', 'rps', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request', 'body_kb', 'peak_kb']
+    widths = {column: max(len(column), *(len(str(row[column])) for row in rows)) for column in columns}
+    print('  '.join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print('  '.join(str(row[column]).ljust(widths[column]) for column in columns))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark backend handlers against a local Postgres')
+    parser.add_argument('--scales', default='1000,100000', help='comma-separated row counts for orders and analytics')
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--memory-samples', type=int, default=3)
+    parser.add_argument('--scenario', action='append', help='only run scenarios whose name contains this text')
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args(argv)
+
+    dsn = os.environ.get('BENCH_DATABASE_URL')
+    if not dsn:
+        parser.error('BENCH_DATABASE_URL is required (its store schema is dropped and recreated)')
+    if dsn == os.environ.get('DATABASE_URL'):
+        parser.error('BENCH_DATABASE_URL must not be the application DATABASE_URL')
+
+    telegram = FakeTelegram().start()
+    os.environ.update({
+        'DATABASE_URL': dsn,
+        'TELEGRAM_API_URL': telegram.url,
+        'TELEGRAM_BOT_TOKEN': 'bench-token',
+        'TELEGRAM_CHAT_ID': '1',
+        # Measure the dispatcher, not the per-chat send rate; telegram_burst.py covers that
+        'TELEGRAM_RATE_PER_SECOND': '100000',
+        'TELEGRAM_BURST': '100000'
+    })
+    db.POOL_MAX_SIZE = max(db.POOL_MAX_SIZE, args.concurrency)
+
+    rows: List[Dict[str, Any]] = []
+    try:
+        for scale in [int(value) for value in args.scales.split(',') if value]:
+            db.close_pool()
+            admin_conn = psycopg2.connect(dsn)
+            try:
+                seed_started = time.perf_counter()
+                reset_schema(admin_conn)
+                seed(admin_conn, scale)
+                print(f'seeded scale={scale} in {time.perf_counter() - seed_started:.1f}s', file=sys.stderr)
+            finally:
+                admin_conn.close()
+
+            db.configure(cursor_factory=CountingCursor, options=f'-c search_path={SCHEMA},public')
+            with db.transaction() as cursor:
+                cursor.execute("SELECT id, name, price FROM products WHERE in_stock ORDER BY id LIMIT 1")
+                product_id, product_name, product_price = cursor.fetchone()
+            product = {'id': product_id, 'name': product_name, 'price': product_price}
+
+            modules: Dict[str, types.ModuleType] = {}
+            for scenario in build_scenarios(product):
+                if args.scenario and not any(text in scenario['name'] for text in args.scenario):
+                    continue
+                # Fresh module per scale so warm-container caches start cold
+                if scenario['function'] not in modules:
+                    modules[scenario['function']] = load_function(scenario['function'])
+                module = modules[scenario['function']]
+                # Overrides flip module-level switches (e.g. the SQL JSON path) for one scenario
+                overrides = scenario.get('overrides', {})
+                saved = {name: getattr(module, name) for name in overrides}
+                for name, value in overrides.items():
+                    setattr(module, name, value)
+                try:
+                    result = run_scenario(module.handler, scenario['event'], args.requests, args.concurrency, args.memory_samples)
+                finally:
+                    for name, value in saved.items():
+                        setattr(module, name, value)
+                rows.append({'scale': scale, 'scenario': scenario['name'], **result})
+                print(f"  {scenario['name']}: p50={result['p50_ms']}ms p99={result['p99_ms']}ms", file=sys.stderr)
+    finally:
+        db.close_pool()
+        telegram.stop()
+
+    print_table(rows)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as output:
+            json.dump(rows, output, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import glob
+import os
+from typing import Any, List
+
+SCHEMA = 't_p54427834_mission_dark_store'
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'db_migrations')
+PRODUCT_COUNT = 20
+
+
+def reset_schema(conn: Any) -> None:
+    '''
+    Drop and recreate the store schema, then apply every migration in order.
+    '''
+    with conn.cursor() as cursor:
+        cursor.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+        cursor.execute(f'CREATE SCHEMA {SCHEMA}')
+        cursor.execute(f'SET search_path TO {SCHEMA}, public')
+        for path in sorted(glob.glob(os.path.join(MIGRATIONS_DIR, 'V*.sql'))):
+            with open(path, encoding='utf-8') as migration:
+                sql = migration.read()
+            # Migrations that build indexes concurrently or commit in batches say so in their header
+            if 'must not run inside a transaction' in sql:
+                apply_outside_transaction(conn, cursor, sql)
+            else:
+                cursor.execute(sql)
+    conn.commit()
+
+
+def split_statements(code: str) -> List[str]:
+    '''
+    Split SQL on semicolons, keeping $$-quoted DO bodies whole.
+    '''
+    statements, current = [], ''
+    for index, part in enumerate(code.split('$$')):
+        if index % 2:
+            current += f'$${part}$$'
+            continue
+        pieces = part.split(';')
+        current += pieces[0]
+        for piece in pieces[1:]:
+            statements.append(current)
+            current = piece
+    statements.append(current)
+    return [statement for statement in statements if statement.strip()]
+
+
+def apply_outside_transaction(conn: Any, cursor: Any, sql: str) -> None:
+    '''
+    Run a migration statement by statement in autocommit mode, as CREATE INDEX CONCURRENTLY and
+    DO blocks that COMMIT require.
+    '''
+    conn.commit()
+    conn.autocommit = True
+    try:
+        code = '\n'.join(line for line in sql.splitlines() if not line.strip().startswith('--'))
+        for statement in split_statements(code):
+            cursor.execute(statement)
+    finally:
+        conn.autocommit = False
+
+
+def seed(conn: Any, scale: int) -> None:
+    '''
+    Fill the schema with `scale` orders and analytics events, scale / 10 messages
+    and PRODUCT_COUNT products, keeping order_items, analytics rollups and order summaries consistent.
+    '''
+    with conn.cursor() as cursor:
+        cursor.execute(f'SET search_path TO {SCHEMA}, public')
+
+        cursor.execute(
+            '''
+            INSERT INTO products (id, name, price, image, images, category, description, sizes, in_stock)
+            SELECT g::text, 'Bench product ' || g, 1000 + g * 100, 'https://example.com/' || g || '.png',
+                   ARRAY['https://example.com/' || g || '.png'], 'Bench', 'Seeded for benchmarks',
+                   ARRAY['S', 'M', 'L', 'XL'], true
+            FROM generate_series(1, %s) g
+            ON CONFLICT (id) DO NOTHING
+            ''',
+            (PRODUCT_COUNT,)
+        )
+
+        cursor.execute(
+            '''
+            INSERT INTO orders (name, phone, email, telegram, address, items, total, status, created_at, updated_at)
+            SELECT 'Customer ' || g, '+7999' || lpad(g::text, 7, '0'), 'user' || g || '@example.com',
+                   'user' || g, 'Москва, ул. Тестовая, ' || g,
+                   jsonb_build_array(jsonb_build_object(
+                       'id', p.id, 'name', p.name, 'size', 'M', 'quantity', 1 + g %% 3, 'price', p.price
+                   )),
+                   p.price * (1 + g %% 3),
+                   (ARRAY['new', 'processing', 'completed'])[1 + g %% 3],
+                   CURRENT_TIMESTAMP - g * INTERVAL '30 seconds',
+                   CURRENT_TIMESTAMP - g * INTERVAL '30 seconds'
+            FROM generate_series(1, %s) g
+            JOIN products p ON p.id = ((g %% %s) + 1)::text
+            ''',
+            (scale, PRODUCT_COUNT)
+        )
+
+        cursor.execute(
+            '''
+            INSERT INTO order_items (order_id, line_no, product_id, size, quantity, unit_price)
+            SELECT o.id, 1, o.items->0->>'id', o.items->0->>'size',
+                   (o.items->0->>'quantity')::int, (o.items->0->>'price')::int
+            FROM orders o
+            '''
+        )
+
+        cursor.execute(
+            '''
+            INSERT INTO contact_messages (name, email, message, created_at, updated_at)
+            SELECT 'Visitor ' || g, 'visitor' || g || '@example.com', 'Message ' || g,
+                   CURRENT_TIMESTAMP - g * INTERVAL '5 minutes', CURRENT_TIMESTAMP - g * INTERVAL '5 minutes'
+            FROM generate_series(1, %s) g
+            ''',
+            (max(scale // 10, 1),)
+        )
+
+        cursor.execute(
+            '''
+            INSERT INTO analytics (event_type, event_data, created_at)
+            SELECT CASE WHEN g %% 5 = 0 THEN 'add_to_cart' ELSE 'page_view' END,
+                   CASE WHEN g %% 5 = 0 THEN jsonb_build_object('product_id', ((g %% %s) + 1)::text)
+                        ELSE jsonb_build_object('page', '/') END,
+                   CURRENT_TIMESTAMP - g * INTERVAL '10 seconds'
+            FROM generate_series(1, %s) g
+            ''',
+            (PRODUCT_COUNT, scale)
+        )
+
+        # Rebuild rollups with the same statements the migration uses for its backfill
+        cursor.execute('TRUNCATE analytics_hourly, analytics_daily, analytics_totals')
+        with open(os.path.join(MIGRATIONS_DIR, 'V0006__create_analytics_rollups.sql'), encoding='utf-8') as migration:
+            cursor.execute(migration.read())
+        cursor.execute('TRUNCATE order_summary_daily, order_summary_status, order_summary_products')
+        with open(os.path.join(MIGRATIONS_DIR, 'V0017__create_order_summaries.sql'), encoding='utf-8') as migration:
+            cursor.execute(migration.read())
+
+    conn.commit()
+
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute(f'SET search_path TO {SCHEMA}, public')
+        cursor.execute('VACUUM ANALYZE')
+    conn.autocommit = False
@@ -0,0 +1,248 @@
+'''
+Drop-day oversell check for per-size stock.
+
+Fires concurrent submit-order calls at a SKU with a small stock and checks that exactly
+that many orders go through, that stock never goes negative and that order_items agrees.
+A second burst orders two SKUs in opposite item order to catch lock-order deadlocks, a
+third races the owners of expired holds against new customers for the same SKUs, a
+fourth walks a checkout hold through expiry, the release-stock-holds sweep and
+conversion into an order, and a last pass checks the per-IP and per-checkout hold caps.
+
+    BENCH_DATABASE_URL=postgresql://localhost/bench python benchmarks/stock_race.py --requests 300 --stock 50
+
+The schema t_p54427834_mission_dark_store in BENCH_DATABASE_URL is dropped and recreated.
+'''
+import argparse
+import json
+import os
+import sys
+import time
+import types
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import psycopg2
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'backend'))
+os.environ.setdefault('REQUEST_LOG', '0')
+
+from shared import db  # noqa: E402
+from shared import inventory  # noqa: E402
+from run import load_function  # noqa: E402
+from seed import SCHEMA, reset_schema, seed  # noqa: E402
+
+
+def context() -> Any:
+    return types.SimpleNamespace(request_id=uuid.uuid4().hex, function_name='bench')
+
+
+def order_event(products: Dict[str, Dict[str, Any]], lines: List[Tuple[str, str]], key: str) -> Dict[str, Any]:
+    items = [
+        {'id': product_id, 'name': products[product_id]['name'], 'size': size, 'quantity': 1,
+         'price': products[product_id]['price']}
+        for product_id, size in lines
+    ]
+    body = {
+        'name': 'Race Customer',
+        'phone': '+79990000000',
+        'email': 'race@example.com',
+        'telegram': 'race',
+        'address': 'Москва, ул. Тестовая, 1',
+        'items': items,
+        'total': sum(item['price'] for item in items)
+    }
+    # No requestContext: the per-client rate limit would otherwise turn the race into 429s
+    return {'httpMethod': 'POST', 'headers': {'Idempotency-Key': key}, 'body': json.dumps(body)}
+
+
+def hold_event(product_id: str, size: str, quantity: int, reservation: str) -> Dict[str, Any]:
+    body = {'reservation': reservation, 'items': [{'id': product_id, 'size': size, 'quantity': quantity}]}
+    return {'httpMethod': 'POST', 'body': json.dumps(body)}
+
+
+class Store:
+    def __init__(self, dsn: str):
+        self.conn = psycopg2.connect(dsn)
+        self.conn.autocommit = True
+        with self.conn.cursor() as cursor:
+            cursor.execute(f'SET search_path TO {SCHEMA}, public')
+
+    def query(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        with self.conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall() if cursor.description else []
+
+    def products(self) -> Dict[str, Dict[str, Any]]:
+        return {row[0]: {'name': row[1], 'price': row[2]} for row in self.query('SELECT id, name, price FROM products')}
+
+    def set_stock(self, product_id: str, size: str, quantity: int) -> None:
+        self.query(
+            '''
+            INSERT INTO product_stock (product_id, size, quantity) VALUES (%s, %s, %s)
+            ON CONFLICT (product_id, size) DO UPDATE SET quantity = EXCLUDED.quantity
+            ''',
+            (product_id, size, quantity)
+        )
+
+    def stock(self, product_id: str, size: str) -> int:
+        return self.query('SELECT quantity FROM product_stock WHERE product_id = %s AND size = %s', (product_id, size))[0][0]
+
+    def ordered(self, product_id: str, size: str) -> int:
+        return self.query(
+            'SELECT COALESCE(SUM(quantity), 0) FROM order_items WHERE product_id = %s AND size = %s',
+            (product_id, size)
+        )[0][0]
+
+    def expire_holds(self) -> None:
+        self.query("UPDATE stock_holds SET expires_at = CURRENT_TIMESTAMP - INTERVAL '1 second'")
+
+
+def invoke(module: Any, event: Dict[str, Any]) -> Any:
+    try:
+        return module.handler(event, context())['statusCode']
+    except psycopg2.Error as e:
+        # Deadlocks and other database errors surface as 500s in production
+        return type(e).__name__
+
+
+def burst(module: Any, events: List[Dict[str, Any]], workers: int) -> Tuple[Counter, float]:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        statuses = Counter(pool.map(lambda event: invoke(module, event), events))
+    return statuses, time.perf_counter() - started
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--stock', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=32, help='concurrent checkouts (one pooled connection each)')
+    args = parser.parse_args(argv)
+
+    dsn = os.environ.get('BENCH_DATABASE_URL')
+    if not dsn:
+        parser.error('BENCH_DATABASE_URL is required (its store schema is dropped and recreated)')
+    os.environ['DATABASE_URL'] = dsn
+
+    admin_conn = psycopg2.connect(dsn)
+    try:
+        reset_schema(admin_conn)
+        seed(admin_conn, 0)
+    finally:
+        admin_conn.close()
+
+    store = Store(dsn)
+    products = store.products()
+    db.POOL_MAX_SIZE = args.workers
+    db.configure(options=f'-c search_path={SCHEMA},public')
+    submit_order = load_function('submit-order')
+    reserve_stock = load_function('reserve-stock')
+    release_holds = load_function('release-stock-holds')
+    problems = []
+
+    try:
+        # One hot SKU
+        store.set_stock('1', 'M', args.stock)
+        events = [order_event(products, [('1', 'M')], uuid.uuid4().hex) for _ in range(args.requests)]
+        statuses, elapsed = burst(submit_order, events, args.workers)
+        left, ordered = store.stock('1', 'M'), store.ordered('1', 'M')
+        print(f"single sku: requests={args.requests} stock={args.stock} elapsed={elapsed:.1f}s "
+              f"statuses={dict(statuses)} left={left} ordered={ordered}")
+        if statuses[200] != args.stock or statuses[422] != args.requests - args.stock:
+            problems.append(f'single sku: expected {args.stock} orders and {args.requests - args.stock} rejections')
+        if left != 0 or ordered != args.stock:
+            problems.append(f'single sku: stock {left} and ordered {ordered} do not add up to {args.stock}')
+
+        # Two SKUs per order, locked from both ends
+        store.set_stock('2', 'M', args.stock)
+        store.set_stock('3', 'L', args.stock)
+        events = [
+            order_event(products, [('2', 'M'), ('3', 'L')] if i % 2 else [('3', 'L'), ('2', 'M')], uuid.uuid4().hex)
+            for i in range(args.requests)
+        ]
+        statuses, elapsed = burst(submit_order, events, args.workers)
+        stocks = (store.stock('2', 'M'), store.stock('3', 'L'))
+        ordered_pair = (store.ordered('2', 'M'), store.ordered('3', 'L'))
+        print(f"two skus: requests={args.requests} elapsed={elapsed:.1f}s statuses={dict(statuses)} "
+              f"left={stocks} ordered={ordered_pair}")
+        if statuses[200] != args.stock or set(statuses) - {200, 422}:
+            problems.append(f'two skus: expected {args.stock} orders and only 422 rejections')
+        if stocks != (0, 0) or ordered_pair != (args.stock, args.stock):
+            problems.append('two skus: stock and order_items disagree')
+
+        # Abandoned holds expiring while their owners and new customers check out at once
+        store.set_stock('5', 'M', 2 * args.stock)
+        store.set_stock('6', 'L', 2 * args.stock)
+        tokens = [uuid.uuid4().hex for _ in range(args.stock)]
+        for token in tokens:
+            body = {'reservation': token, 'items': [{'id': '5', 'size': 'M', 'quantity': 1}, {'id': '6', 'size': 'L', 'quantity': 1}]}
+            reserve_stock.handler({'httpMethod': 'POST', 'body': json.dumps(body)}, context())
+        store.expire_holds()
+        events = [
+            order_event(products, [('5', 'M'), ('6', 'L')] if i % 2 else [('6', 'L'), ('5', 'M')],
+                        tokens[i // 2] if i % 2 == 0 and i // 2 < len(tokens) else uuid.uuid4().hex)
+            for i in range(args.requests)
+        ]
+        statuses, elapsed = burst(submit_order, events, args.workers)
+        stocks = (store.stock('5', 'M'), store.stock('6', 'L'))
+        ordered_pair = (store.ordered('5', 'M'), store.ordered('6', 'L'))
+        open_holds = store.query('SELECT COUNT(*) FROM stock_holds')[0][0]
+        print(f"expired holds: requests={args.requests} holds={len(tokens)} elapsed={elapsed:.1f}s "
+              f"statuses={dict(statuses)} left={stocks} ordered={ordered_pair} open_holds={open_holds}")
+        if set(statuses) - {200, 422}:
+            problems.append('expired holds: checkouts failed with errors other than 422')
+        if stocks != (0, 0) or ordered_pair != (2 * args.stock, 2 * args.stock) or open_holds:
+            problems.append('expired holds: stock, order_items and holds disagree')
+
+        # Hold lifecycle on a SKU with two units
+        store.set_stock('4', 'S', 2)
+        hold = reserve_stock.handler(hold_event('4', 'S', 2, 'abandoned'), context())
+        blocked = submit_order.handler(order_event(products, [('4', 'S')], uuid.uuid4().hex), context())
+        store.expire_holds()
+        after_expiry = submit_order.handler(order_event(products, [('4', 'S')], uuid.uuid4().hex), context())
+        left_after_expiry = store.stock('4', 'S')
+        reserve_stock.handler(hold_event('4', 'S', 1, 'swept'), context())
+        store.expire_holds()
+        swept = json.loads(release_holds.handler({'httpMethod': 'GET'}, context())['body'])['released']
+        left_after_sweep = store.stock('4', 'S')
+        reserve_stock.handler(hold_event('4', 'S', 1, 'converted'), context())
+        converted = submit_order.handler(order_event(products, [('4', 'S')], 'converted'), context())
+        remaining_holds = store.query('SELECT COUNT(*) FROM stock_holds')[0][0]
+        outcome = [hold['statusCode'], blocked['statusCode'], after_expiry['statusCode'], left_after_expiry,
+                   swept, left_after_sweep, converted['statusCode'], store.stock('4', 'S'), remaining_holds]
+        print(f"holds: hold,blocked,after_expiry,left,swept,left,converted,left,holds={outcome}")
+        if outcome != [200, 422, 200, 1, 1, 1, 200, 0, 0]:
+            problems.append('holds: expected [200, 422, 200, 1, 1, 1, 200, 0, 0]')
+
+        # Hold caps for one client IP: open checkouts, then cart lines per checkout
+        store.set_stock('7', 'M', inventory.MAX_HOLDS_PER_IP + 1)
+        statuses = []
+        for _ in range(inventory.MAX_HOLDS_PER_IP + 1):
+            event = hold_event('7', 'M', 1, uuid.uuid4().hex)
+            event['requestContext'] = {'identity': {'sourceIp': '203.0.113.7'}}
+            statuses.append(reserve_stock.handler(event, context())['statusCode'])
+        lines = [{'id': '7', 'size': 'M', 'quantity': 1}] * (inventory.MAX_HOLD_LINES + 1)
+        statuses.append(reserve_stock.handler(
+            {'httpMethod': 'POST', 'body': json.dumps({'reservation': 'lines', 'items': lines})}, context()
+        )['statusCode'])
+        expected = [200] * inventory.MAX_HOLDS_PER_IP + [429, 409]
+        print(f"hold caps: statuses={statuses} left={store.stock('7', 'M')}")
+        if statuses != expected or store.stock('7', 'M') != 1:
+            problems.append(f'hold caps: expected {expected} with one unit left')
+
+        if store.query('SELECT COUNT(*) FROM product_stock WHERE quantity < 0')[0][0]:
+            problems.append('negative stock')
+    finally:
+        db.close_pool()
+        store.conn.close()
+
+    for problem in problems:
+        print(f'FAIL: {problem}', file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+'''
+Drop-day burst check for the Telegram sender.
+
+Queues a burst of order notifications in the outbox, drains it with dispatch-notifications
+against a local fake Telegram that answers every Nth request with 429, and checks that
+every order is delivered over one keep-alive connection, coalesced into digests, with
+each retry_after honored.
+
+    BENCH_DATABASE_URL=postgresql://localhost/bench python benchmarks/telegram_burst.py --orders 200
+
+The schema t_p54427834_mission_dark_store in BENCH_DATABASE_URL is dropped and recreated.
+'''
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import types
+import uuid
+from typing import List, Optional
+
+import psycopg2
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'backend'))
+os.environ.setdefault('REQUEST_LOG', '0')
+
+from shared import db  # noqa: E402
+from fake_telegram import FakeTelegram  # noqa: E402
+from run import load_function  # noqa: E402
+from seed import SCHEMA, reset_schema  # noqa: E402
+
+
+def queue_orders(conn, count: int) -> None:
+    with conn.cursor() as cursor:
+        cursor.execute(f'SET search_path TO {SCHEMA}, public')
+        cursor.execute(
+            '''
+            INSERT INTO notification_outbox (kind, payload)
+            SELECT 'order', jsonb_build_object('order', jsonb_build_object(
+                'id', g, 'name', 'Customer ' || g, 'phone', '+7999' || lpad(g::text, 7, '0'),
+                'items', jsonb_build_array(jsonb_build_object('name', 'Hoodie', 'size', 'M', 'quantity', 1, 'price', 5000)),
+                'total', 5000
+            ))
+            FROM generate_series(1, %s) g
+            ''',
+            (count,)
+        )
+    conn.commit()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--rate-limit-every', type=int, default=4, help='fake answers every Nth request with 429')
+    parser.add_argument('--retry-after', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    dsn = os.environ.get('BENCH_DATABASE_URL')
+    if not dsn:
+        parser.error('BENCH_DATABASE_URL is required (its store schema is dropped and recreated)')
+
+    telegram = FakeTelegram(rate_limit_every=args.rate_limit_every, retry_after=args.retry_after).start()
+    os.environ.update({
+        'DATABASE_URL': dsn,
+        'TELEGRAM_API_URL': telegram.url,
+        'TELEGRAM_BOT_TOKEN': 'bench-token',
+        'TELEGRAM_CHAT_ID': '1',
+        'OUTBOX_BATCH_SIZE': str(args.batch_size)
+    })
+
+    admin_conn = psycopg2.connect(dsn)
+    try:
+        reset_schema(admin_conn)
+        queue_orders(admin_conn, args.orders)
+    finally:
+        admin_conn.close()
+
+    db.configure(options=f'-c search_path={SCHEMA},public')
+    module = load_function('dispatch-notifications')
+    totals = {'sent': 0, 'messages': 0, 'deferred': 0, 'retried': 0, 'failed': 0}
+    invocations = 0
+    started = time.perf_counter()
+    try:
+        while totals['sent'] < args.orders and invocations < 50:
+            response = module.handler({'httpMethod': 'GET'}, types.SimpleNamespace(request_id=uuid.uuid4().hex, function_name='bench'))
+            stats = json.loads(response['body'])
+            invocations += 1
+            for key in totals:
+                totals[key] += stats.get(key, 0)
+            if stats.get('deferred'):
+                # A timer trigger would come back later; deferred rows wait out retry_after in the outbox
+                time.sleep(args.retry_after)
+    finally:
+        elapsed = time.perf_counter() - started
+        db.close_pool()
+        telegram.stop()
+
+    delivered = sorted(int(order_id) for message in telegram.messages for order_id in re.findall(r'#(\d+)', message['text']))
+    print(f"orders={args.orders} invocations={invocations} elapsed={elapsed:.1f}s")
+    print(f"telegram: requests={telegram.requests} messages={len(telegram.messages)} "
+          f"429s={telegram.rate_limited} connections={telegram.connections}")
+    print(f"dispatch: {totals}")
+
+    problems = []
+    if delivered != list(range(1, args.orders + 1)):
+        problems.append(f'{len(delivered)} of {args.orders} orders delivered (or duplicated)')
+    if len(telegram.messages) >= args.orders:
+        problems.append('orders were not coalesced into digests')
+    if telegram.connections != 1:
+        problems.append(f'{telegram.connections} connections opened, expected one keep-alive connection')
+    if totals['failed'] or totals['retried']:
+        problems.append('rate limiting was counted as delivery failures')
+    for problem in problems:
+        print(f'FAIL: {problem}', file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,11 @@
+-- Keyset pagination over (created_at, id) requires a non-null created_at
+UPDATE t_p54427834_mission_dark_store.orders SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL;
+
+ALTER TABLE t_p54427834_mission_dark_store.orders ALTER COLUMN created_at SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_orders_created_at_id ON t_p54427834_mission_dark_store.orders (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_status_created_at_id ON t_p54427834_mission_dark_store.orders (status, created_at DESC, id DESC);
+
+-- Prefix search on phone and email
+CREATE INDEX IF NOT EXISTS idx_orders_phone_pattern ON t_p54427834_mission_dark_store.orders (phone text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_orders_email_lower_pattern ON t_p54427834_mission_dark_store.orders (lower(email) text_pattern_ops);
@@ -0,0 +1,46 @@
+-- Pre-aggregated analytics counters maintained by track-analytics on every insert
+CREATE TABLE IF NOT EXISTS t_p54427834_mission_dark_store.analytics_hourly (
+    event_type VARCHAR(50) NOT NULL,
+    bucket TIMESTAMP NOT NULL,
+    product_id TEXT NOT NULL DEFAULT '',
+    event_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (event_type, bucket, product_id)
+);
+
+CREATE TABLE IF NOT EXISTS t_p54427834_mission_dark_store.analytics_daily (
+    event_type VARCHAR(50) NOT NULL,
+    day DATE NOT NULL,
+    product_id TEXT NOT NULL DEFAULT '',
+    event_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (event_type, day, product_id)
+);
+
+CREATE TABLE IF NOT EXISTS t_p54427834_mission_dark_store.analytics_totals (
+    event_type VARCHAR(50) NOT NULL,
+    product_id TEXT NOT NULL DEFAULT '',
+    event_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (event_type, product_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_analytics_totals_event_count ON t_p54427834_mission_dark_store.analytics_totals (event_type, event_count DESC);
+
+-- Backfill from existing raw events
+INSERT INTO t_p54427834_mission_dark_store.analytics_hourly (event_type, bucket, product_id, event_count)
+SELECT event_type, date_trunc('hour', created_at), COALESCE(event_data->>'product_id', ''), COUNT(*)
+FROM t_p54427834_mission_dark_store.analytics
+WHERE created_at IS NOT NULL
+GROUP BY 1, 2, 3
+ON CONFLICT DO NOTHING;
+
+INSERT INTO t_p54427834_mission_dark_store.analytics_daily (event_type, day, product_id, event_count)
+SELECT event_type, created_at::date, COALESCE(event_data->>'product_id', ''), COUNT(*)
+FROM t_p54427834_mission_dark_store.analytics
+WHERE created_at IS NOT NULL
+GROUP BY 1, 2, 3
+ON CONFLICT DO NOTHING;
+
+INSERT INTO t_p54427834_mission_dark_store.analytics_totals (event_type, product_id, event_count)
+SELECT event_type, COALESCE(event_data->>'product_id', ''), COUNT(*)
+FROM t_p54427834_mission_dark_store.analytics
+GROUP BY 1, 2
+ON CONFLICT DO NOTHING;
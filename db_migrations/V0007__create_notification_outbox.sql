@@ -0,0 +1,14 @@
+-- Transactional outbox: rows are written together with the order and drained by dispatch-notifications
+CREATE TABLE IF NOT EXISTS t_p54427834_mission_dark_store.notification_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    kind VARCHAR(50) NOT NULL,
+    payload JSONB NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_error TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_pending ON t_p54427834_mission_dark_store.notification_outbox (next_attempt_at, id) WHERE status = 'pending';
@@ -0,0 +1,5 @@
+-- Client-supplied dedupe key; replays of the same checkout return the original order
+ALTER TABLE t_p54427834_mission_dark_store.orders
+ADD COLUMN IF NOT EXISTS idempotency_key VARCHAR(128);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_orders_idempotency_key ON t_p54427834_mission_dark_store.orders (idempotency_key) WHERE idempotency_key IS NOT NULL;
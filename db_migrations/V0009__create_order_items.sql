@@ -0,0 +1,21 @@
+-- Normalized order lines written alongside orders.items; older orders are filled in by backfill-order-items
+CREATE TABLE IF NOT EXISTS t_p54427834_mission_dark_store.order_items (
+    id BIGSERIAL PRIMARY KEY,
+    order_id INTEGER NOT NULL REFERENCES t_p54427834_mission_dark_store.orders (id) ON DELETE CASCADE,
+    line_no INTEGER NOT NULL,
+    product_id TEXT NOT NULL,
+    size VARCHAR(50),
+    quantity INTEGER NOT NULL,
+    unit_price INTEGER NOT NULL,
+    UNIQUE (order_id, line_no)
+);
+
+-- Covers per-product and per-size aggregation with index-only scans
+CREATE INDEX IF NOT EXISTS idx_order_items_product_size ON t_p54427834_mission_dark_store.order_items (product_id, size) INCLUDE (quantity, unit_price);
+
+CREATE TABLE IF NOT EXISTS t_p54427834_mission_dark_store.backfill_progress (
+    name VARCHAR(100) PRIMARY KEY,
+    last_id BIGINT NOT NULL DEFAULT 0,
+    done BOOLEAN NOT NULL DEFAULT false,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
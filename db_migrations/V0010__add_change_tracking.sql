@@ -0,0 +1,23 @@
+-- updated_at drives the get-orders "changes since" view; existing rows count as unchanged since creation
+ALTER TABLE t_p54427834_mission_dark_store.orders ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+UPDATE t_p54427834_mission_dark_store.orders SET updated_at = created_at WHERE updated_at IS NULL;
+ALTER TABLE t_p54427834_mission_dark_store.orders ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE t_p54427834_mission_dark_store.orders ALTER COLUMN updated_at SET NOT NULL;
+
+ALTER TABLE t_p54427834_mission_dark_store.contact_messages ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+UPDATE t_p54427834_mission_dark_store.contact_messages SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL;
+ALTER TABLE t_p54427834_mission_dark_store.contact_messages ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE t_p54427834_mission_dark_store.contact_messages ALTER COLUMN updated_at SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_orders_updated_at ON t_p54427834_mission_dark_store.orders (updated_at);
+CREATE INDEX IF NOT EXISTS idx_contact_messages_updated_at ON t_p54427834_mission_dark_store.contact_messages (updated_at);
+
+-- Tombstones for deleted rows, written by admin-actions in the same transaction as the delete
+CREATE TABLE IF NOT EXISTS t_p54427834_mission_dark_store.deleted_records (
+    id BIGSERIAL PRIMARY KEY,
+    entity VARCHAR(20) NOT NULL,
+    entity_id TEXT NOT NULL,
+    deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_deleted_records_deleted_at ON t_p54427834_mission_dark_store.deleted_records (deleted_at);
@@ -0,0 +1,2 @@
+-- Trigram matching for admin-search; the indexes are built concurrently in V0012
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
@@ -0,0 +1,14 @@
+-- Built concurrently so a large orders table stays writable. This file must not run inside a transaction.
+-- The indexed expressions are repeated verbatim in backend/admin-search, which the planner needs to use them.
+
+-- Orders: full-text words and trigram substrings over customer fields
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_search_tsv ON t_p54427834_mission_dark_store.orders
+    USING gin (to_tsvector('simple', name || ' ' || coalesce(email, '') || ' ' || coalesce(telegram, '') || ' ' || address));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_search_trgm ON t_p54427834_mission_dark_store.orders
+    USING gin (lower(name || ' ' || phone || ' ' || coalesce(email, '') || ' ' || coalesce(telegram, '') || ' ' || address) gin_trgm_ops);
+
+-- Contact messages: sender matched as is, message text with Russian stemming
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contact_messages_search_tsv ON t_p54427834_mission_dark_store.contact_messages
+    USING gin ((to_tsvector('simple', name || ' ' || email) || to_tsvector('russian', message)));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contact_messages_search_trgm ON t_p54427834_mission_dark_store.contact_messages
+    USING gin (lower(name || ' ' || email || ' ' || message) gin_trgm_ops);
@@ -0,0 +1,14 @@
+-- A validated CHECK implying the legacy partition bound lets V0014 attach the table without scanning it under lock.
+-- NOT VALID takes only a brief lock and holds new rows to the bound at once; V0013_3 validates old rows after the
+-- V0013_2 backfill. The bound is the start of the month after next, so inserts keep passing if the month turns
+-- before V0014 runs.
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'analytics_legacy_bound'
+                   AND conrelid = 't_p54427834_mission_dark_store.analytics'::regclass) THEN
+        EXECUTE format(
+            'ALTER TABLE t_p54427834_mission_dark_store.analytics ADD CONSTRAINT analytics_legacy_bound CHECK (created_at IS NOT NULL AND created_at < %L::timestamp) NOT VALID',
+            (date_trunc('month', CURRENT_DATE) + INTERVAL '2 months')::date
+        );
+    END IF;
+END $$;
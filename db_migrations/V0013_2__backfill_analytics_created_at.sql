@@ -0,0 +1,15 @@
+-- Range partitions cannot hold a NULL key; old NULL rows are backfilled in small committed batches,
+-- so no lock is held for the whole table. This file must not run inside a transaction.
+DO $$
+DECLARE
+    updated INTEGER;
+BEGIN
+    LOOP
+        UPDATE t_p54427834_mission_dark_store.analytics SET created_at = 'epoch'
+        WHERE id IN (SELECT id FROM t_p54427834_mission_dark_store.analytics WHERE created_at IS NULL LIMIT 5000)
+          AND created_at IS NULL;
+        GET DIAGNOSTICS updated = ROW_COUNT;
+        EXIT WHEN updated = 0;
+        COMMIT;
+    END LOOP;
+END $$;
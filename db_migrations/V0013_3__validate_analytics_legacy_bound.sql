@@ -0,0 +1,3 @@
+-- Scans under SHARE UPDATE EXCLUSIVE, so inserts carry on meanwhile. Kept apart from V0013_1, whose
+-- ACCESS EXCLUSIVE lock would otherwise be held for the whole scan.
+ALTER TABLE t_p54427834_mission_dark_store.analytics VALIDATE CONSTRAINT analytics_legacy_bound;
@@ -0,0 +1,3 @@
+-- The partitioned analytics table (V0014) needs a unique key that includes created_at.
+-- Built concurrently so track-analytics inserts carry on. This file must not run inside a transaction.
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_analytics_id_created_at ON t_p54427834_mission_dark_store.analytics (id, created_at);
@@ -0,0 +1,49 @@
+-- Turn analytics into a table partitioned by month without copying rows: the existing heap becomes
+-- the partition for everything before the month after next and later months get their own
+-- partitions, created ahead and expired by the analytics-maintenance function.
+-- The V0013 CHECK already proves the legacy bound, so ATTACH skips its scan; the V0013 index is reused as is.
+
+ALTER TABLE t_p54427834_mission_dark_store.analytics RENAME TO analytics_legacy;
+ALTER INDEX t_p54427834_mission_dark_store.idx_analytics_created_at RENAME TO idx_analytics_legacy_created_at;
+ALTER INDEX t_p54427834_mission_dark_store.idx_analytics_id_created_at RENAME TO idx_analytics_legacy_id_created_at;
+-- Per-type reads go to the rollup tables; the raw event_type index only grew
+DROP INDEX IF EXISTS t_p54427834_mission_dark_store.idx_analytics_event_type;
+
+CREATE TABLE t_p54427834_mission_dark_store.analytics (
+    id INTEGER NOT NULL DEFAULT nextval('t_p54427834_mission_dark_store.analytics_id_seq'),
+    event_type VARCHAR(50) NOT NULL,
+    event_data JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) PARTITION BY RANGE (created_at);
+
+-- Keep the id sequence alive when the legacy partition is eventually dropped
+ALTER SEQUENCE t_p54427834_mission_dark_store.analytics_id_seq OWNED BY t_p54427834_mission_dark_store.analytics.id;
+
+CREATE UNIQUE INDEX idx_analytics_id_created_at ON t_p54427834_mission_dark_store.analytics (id, created_at);
+CREATE INDEX idx_analytics_created_at ON t_p54427834_mission_dark_store.analytics (created_at);
+
+DO $$
+DECLARE
+    -- Not below the V0013 bound (it is a month later if the month turned in between), so the CHECK implies it
+    legacy_end DATE := (date_trunc('month', CURRENT_DATE) + INTERVAL '2 months')::date;
+    month_start DATE;
+BEGIN
+    EXECUTE format(
+        'ALTER TABLE t_p54427834_mission_dark_store.analytics ATTACH PARTITION t_p54427834_mission_dark_store.analytics_legacy FOR VALUES FROM (MINVALUE) TO (%L)',
+        legacy_end
+    );
+    FOR i IN 0..1 LOOP
+        month_start := (legacy_end + make_interval(months => i))::date;
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS t_p54427834_mission_dark_store.%I PARTITION OF t_p54427834_mission_dark_store.analytics FOR VALUES FROM (%L) TO (%L)',
+            'analytics_p' || to_char(month_start, 'YYYYMM'), month_start, (month_start + INTERVAL '1 month')::date
+        );
+    END LOOP;
+END $$;
+
+-- The partition constraint now enforces the bound
+ALTER TABLE t_p54427834_mission_dark_store.analytics_legacy DROP CONSTRAINT analytics_legacy_bound;
+
+-- Catches rows no monthly partition covers (e.g. if maintenance stops running), so inserts never fail;
+-- analytics-maintenance moves them into their monthly partition and logs when it finds any
+CREATE TABLE IF NOT EXISTS t_p54427834_mission_dark_store.analytics_default PARTITION OF t_p54427834_mission_dark_store.analytics DEFAULT;
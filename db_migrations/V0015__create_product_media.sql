@@ -0,0 +1,22 @@
+-- Image variant pipeline: one row per source image URL (shared between products), processed by process-media
+CREATE TABLE IF NOT EXISTS t_p54427834_mission_dark_store.product_media (
+    source_url TEXT PRIMARY KEY,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    manifest JSONB,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_error TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_product_media_pending ON t_p54427834_mission_dark_store.product_media (next_attempt_at) WHERE status = 'pending';
+
+-- Per-product variant manifests in image order, served by get-products
+ALTER TABLE t_p54427834_mission_dark_store.products ADD COLUMN IF NOT EXISTS media JSONB NOT NULL DEFAULT '[]';
+
+-- Queue the images of existing products
+INSERT INTO t_p54427834_mission_dark_store.product_media (source_url)
+SELECT DISTINCT unnest(array_prepend(image, COALESCE(images, ARRAY[]::text[])))
+FROM t_p54427834_mission_dark_store.products
+ON CONFLICT (source_url) DO NOTHING;
@@ -0,0 +1,11 @@
+-- Shared token buckets for public write endpoints, one row per scope and client.
+-- UNLOGGED: no WAL on the hot path; losing the buckets on a crash only resets the limits.
+CREATE UNLOGGED TABLE IF NOT EXISTS t_p54427834_mission_dark_store.rate_limits (
+    bucket TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    allowed BOOLEAN NOT NULL DEFAULT true,
+    dropped BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_rate_limits_updated_at ON t_p54427834_mission_dark_store.rate_limits (updated_at);
@@ -0,0 +1,42 @@
+-- Dashboard order summaries, kept current by every order write in the same statement (see shared/dashboard.py)
+CREATE TABLE IF NOT EXISTS t_p54427834_mission_dark_store.order_summary_daily (
+    day DATE NOT NULL,
+    status VARCHAR(50) NOT NULL,
+    order_count BIGINT NOT NULL DEFAULT 0,
+    revenue BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, status)
+);
+
+CREATE TABLE IF NOT EXISTS t_p54427834_mission_dark_store.order_summary_status (
+    status VARCHAR(50) PRIMARY KEY,
+    order_count BIGINT NOT NULL DEFAULT 0,
+    revenue BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS t_p54427834_mission_dark_store.order_summary_products (
+    product_id TEXT PRIMARY KEY,
+    quantity BIGINT NOT NULL DEFAULT 0,
+    revenue BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_order_summary_products_quantity ON t_p54427834_mission_dark_store.order_summary_products (quantity DESC);
+
+-- Backfill from existing orders; order lines that backfill-order-items copies later are added by that job
+INSERT INTO t_p54427834_mission_dark_store.order_summary_daily (day, status, order_count, revenue)
+SELECT created_at::date, COALESCE(status, 'new'), COUNT(*), SUM(total)
+FROM t_p54427834_mission_dark_store.orders
+WHERE created_at IS NOT NULL
+GROUP BY 1, 2
+ON CONFLICT DO NOTHING;
+
+INSERT INTO t_p54427834_mission_dark_store.order_summary_status (status, order_count, revenue)
+SELECT COALESCE(status, 'new'), COUNT(*), SUM(total)
+FROM t_p54427834_mission_dark_store.orders
+GROUP BY 1
+ON CONFLICT DO NOTHING;
+
+INSERT INTO t_p54427834_mission_dark_store.order_summary_products (product_id, quantity, revenue)
+SELECT product_id, SUM(quantity), SUM(quantity * unit_price)
+FROM t_p54427834_mission_dark_store.order_items
+GROUP BY 1
+ON CONFLICT DO NOTHING;
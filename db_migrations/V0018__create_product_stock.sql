@@ -0,0 +1,25 @@
+-- Sellable quantity per product and size ('' for products without sizes), see shared/inventory.py.
+-- Products without rows here are not stock-tracked and stay governed by in_stock alone.
+CREATE TABLE IF NOT EXISTS t_p54427834_mission_dark_store.product_stock (
+    product_id TEXT NOT NULL REFERENCES t_p54427834_mission_dark_store.products (id) ON DELETE CASCADE,
+    size VARCHAR(50) NOT NULL DEFAULT '',
+    quantity INTEGER NOT NULL CHECK (quantity >= 0),
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (product_id, size)
+);
+
+-- Stock held for an open checkout, already subtracted from product_stock.quantity.
+-- submit-order converts the holds of its Idempotency-Key; expired holds go back to stock.
+CREATE TABLE IF NOT EXISTS t_p54427834_mission_dark_store.stock_holds (
+    id BIGSERIAL PRIMARY KEY,
+    token VARCHAR(128) NOT NULL,
+    product_id TEXT NOT NULL,
+    size VARCHAR(50) NOT NULL DEFAULT '',
+    quantity INTEGER NOT NULL CHECK (quantity > 0),
+    expires_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_stock_holds_token ON t_p54427834_mission_dark_store.stock_holds (token);
+CREATE INDEX IF NOT EXISTS idx_stock_holds_sku_expires_at ON t_p54427834_mission_dark_store.stock_holds (product_id, size, expires_at);
+CREATE INDEX IF NOT EXISTS idx_stock_holds_expires_at ON t_p54427834_mission_dark_store.stock_holds (expires_at);
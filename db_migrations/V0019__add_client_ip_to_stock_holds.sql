@@ -0,0 +1,6 @@
+-- Client address of each hold, so reserve-stock can cap how many open checkouts one IP holds stock for.
+-- Holds made before this migration (and by callers the gateway did not identify) stay NULL and uncounted.
+ALTER TABLE t_p54427834_mission_dark_store.stock_holds ADD COLUMN IF NOT EXISTS client_ip TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_stock_holds_client_ip ON t_p54427834_mission_dark_store.stock_holds (client_ip, expires_at)
+WHERE client_ip IS NOT NULL;
@@ -0,0 +1,4 @@
+-- SHA-256 of the submitted order body, so an Idempotency-Key reused for a different order is rejected
+-- instead of replaying the first one. Orders placed before this migration have none and replay as before.
+ALTER TABLE t_p54427834_mission_dark_store.orders
+ADD COLUMN IF NOT EXISTS request_hash CHAR(64);
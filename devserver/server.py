@@ -0,0 +1,371 @@
+'''
+Local dev server hosting every backend function in one process.
+
+Each backend/<name>/index.py handler is mounted at /<name> on a single asyncio HTTP/1.1
+server. Requests are translated into the cloud function event/context shape and run on a
+thread pool, so long-polls (order-events) and slow queries do not hold up other requests.
+
+    DATABASE_URL=postgresql://localhost/shop python devserver/server.py --port 8000
+
+Calls between functions stay in-process: urllib requests from a handler to a deployed
+function URL in backend/func2url.json are answered by the local handler, and
+GET /func2url.json returns the map pointing at this server. Timer-triggered functions
+run on an interval with --timer dispatch-notifications=5, --fake-telegram sends
+notifications to a local stub, and --profile writes cProfile stats aggregated over all
+requests (requests are serialized while profiling).
+'''
+import argparse
+import asyncio
+import base64
+import cProfile
+import email.message
+import glob
+import importlib.util
+import io
+import json
+import mimetypes
+import os
+import pstats
+import signal
+import sys
+import tempfile
+import threading
+import time
+import types
+import urllib.request
+import urllib.response
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+DEVSERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(DEVSERVER_DIR, '..', 'backend')
+BENCHMARKS_DIR = os.path.join(DEVSERVER_DIR, '..', 'benchmarks')
+sys.path.insert(0, BACKEND_DIR)
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 10 * 1024 * 1024
+KEEP_ALIVE_SECONDS = 75
+
+
+class FunctionHost:
+    '''
+    Loads the backend handlers and invokes them with cloud-function style events.
+    All functions share one interpreter, so they also share the shared/ module state
+    (connection pool, caches, metrics) the way warm containers of one function would.
+    '''
+
+    def __init__(self, profile_path: Optional[str] = None):
+        self.handlers: Dict[str, Any] = {}
+        self.profile_path = profile_path
+        self._stats: Optional[pstats.Stats] = None
+        self._stats_lock = threading.Lock()
+        self._profiling = threading.local()
+        with open(os.path.join(BACKEND_DIR, 'func2url.json'), encoding='utf-8') as func2url:
+            self.deployed_urls: Dict[str, str] = json.load(func2url)
+
+    def load_all(self) -> List[str]:
+        '''
+        Import every backend/*/index.py; functions whose dependencies are missing are skipped.
+        '''
+        for path in sorted(glob.glob(os.path.join(BACKEND_DIR, '*', 'index.py'))):
+            name = os.path.basename(os.path.dirname(path))
+            spec = importlib.util.spec_from_file_location(f"devserver_{name.replace('-', '_')}", path)
+            module = importlib.util.module_from_spec(spec)
+            try:
+                spec.loader.exec_module(module)
+            except ImportError as e:
+                print(f'skipping {name}: {e}', file=sys.stderr)
+                continue
+            self.handlers[name] = module.handler
+        return sorted(self.handlers)
+
+    def invoke(self, name: str, event: Dict[str, Any]) -> Dict[str, Any]:
+        context = types.SimpleNamespace(
+            request_id=event.get('requestContext', {}).get('requestId') or uuid.uuid4().hex,
+            function_name=name,
+            function_version='local',
+            memory_limit_in_mb=128
+        )
+        # Nested in-process calls are already covered by the caller's profiler
+        if not self.profile_path or getattr(self._profiling, 'active', False):
+            return self.handlers[name](event, context)
+
+        # One profiler may be active at a time, so requests run one by one while profiling
+        with self._stats_lock:
+            profiler = cProfile.Profile()
+            self._profiling.active = True
+            try:
+                return profiler.runcall(self.handlers[name], event, context)
+            finally:
+                self._profiling.active = False
+                if self._stats is None:
+                    self._stats = pstats.Stats(profiler)
+                else:
+                    self._stats.add(profiler)
+
+    def dump_profile(self) -> None:
+        if self.profile_path and self._stats is not None:
+            self._stats.dump_stats(self.profile_path)
+            print(f'profile written to {self.profile_path}', file=sys.stderr)
+
+    def resolve(self, url: str) -> Optional[Tuple[str, str]]:
+        '''
+        Map a deployed function URL to (function name, remaining path), or None.
+        '''
+        for name, deployed_url in self.deployed_urls.items():
+            if name in self.handlers and (url == deployed_url or url.startswith((deployed_url + '/', deployed_url + '?'))):
+                return name, url[len(deployed_url):]
+        return None
+
+
+def build_event(method: str, target: str, headers: Dict[str, str], body: bytes, source_ip: str) -> Dict[str, Any]:
+    parts = urlsplit(target)
+    try:
+        text_body, is_base64 = body.decode('utf-8'), False
+    except UnicodeDecodeError:
+        text_body, is_base64 = base64.b64encode(body).decode('ascii'), True
+    return {
+        'httpMethod': method,
+        'path': parts.path,
+        'headers': headers,
+        'queryStringParameters': dict(parse_qsl(parts.query, keep_blank_values=True)),
+        'body': text_body,
+        'isBase64Encoded': is_base64,
+        'requestContext': {
+            'requestId': uuid.uuid4().hex,
+            'identity': {'sourceIp': source_ip}
+        }
+    }
+
+
+def response_bytes(result: Dict[str, Any]) -> Tuple[int, Dict[str, str], bytes]:
+    body = result.get('body') or ''
+    if result.get('isBase64Encoded'):
+        payload = base64.b64decode(body)
+    else:
+        payload = body.encode('utf-8') if isinstance(body, str) else json.dumps(body).encode('utf-8')
+    return int(result.get('statusCode', 200)), dict(result.get('headers') or {}), payload
+
+
+class LocalFunctionHandler(urllib.request.BaseHandler):
+    '''
+    urllib handler that answers requests to deployed function URLs from the local handlers.
+    Other URLs fall through to the regular HTTP handlers.
+    '''
+    # Runs before the default HTTP(S) handlers
+    handler_order = 100
+
+    def __init__(self, host: FunctionHost):
+        self.host = host
+
+    def _open(self, request: urllib.request.Request) -> Optional[urllib.response.addinfourl]:
+        resolved = self.host.resolve(request.full_url)
+        if resolved is None:
+            return None
+        name, rest = resolved
+        body = request.data or b''
+        event = build_event(request.get_method(), '/' + name + rest, dict(request.header_items()), body, '127.0.0.1')
+        status, headers, payload = response_bytes(self.host.invoke(name, event))
+        message = email.message.Message()
+        for key, value in headers.items():
+            message[key] = value
+        result = urllib.response.addinfourl(io.BytesIO(payload), message, request.full_url, status)
+        result.msg = HTTPStatus(status).phrase if status in HTTPStatus._value2member_map_ else ''
+        return result
+
+    http_open = _open
+    https_open = _open
+
+
+class DevServer:
+    def __init__(self, host: FunctionHost, executor: ThreadPoolExecutor, base_url: str, media_root: str):
+        self.host = host
+        self.executor = executor
+        self.base_url = base_url
+        self.media_root = os.path.abspath(media_root)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = writer.get_extra_info('peername') or ('127.0.0.1', 0)
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEP_ALIVE_SECONDS)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self.write(writer, 431, {}, b'', keep_alive=False)
+                    return
+
+                request_line, *header_lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = request_line.split(' ', 2)
+                except ValueError:
+                    await self.write(writer, 400, {}, b'', keep_alive=False)
+                    return
+                headers: Dict[str, str] = {}
+                for line in header_lines:
+                    if ':' in line:
+                        key, value = line.split(':', 1)
+                        headers[key.strip()] = value.strip()
+                lowered = {key.lower(): value for key, value in headers.items()}
+
+                if 'chunked' in lowered.get('transfer-encoding', '').lower():
+                    await self.write(writer, 411, {}, b'', keep_alive=False)
+                    return
+                length = int(lowered.get('content-length') or 0)
+                if length > MAX_BODY_BYTES:
+                    await self.write(writer, 413, {}, b'', keep_alive=False)
+                    return
+                body = await reader.readexactly(length) if length else b''
+
+                connection = lowered.get('connection', '').lower()
+                keep_alive = connection != 'close' and (version != 'HTTP/1.0' or connection == 'keep-alive')
+                status, response_headers, payload = await self.dispatch(method, target, headers, body, peer[0])
+                await self.write(writer, status, response_headers, b'' if method == 'HEAD' else payload,
+                                 keep_alive, content_length=len(payload))
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    async def dispatch(self, method: str, target: str, headers: Dict[str, str], body: bytes,
+                       source_ip: str) -> Tuple[int, Dict[str, str], bytes]:
+        path = urlsplit(target).path
+        name = path.strip('/').split('/', 1)[0]
+
+        if path in ('/', ''):
+            return self.json(200, {'functions': {fn: f'{self.base_url}/{fn}' for fn in self.host.handlers}})
+        if path == '/func2url.json':
+            return self.json(200, {fn: f'{self.base_url}/{fn}' for fn in self.host.handlers})
+        if name == 'media' and method in ('GET', 'HEAD'):
+            return await asyncio.get_running_loop().run_in_executor(self.executor, self.read_media, path[len('/media/'):])
+        if name not in self.host.handlers:
+            return self.json(404, {'error': f'Unknown function {name}'})
+
+        event = build_event(method, target, headers, body, source_ip)
+        started = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, self.host.invoke, name, event)
+            status, response_headers, payload = response_bytes(result)
+        except Exception as e:
+            status, response_headers, payload = self.json(500, {'error': f'{type(e).__name__}: {e}'})
+        print(f'{method} {target} -> {status} {(time.perf_counter() - started) * 1000:.1f}ms', file=sys.stderr)
+        return status, response_headers, payload
+
+    def read_media(self, key: str) -> Tuple[int, Dict[str, str], bytes]:
+        # Files written by process-media through shared/media.LocalStorage
+        path = os.path.abspath(os.path.join(self.media_root, key))
+        if not path.startswith(self.media_root + os.sep) or not os.path.isfile(path):
+            return self.json(404, {'error': 'Not found'})
+        with open(path, 'rb') as media_file:
+            data = media_file.read()
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        return 200, {'Content-Type': content_type, 'Cache-Control': 'public, max-age=31536000, immutable'}, data
+
+    @staticmethod
+    def json(status: int, payload: Any) -> Tuple[int, Dict[str, str], bytes]:
+        return status, {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}, json.dumps(payload).encode('utf-8')
+
+    @staticmethod
+    async def write(writer: asyncio.StreamWriter, status: int, headers: Dict[str, str], payload: bytes,
+                    keep_alive: bool, content_length: Optional[int] = None) -> None:
+        reason = HTTPStatus(status).phrase if status in HTTPStatus._value2member_map_ else ''
+        lines = [f'HTTP/1.1 {status} {reason}']
+        for key, value in headers.items():
+            if key.lower() not in ('content-length', 'connection', 'transfer-encoding'):
+                lines.append(f'{key}: {value}')
+        lines.append(f'Content-Length: {len(payload) if content_length is None else content_length}')
+        lines.append('Connection: keep-alive' if keep_alive else 'Connection: close')
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + payload)
+        await writer.drain()
+
+
+async def run_timer(server: DevServer, name: str, interval: float) -> None:
+    '''
+    Invoke a timer-triggered function every `interval` seconds, like the cloud scheduler.
+    Timer invocations carry no httpMethod.
+    '''
+    while True:
+        event = {'requestContext': {'requestId': uuid.uuid4().hex}}
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(server.executor, server.host.invoke, name, event)
+            print(f'timer {name} -> {result.get("statusCode")} {result.get("body", "")[:200]}', file=sys.stderr)
+        except Exception as e:
+            print(f'timer {name} failed: {type(e).__name__}: {e}', file=sys.stderr)
+        await asyncio.sleep(interval)
+
+
+async def serve(args: argparse.Namespace, host: FunctionHost) -> None:
+    from shared import media
+
+    executor = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix='function')
+    server = DevServer(host, executor, f'http://{args.host}:{args.port}', media.MEDIA_ROOT)
+    listener = await asyncio.start_server(server.handle_connection, args.host, args.port,
+                                          limit=MAX_HEADER_BYTES, backlog=1024)
+
+    timers = []
+    for spec in args.timer or []:
+        name, _, seconds = spec.partition('=')
+        if name not in host.handlers:
+            raise SystemExit(f'--timer: unknown function {name}')
+        timers.append(asyncio.create_task(run_timer(server, name, float(seconds or 60))))
+
+    print(f'serving {len(host.handlers)} functions on {server.base_url}', file=sys.stderr)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        for timer in timers:
+            timer.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Serve every backend function from one local process')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=32, help='handler threads (and database connections)')
+    parser.add_argument('--timer', action='append', metavar='NAME=SECONDS', help='run a function on an interval')
+    parser.add_argument('--fake-telegram', action='store_true', help='send Telegram messages to a local stub')
+    parser.add_argument('--profile', metavar='PATH', help='write aggregated cProfile stats here on exit')
+    args = parser.parse_args(argv)
+
+    if not os.environ.get('DATABASE_URL'):
+        parser.error('DATABASE_URL is required')
+
+    telegram = None
+    if args.fake_telegram:
+        sys.path.insert(0, BENCHMARKS_DIR)
+        from fake_telegram import FakeTelegram
+        telegram = FakeTelegram().start()
+        os.environ.update({'TELEGRAM_API_URL': telegram.url, 'TELEGRAM_BOT_TOKEN': 'dev-token', 'TELEGRAM_CHAT_ID': '1'})
+
+    # Settings are read at import time, so they are applied before the functions load
+    os.environ.setdefault('MEDIA_ROOT', os.path.join(tempfile.gettempdir(), 'media'))
+    os.environ.setdefault('MEDIA_BASE_URL', f'http://{args.host}:{args.port}/media')
+    from shared import db
+    db.POOL_MAX_SIZE = max(db.POOL_MAX_SIZE, args.workers)
+
+    host = FunctionHost(profile_path=args.profile)
+    host.load_all()
+    urllib.request.install_opener(urllib.request.build_opener(LocalFunctionHandler(host)))
+
+    # Stop on SIGTERM the same way as on Ctrl+C, so the profile is still written
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        asyncio.run(serve(args, host))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        host.dump_profile()
+        db.close_pool()
+        if telegram is not None:
+            telegram.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,6 +7,10 @@ import { Separator } from '@/components/ui/separator';
 import { RadioGroup, RadioGroupItem } from '@/components/ui/radio-group';
 import { CartItem } from '@/types/product';
 import Icon from '@/components/ui/icon';
+import { useToast } from '@/hooks/use-toast';
+import funcUrls from '../../backend/func2url.json';
+
+const RESERVE_STOCK_URL = (funcUrls as Record<string, string>)['reserve-stock'];
 
 interface CheckoutProps {
   isOpen: boolean;
@@ -29,7 +33,52 @@ export default function Checkout({ isOpen, onClose, items, total, onSuccess }: C
     paymentMethod: 'card',
   });
   const [suggestions, setSuggestions] = useState<string[]>([]);
+  const { toast } = useToast();
   const addressInputRef = useRef<HTMLInputElement>(null);
+  // One key per checkout attempt, so retries of the same submission never create a second order
+  const idempotencyKeyRef = useRef<string | null>(null);
+
+  const reserveStock = (cartItems: CartItem[], reservation = idempotencyKeyRef.current) => {
+    if (!RESERVE_STOCK_URL || !reservation) return Promise.resolve(null);
+    return fetch(RESERVE_STOCK_URL, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        reservation,
+        items: cartItems.map(({ id, size, quantity }) => ({ id, size, quantity })),
+      }),
+      keepalive: true,
+    }).catch(() => null);
+  };
+
+  // Hold the cart's stock under the order's Idempotency-Key while the form is filled in;
+  // submit-order converts the hold, and closing the dialog without ordering releases it.
+  // A changed cart is a different order, so it gets a fresh key and the old hold is released.
+  useEffect(() => {
+    if (!isOpen || items.length === 0) return;
+    if (idempotencyKeyRef.current) {
+      reserveStock([], idempotencyKeyRef.current);
+    }
+    idempotencyKeyRef.current = crypto.randomUUID();
+    reserveStock(items).then((response) => {
+      if (response?.status === 422) {
+        toast({
+          title: 'Товар закончился',
+          description: 'Некоторых размеров из корзины больше нет в наличии.',
+          variant: 'destructive',
+        });
+      }
+    });
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [isOpen, items]);
+
+  const handleClose = () => {
+    if (step !== 'success') {
+      reserveStock([]);
+    }
+    idempotencyKeyRef.current = null;
+    onClose();
+  };
 
   useEffect(() => {
     if (formData.address.length > 3) {
@@ -65,6 +114,28 @@ export default function Checkout({ isOpen, onClose, items, total, onSuccess }: C
     return true;
   };
 
+  const submitOrder = async (orderData: object, idempotencyKey: string) => {
+    const maxAttempts = 3;
+    for (let attempt = 1; ; attempt++) {
+      try {
+        const response = await fetch('https://functions.poehali.dev/ae5e4f87-c31c-4abe-a06d-7f2cd6f34000', {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+            'Idempotency-Key': idempotencyKey,
+          },
+          body: JSON.stringify(orderData)
+        });
+        if (response.status < 500 || attempt >= maxAttempts) {
+          return response;
+        }
+      } catch (error) {
+        if (attempt >= maxAttempts) throw error;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 500 * 2 ** attempt));
+    }
+  };
+
   const handleNext = async () => {
     if (!validateStep()) return;
 
@@ -81,18 +152,17 @@ export default function Checkout({ isOpen, onClose, items, total, onSuccess }: C
         total: finalTotal
       };
 
+      if (!idempotencyKeyRef.current) {
+        idempotencyKeyRef.current = crypto.randomUUID();
+      }
+
       try {
-        const response = await fetch('https://functions.poehali.dev/ae5e4f87-c31c-4abe-a06d-7f2cd6f34000', {
-          method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-          },
-          body: JSON.stringify(orderData)
-        });
+        const response = await submitOrder(orderData, idempotencyKeyRef.current);
 
         if (response.ok) {
           setStep('success');
           setTimeout(() => {
+            idempotencyKeyRef.current = null;
             onSuccess();
             onClose();
             setStep('info');
@@ -107,6 +177,22 @@ export default function Checkout({ isOpen, onClose, items, total, onSuccess }: C
               paymentMethod: 'card',
             });
           }, 3000);
+        } else if (response.status === 422) {
+          // Prices, stock or sizes changed since the cart was filled; the key is tied to the stale cart
+          reserveStock([]);
+          idempotencyKeyRef.current = null;
+          toast({
+            title: 'Не удалось оформить заказ',
+            description: 'Цена или наличие некоторых товаров изменились. Обновите корзину и попробуйте снова.',
+            variant: 'destructive',
+          });
+        } else if (response.status === 429) {
+          // Rate limited before the order was written; the same key is safe to retry later
+          toast({
+            title: 'Слишком много попыток',
+            description: 'Подождите минуту и попробуйте оформить заказ снова.',
+            variant: 'destructive',
+          });
         }
       } catch (error) {
         console.error('Order submission failed:', error);
@@ -120,7 +206,7 @@ export default function Checkout({ isOpen, onClose, items, total, onSuccess }: C
   };
 
   return (
-    <Dialog open={isOpen} onOpenChange={onClose}>
+    <Dialog open={isOpen} onOpenChange={handleClose}>
       <DialogContent className="sm:max-w-2xl max-h-[90vh] overflow-y-auto">
         <DialogHeader>
           <DialogTitle className="text-2xl">Оформление заказа</DialogTitle>
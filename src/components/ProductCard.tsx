@@ -16,6 +16,7 @@ import {
   SelectValue,
 } from '@/components/ui/select';
 import { Product } from '@/types/product';
+import ProductImage from '@/components/ProductImage';
 
 interface ProductCardProps {
   product: Product;
@@ -48,9 +49,12 @@ export default function ProductCard({
     <>
       <Card className="group overflow-hidden border-border bg-card hover:border-primary/50 transition-all duration-300">
         <div className="relative aspect-[3/4] overflow-hidden bg-secondary">
-          <img
+          <ProductImage
             src={images[currentImageIndex]}
             alt={product.name}
+            media={product.media}
+            variant="card"
+            sizes="(min-width: 1280px) 25vw, (min-width: 1024px) 33vw, (min-width: 640px) 50vw, 100vw"
             className="w-full h-full object-cover transition-transform duration-500 group-hover:scale-105"
           />
           
@@ -136,9 +140,12 @@ export default function ProductCard({
           
           <div className="space-y-4">
             <div className="aspect-[3/4] relative overflow-hidden rounded bg-secondary">
-              <img
+              <ProductImage
                 src={images[currentImageIndex]}
                 alt={product.name}
+                media={product.media}
+                variant="zoom"
+                sizes="(min-width: 640px) 448px, 100vw"
                 className="w-full h-full object-cover"
               />
               
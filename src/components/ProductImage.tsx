@@ -0,0 +1,42 @@
+import { useState } from 'react';
+import { ProductMedia } from '@/types/product';
+
+interface ProductImageProps {
+  src: string;
+  alt: string;
+  media?: ProductMedia[];
+  variant: 'thumbnail' | 'card' | 'zoom';
+  sizes: string;
+  className?: string;
+}
+
+// Serves the generated AVIF/WebP variants when the image has been processed, the original URL otherwise
+// (also when a variant fails to load, so a missing variant file never leaves a broken image)
+export default function ProductImage({ src, alt, media, variant, sizes, className }: ProductImageProps) {
+  const [failedSource, setFailedSource] = useState<string | null>(null);
+  const manifest = media?.find((item) => item.source === src);
+  const image = manifest?.variants[variant];
+
+  if (!manifest || !image || failedSource === src) {
+    return <img src={src} alt={alt} className={className} loading="lazy" />;
+  }
+
+  return (
+    <picture>
+      {image.sources.map((source) => (
+        <source key={source.type} type={source.type} srcSet={source.srcset} sizes={sizes} />
+      ))}
+      <img
+        src={image.src}
+        alt={alt}
+        width={image.width}
+        height={image.height}
+        loading="lazy"
+        decoding="async"
+        onError={() => setFailedSource(src)}
+        className={className}
+        style={{ backgroundImage: `url(${manifest.placeholder})`, backgroundSize: 'cover' }}
+      />
+    </picture>
+  );
+}
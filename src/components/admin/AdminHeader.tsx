@@ -6,9 +6,10 @@ interface AdminHeaderProps {
   onRefresh: () => void;
   onLogout: () => void;
   onTestTelegram: () => void;
+  onExport: () => void;
 }
 
-export default function AdminHeader({ onRefresh, onLogout, onTestTelegram }: AdminHeaderProps) {
+export default function AdminHeader({ onRefresh, onLogout, onTestTelegram, onExport }: AdminHeaderProps) {
   const navigate = useNavigate();
 
   return (
@@ -30,6 +31,10 @@ export default function AdminHeader({ onRefresh, onLogout, onTestTelegram }: Adm
               <Icon name="Send" size={16} className="mr-2" />
               Тест Telegram
             </Button>
+            <Button onClick={onExport} variant="outline" size="sm">
+              <Icon name="Download" size={16} className="mr-2" />
+              Экспорт CSV
+            </Button>
             <Button onClick={onRefresh} variant="outline" size="sm">
               <Icon name="RefreshCw" size={16} className="mr-2" />
               Обновить
@@ -9,6 +9,7 @@ import {
   TableRow,
 } from '@/components/ui/table';
 import { Badge } from '@/components/ui/badge';
+import { Checkbox } from '@/components/ui/checkbox';
 
 interface Order {
   id: number;
@@ -26,9 +27,35 @@ interface OrdersTableProps {
   orders: Order[];
   isLoading: boolean;
   onSelectOrder: (order: Order) => void;
+  hasMore?: boolean;
+  isLoadingMore?: boolean;
+  onLoadMore?: () => void;
+  selectedIds?: number[];
+  onSelectionChange?: (ids: number[]) => void;
 }
 
-export default function OrdersTable({ orders, isLoading, onSelectOrder }: OrdersTableProps) {
+export default function OrdersTable({
+  orders,
+  isLoading,
+  onSelectOrder,
+  hasMore = false,
+  isLoadingMore = false,
+  onLoadMore,
+  selectedIds = [],
+  onSelectionChange
+}: OrdersTableProps) {
+  const allSelected = orders.length > 0 && orders.every((order) => selectedIds.includes(order.id));
+
+  const toggleOrder = (orderId: number, checked: boolean) => {
+    onSelectionChange?.(
+      checked ? [...selectedIds, orderId] : selectedIds.filter((id) => id !== orderId)
+    );
+  };
+
+  const toggleAll = (checked: boolean) => {
+    onSelectionChange?.(checked ? orders.map((order) => order.id) : []);
+  };
+
   const formatDate = (dateString: string) => {
     return new Date(dateString).toLocaleString('ru-RU', {
       year: 'numeric',
@@ -73,6 +100,14 @@ export default function OrdersTable({ orders, isLoading, onSelectOrder }: Orders
         <Table>
           <TableHeader>
             <TableRow>
+              {onSelectionChange && (
+                <TableHead className="w-10">
+                  <Checkbox
+                    checked={allSelected}
+                    onCheckedChange={(checked) => toggleAll(checked === true)}
+                  />
+                </TableHead>
+              )}
               <TableHead>ID</TableHead>
               <TableHead>Дата</TableHead>
               <TableHead>Клиент</TableHead>
@@ -85,6 +120,14 @@ export default function OrdersTable({ orders, isLoading, onSelectOrder }: Orders
           <TableBody>
             {orders.map((order) => (
               <TableRow key={order.id}>
+                {onSelectionChange && (
+                  <TableCell>
+                    <Checkbox
+                      checked={selectedIds.includes(order.id)}
+                      onCheckedChange={(checked) => toggleOrder(order.id, checked === true)}
+                    />
+                  </TableCell>
+                )}
                 <TableCell className="font-medium">#{order.id}</TableCell>
                 <TableCell className="text-sm">
                   {formatDate(order.created_at)}
@@ -114,6 +157,13 @@ export default function OrdersTable({ orders, isLoading, onSelectOrder }: Orders
           </TableBody>
         </Table>
       )}
+      {!isLoading && hasMore && onLoadMore && (
+        <div className="p-4 text-center border-t border-border">
+          <Button variant="outline" size="sm" onClick={onLoadMore} disabled={isLoadingMore}>
+            {isLoadingMore ? 'Загрузка...' : 'Показать ещё'}
+          </Button>
+        </div>
+      )}
     </Card>
   );
 }
@@ -27,10 +27,19 @@ export default function ProductsManager({ products, onUpdate }: ProductsManagerP
       description: product.description,
       sizes: product.sizes,
       image: product.image,
-      inStock: product.inStock !== false
+      inStock: product.inStock !== false,
+      stock: { ...(product.stock || {}) }
     });
   };
 
+  // Products without sizes are stocked under ''; an empty field means the size is not stock-tracked
+  const stockSizes = (product: Product) => (product.sizes.length > 0 ? product.sizes : ['']);
+
+  const handleStockChange = (size: string, value: string) => {
+    const quantity = value === '' ? null : Math.max(0, parseInt(value) || 0);
+    setFormData({ ...formData, stock: { ...(formData.stock || {}), [size]: quantity } });
+  };
+
   const handleImageChange = (e: React.ChangeEvent<HTMLInputElement>) => {
     const file = e.target.files?.[0];
     if (!file) return;
@@ -161,6 +170,24 @@ export default function ProductsManager({ products, onUpdate }: ProductsManagerP
                   />
                   <Label>В наличии</Label>
                 </div>
+                <div>
+                  <Label>Остатки по размерам</Label>
+                  <div className="grid grid-cols-2 md:grid-cols-4 gap-2 mt-1">
+                    {stockSizes(product).map((size) => (
+                      <div key={size} className="flex items-center gap-2">
+                        <span className="w-10 text-sm text-muted-foreground">{size || 'Шт.'}</span>
+                        <Input
+                          type="number"
+                          min={0}
+                          placeholder="∞"
+                          value={formData.stock?.[size] ?? ''}
+                          onChange={(e) => handleStockChange(size, e.target.value)}
+                        />
+                      </div>
+                    ))}
+                  </div>
+                  <p className="text-xs text-muted-foreground mt-1">Пустое поле — без учета остатков</p>
+                </div>
               </div>
             ) : (
               <div className="grid grid-cols-2 gap-4">
@@ -180,7 +207,12 @@ export default function ProductsManager({ products, onUpdate }: ProductsManagerP
                   </div>
                   <div>
                     <Label className="text-muted-foreground">Размеры</Label>
-                    <p>{product.sizes.join(', ')}</p>
+                    <p>
+                      {stockSizes(product)
+                        .map((size) => (product.stock?.[size] != null ? `${size || 'Шт.'}: ${product.stock?.[size]}` : size))
+                        .filter(Boolean)
+                        .join(', ')}
+                    </p>
                   </div>
                   <div>
                     <Label className="text-muted-foreground">Описание</Label>
@@ -1,11 +1,16 @@
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import Icon from '@/components/ui/icon';
 
+interface OrderSummary {
+  by_status: Record<string, { orders: number; revenue: number }>;
+  daily: { day: string; orders: number; revenue: number }[];
+  top_products: { product_id: string; name: string | null; quantity: number; revenue: number }[];
+}
+
 interface StatisticsData {
   page_views: number;
   add_to_cart: number;
-  period_start: string;
-  period_end: string;
+  orders?: OrderSummary;
 }
 
 interface StatisticsCardsProps {
@@ -13,65 +18,112 @@ interface StatisticsCardsProps {
   isLoading: boolean;
 }
 
+const percent = (part: number, whole: number) => (whole > 0 ? ((part / whole) * 100).toFixed(1) : '0.0');
+
 export default function StatisticsCards({ data, isLoading }: StatisticsCardsProps) {
   if (isLoading) {
     return (
-      <div className="grid gap-4 md:grid-cols-2 mb-8">
+      <div className="grid gap-4 md:grid-cols-2 lg:grid-cols-4 mb-8">
+        {[0, 1, 2, 3].map((index) => (
+          <Card key={index}>
+            <CardHeader className="flex flex-row items-center justify-between space-y-0 pb-2">
+              <CardTitle className="text-sm font-medium">Загрузка...</CardTitle>
+            </CardHeader>
+            <CardContent>
+              <div className="h-8 bg-muted animate-pulse rounded" />
+            </CardContent>
+          </Card>
+        ))}
+      </div>
+    );
+  }
+
+  if (!data) {
+    return null;
+  }
+
+  const statuses = Object.values(data.orders?.by_status || {});
+  const ordersCount = statuses.reduce((sum, status) => sum + status.orders, 0);
+  const revenue = statuses.reduce((sum, status) => sum + status.revenue, 0);
+  const completed = data.orders?.by_status.completed;
+  const last30Days = (data.orders?.daily || []).reduce((sum, day) => sum + day.orders, 0);
+  const topProducts = data.orders?.top_products || [];
+
+  return (
+    <div className="mb-8 space-y-4">
+      <div className="grid gap-4 md:grid-cols-2 lg:grid-cols-4">
         <Card>
           <CardHeader className="flex flex-row items-center justify-between space-y-0 pb-2">
-            <CardTitle className="text-sm font-medium">Загрузка...</CardTitle>
+            <CardTitle className="text-sm font-medium">Заходы на сайт</CardTitle>
+            <Icon name="Eye" className="h-4 w-4 text-muted-foreground" />
           </CardHeader>
           <CardContent>
-            <div className="h-8 bg-muted animate-pulse rounded" />
+            <div className="text-2xl font-bold">{data.page_views}</div>
+            <p className="text-xs text-muted-foreground mt-1">
+              За весь период
+            </p>
           </CardContent>
         </Card>
+
         <Card>
           <CardHeader className="flex flex-row items-center justify-between space-y-0 pb-2">
-            <CardTitle className="text-sm font-medium">Загрузка...</CardTitle>
+            <CardTitle className="text-sm font-medium">Добавления в корзину</CardTitle>
+            <Icon name="ShoppingCart" className="h-4 w-4 text-muted-foreground" />
           </CardHeader>
           <CardContent>
-            <div className="h-8 bg-muted animate-pulse rounded" />
+            <div className="text-2xl font-bold">{data.add_to_cart}</div>
+            <p className="text-xs text-muted-foreground mt-1">
+              Конверсия из заходов: {percent(data.add_to_cart, data.page_views)}%
+            </p>
           </CardContent>
         </Card>
-      </div>
-    );
-  }
-
-  if (!data) {
-    return null;
-  }
 
-  const conversionRate = data.page_views > 0 
-    ? ((data.add_to_cart / data.page_views) * 100).toFixed(1)
-    : '0.0';
+        <Card>
+          <CardHeader className="flex flex-row items-center justify-between space-y-0 pb-2">
+            <CardTitle className="text-sm font-medium">Заказы</CardTitle>
+            <Icon name="Package" className="h-4 w-4 text-muted-foreground" />
+          </CardHeader>
+          <CardContent>
+            <div className="text-2xl font-bold">{ordersCount}</div>
+            <p className="text-xs text-muted-foreground mt-1">
+              Конверсия из корзины: {percent(ordersCount, data.add_to_cart)}% · за 30 дней: {last30Days}
+            </p>
+          </CardContent>
+        </Card>
 
-  return (
-    <div className="grid gap-4 md:grid-cols-2 mb-8">
-      <Card>
-        <CardHeader className="flex flex-row items-center justify-between space-y-0 pb-2">
-          <CardTitle className="text-sm font-medium">Заходы на сайт</CardTitle>
-          <Icon name="Eye" className="h-4 w-4 text-muted-foreground" />
-        </CardHeader>
-        <CardContent>
-          <div className="text-2xl font-bold">{data.page_views}</div>
-          <p className="text-xs text-muted-foreground mt-1">
-            За весь период
-          </p>
-        </CardContent>
-      </Card>
+        <Card>
+          <CardHeader className="flex flex-row items-center justify-between space-y-0 pb-2">
+            <CardTitle className="text-sm font-medium">Выручка</CardTitle>
+            <Icon name="Wallet" className="h-4 w-4 text-muted-foreground" />
+          </CardHeader>
+          <CardContent>
+            <div className="text-2xl font-bold">{revenue.toLocaleString('ru-RU')} ₽</div>
+            <p className="text-xs text-muted-foreground mt-1">
+              Выполнено: {(completed?.revenue || 0).toLocaleString('ru-RU')} ₽
+            </p>
+          </CardContent>
+        </Card>
+      </div>
 
-      <Card>
-        <CardHeader className="flex flex-row items-center justify-between space-y-0 pb-2">
-          <CardTitle className="text-sm font-medium">Добавления в корзину</CardTitle>
-          <Icon name="ShoppingCart" className="h-4 w-4 text-muted-foreground" />
-        </CardHeader>
-        <CardContent>
-          <div className="text-2xl font-bold">{data.add_to_cart}</div>
-          <p className="text-xs text-muted-foreground mt-1">
-            Конверсия: {conversionRate}%
-          </p>
-        </CardContent>
-      </Card>
+      {topProducts.length > 0 && (
+        <Card>
+          <CardHeader className="pb-2">
+            <CardTitle className="text-sm font-medium">Популярные товары</CardTitle>
+          </CardHeader>
+          <CardContent>
+            <ul className="space-y-1 text-sm">
+              {topProducts.map((product) => (
+                <li key={product.product_id} className="flex justify-between gap-4">
+                  <span className="truncate">{product.name || product.product_id}</span>
+                  <span className="text-muted-foreground whitespace-nowrap">
+                    {product.quantity} шт · {product.revenue.toLocaleString('ru-RU')} ₽
+                  </span>
+                </li>
+              ))}
+            </ul>
+          </CardContent>
+        </Card>
+      )}
     </div>
   );
 }
@@ -1,5 +1,7 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs';
+import { Button } from '@/components/ui/button';
+import { Input } from '@/components/ui/input';
 import { useToast } from '@/hooks/use-toast';
 import { Product } from '@/types/product';
 import AdminLogin from '@/components/admin/AdminLogin';
@@ -9,6 +11,30 @@ import MessagesList from '@/components/admin/MessagesList';
 import OrderDetailsDialog from '@/components/admin/OrderDetailsDialog';
 import ProductsManager from '@/components/admin/ProductsManager';
 import StatisticsCards from '@/components/admin/StatisticsCards';
+import funcUrls from '../../backend/func2url.json';
+
+const EXPORT_URL = (funcUrls as Record<string, string>)['export-data'];
+const ORDER_EVENTS_URL = (funcUrls as Record<string, string>)['order-events'];
+const SEARCH_URL = (funcUrls as Record<string, string>)['admin-search'];
+const ORDERS_URL = 'https://functions.poehali.dev/af963a7f-06b4-41da-a8ed-362903dc16bb';
+const CHANGES_POLL_INTERVAL = 30000;
+
+// Applies a view=changes delta: replaces updated rows, drops deleted ones and prepends new ones
+function mergeById<T extends { id: number | string }>(
+  current: T[],
+  changed: T[],
+  deletedIds: Array<number | string> = [],
+  acceptNew: (item: T) => boolean = () => true
+): T[] {
+  const changedById = new Map(changed.map((item) => [item.id, item]));
+  const deleted = new Set(deletedIds);
+  const known = new Set(current.map((item) => item.id));
+  const added = changed.filter((item) => !known.has(item.id) && !deleted.has(item.id) && acceptNew(item)).reverse();
+  const merged = current
+    .filter((item) => !deleted.has(item.id))
+    .map((item) => changedById.get(item.id) ?? item);
+  return [...added, ...merged];
+}
 
 interface Order {
   id: number;
@@ -30,19 +56,35 @@ interface ContactMessage {
   created_at: string;
 }
 
+interface OrderSummary {
+  by_status: Record<string, { orders: number; revenue: number }>;
+  daily: { day: string; orders: number; revenue: number }[];
+  top_products: { product_id: string; name: string | null; quantity: number; revenue: number }[];
+}
+
 interface Analytics {
   page_views: number;
   add_to_cart: number;
+  orders?: OrderSummary;
 }
 
 export default function Admin() {
   const [isAuthenticated, setIsAuthenticated] = useState(false);
   const [orders, setOrders] = useState<Order[]>([]);
+  const [ordersTotal, setOrdersTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+  const [selectedOrderIds, setSelectedOrderIds] = useState<number[]>([]);
   const [messages, setMessages] = useState<ContactMessage[]>([]);
   const [products, setProducts] = useState<Product[]>([]);
   const [analytics, setAnalytics] = useState<Analytics | null>(null);
   const [selectedOrder, setSelectedOrder] = useState<Order | null>(null);
   const [isLoading, setIsLoading] = useState(false);
+  const [searchQuery, setSearchQuery] = useState('');
+  const [searchResults, setSearchResults] = useState<Order[] | null>(null);
+  const [searchNextOffset, setSearchNextOffset] = useState<number | null>(null);
+  const [isSearching, setIsSearching] = useState(false);
+  const watermarkRef = useRef<string | null>(null);
   const { toast } = useToast();
 
   useEffect(() => {
@@ -53,13 +95,44 @@ export default function Admin() {
     }
   }, []);
 
+  useEffect(() => {
+    if (!isAuthenticated) return;
+
+    const timer = window.setInterval(() => {
+      if (document.visibilityState === 'visible') {
+        refreshChanges();
+      }
+    }, CHANGES_POLL_INTERVAL);
+    return () => window.clearInterval(timer);
+  }, [isAuthenticated]);
+
+  // New orders are pushed by order-events; EventSource reconnects after each long-poll with Last-Event-ID
+  useEffect(() => {
+    if (!isAuthenticated || !ORDER_EVENTS_URL || typeof EventSource === 'undefined') return;
+
+    const source = new EventSource(ORDER_EVENTS_URL);
+    source.addEventListener('order', (event) => {
+      const order: Order = JSON.parse((event as MessageEvent).data);
+      setOrders((prev) => (prev.some((item) => item.id === order.id) ? prev : [order, ...prev]));
+      setOrdersTotal((prev) => prev + 1);
+      toast({
+        title: 'Новый заказ',
+        description: `№${order.id} — ${order.name}, ${order.total}₽`
+      });
+    });
+    return () => source.close();
+  }, [isAuthenticated]);
+
   const fetchData = async () => {
     setIsLoading(true);
     try {
-      const response = await fetch('https://functions.poehali.dev/af963a7f-06b4-41da-a8ed-362903dc16bb');
+      const response = await fetch(ORDERS_URL);
       const data = await response.json();
 
+      watermarkRef.current = data.watermark || null;
       setOrders(data.orders || []);
+      setOrdersTotal(data.orders_total || 0);
+      setNextCursor(data.next_cursor || null);
       setMessages(data.messages || []);
       setProducts(data.products || []);
       setAnalytics(data.analytics || { page_views: 0, add_to_cart: 0 });
@@ -75,6 +148,115 @@ export default function Admin() {
     }
   };
 
+  // Fetches only rows changed since the last load; falls back to a full reload when the delta is too large
+  const refreshChanges = async () => {
+    if (!watermarkRef.current) {
+      fetchData();
+      return;
+    }
+
+    try {
+      const params = new URLSearchParams({ view: 'changes', since: watermarkRef.current });
+      const response = await fetch(`${ORDERS_URL}?${params}`);
+      const data = await response.json();
+
+      if (!response.ok || data.reset) {
+        fetchData();
+        return;
+      }
+
+      watermarkRef.current = data.watermark;
+      setOrders((prev) => {
+        const oldestLoaded = prev.length > 0 ? prev[prev.length - 1].created_at : null;
+        // Changed orders older than the loaded pages arrive later through "load more"
+        return mergeById(prev, data.orders || [], data.deleted?.orders, (order: Order) =>
+          oldestLoaded === null || order.created_at >= oldestLoaded
+        ).sort((a, b) => b.created_at.localeCompare(a.created_at) || b.id - a.id);
+      });
+      setMessages((prev) => mergeById(prev, data.messages || [], data.deleted?.messages));
+      setProducts((prev) => mergeById(prev, data.products || [], data.deleted?.products));
+      setOrdersTotal(data.orders_total || 0);
+      if ((data.orders || []).length > 0 || (data.deleted?.orders || []).length > 0) {
+        refreshDashboard();
+      }
+    } catch (error) {
+      console.error('Failed to refresh changes:', error);
+    }
+  };
+
+  // Statistics come from the server-side summary tables, a few rows whatever the order history size
+  const refreshDashboard = async () => {
+    try {
+      const response = await fetch(`${ORDERS_URL}?view=dashboard`);
+      const data = await response.json();
+      if (response.ok && data.analytics) {
+        setAnalytics(data.analytics);
+      }
+    } catch (error) {
+      console.error('Failed to refresh dashboard:', error);
+    }
+  };
+
+  const loadMoreOrders = async () => {
+    if (!nextCursor) return;
+
+    setIsLoadingMore(true);
+    try {
+      const params = new URLSearchParams({ view: 'orders', cursor: nextCursor });
+      const response = await fetch(`${ORDERS_URL}?${params}`);
+      const data = await response.json();
+
+      setOrders((prev) => [...prev, ...(data.orders || [])]);
+      setOrdersTotal(data.orders_total || 0);
+      setNextCursor(data.next_cursor || null);
+    } catch (error) {
+      console.error('Failed to load more orders:', error);
+      toast({
+        title: 'Ошибка',
+        description: 'Не удалось загрузить заказы',
+        variant: 'destructive'
+      });
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
+  // Server-side ranked search; offset > 0 appends the next page of matches
+  const searchOrders = async (offset = 0) => {
+    const query = searchQuery.trim();
+    if (query.length < 3) {
+      setSearchResults(null);
+      setSearchNextOffset(null);
+      return;
+    }
+
+    setIsSearching(true);
+    try {
+      const params = new URLSearchParams({ q: query, type: 'orders', offset: String(offset) });
+      const response = await fetch(`${SEARCH_URL}?${params}`);
+      const data = await response.json();
+      const found: Order[] = data.orders?.items || [];
+
+      setSearchResults((prev) => (offset > 0 && prev ? [...prev, ...found] : found));
+      setSearchNextOffset(data.orders?.next_offset ?? null);
+    } catch (error) {
+      console.error('Failed to search orders:', error);
+      toast({
+        title: 'Ошибка',
+        description: 'Не удалось выполнить поиск',
+        variant: 'destructive'
+      });
+    } finally {
+      setIsSearching(false);
+    }
+  };
+
+  const clearSearch = () => {
+    setSearchQuery('');
+    setSearchResults(null);
+    setSearchNextOffset(null);
+  };
+
   const updateOrderStatus = async (orderId: number, newStatus: string) => {
     try {
       const response = await fetch('https://functions.poehali.dev/f1b7ce7b-2c2f-4c89-a900-04a965ca2175', {
@@ -95,7 +277,7 @@ export default function Admin() {
           title: 'Готово',
           description: 'Статус заказа обновлен'
         });
-        fetchData();
+        refreshChanges();
         if (selectedOrder?.id === orderId) {
           setSelectedOrder({ ...selectedOrder, status: newStatus });
         }
@@ -131,7 +313,7 @@ export default function Admin() {
           description: 'Заказ удален'
         });
         setSelectedOrder(null);
-        fetchData();
+        refreshChanges();
       }
     } catch (error) {
       toast({
@@ -142,6 +324,43 @@ export default function Admin() {
     }
   };
 
+  const runBulkOrderAction = async (body: Record<string, unknown>, successMessage: string) => {
+    if (selectedOrderIds.length === 0) return;
+
+    try {
+      const response = await fetch('https://functions.poehali.dev/f1b7ce7b-2c2f-4c89-a900-04a965ca2175', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ ...body, ids: selectedOrderIds })
+      });
+
+      const data = await response.json();
+
+      if (data.success) {
+        toast({
+          title: 'Готово',
+          description: `${successMessage}: ${data.affected}`
+        });
+        setSelectedOrderIds([]);
+        refreshChanges();
+      }
+    } catch (error) {
+      toast({
+        title: 'Ошибка',
+        description: 'Не удалось выполнить действие',
+        variant: 'destructive'
+      });
+    }
+  };
+
+  const bulkUpdateStatus = (status: string) =>
+    runBulkOrderAction({ action: 'bulk_update_status', status }, 'Обновлено заказов');
+
+  const bulkDeleteOrders = () => {
+    if (!confirm(`Удалить выбранные заказы (${selectedOrderIds.length})?`)) return;
+    runBulkOrderAction({ action: 'bulk_delete', type: 'order' }, 'Удалено заказов');
+  };
+
   const deleteMessage = async (messageId: number) => {
     if (!confirm('Вы уверены, что хотите удалить это сообщение?')) return;
 
@@ -163,7 +382,7 @@ export default function Admin() {
           title: 'Готово',
           description: 'Сообщение удалено'
         });
-        fetchData();
+        refreshChanges();
       }
     } catch (error) {
       toast({
@@ -174,6 +393,11 @@ export default function Admin() {
     }
   };
 
+  const exportOrders = () => {
+    const params = new URLSearchParams({ dataset: 'orders', format: 'csv' });
+    window.open(`${EXPORT_URL}?${params}`, '_blank');
+  };
+
   const handleLogout = () => {
     sessionStorage.removeItem('admin_auth');
     setIsAuthenticated(false);
@@ -216,14 +440,14 @@ export default function Admin() {
 
   return (
     <div className="min-h-screen bg-background">
-      <AdminHeader onRefresh={fetchData} onLogout={handleLogout} onTestTelegram={testTelegram} />
+      <AdminHeader onRefresh={fetchData} onLogout={handleLogout} onTestTelegram={testTelegram} onExport={exportOrders} />
 
       <div className="container mx-auto px-4 py-8">
         <StatisticsCards data={analytics} isLoading={isLoading} />
         <Tabs defaultValue="orders" className="w-full">
           <TabsList className="grid w-full max-w-2xl grid-cols-3">
             <TabsTrigger value="orders">
-              Заказы ({orders.length})
+              Заказы ({ordersTotal})
             </TabsTrigger>
             <TabsTrigger value="messages">
               Сообщения ({messages.length})
@@ -234,10 +458,52 @@ export default function Admin() {
           </TabsList>
 
           <TabsContent value="orders" className="mt-6">
+            <form
+              className="flex gap-2 mb-4 max-w-xl"
+              onSubmit={(e) => {
+                e.preventDefault();
+                searchOrders();
+              }}
+            >
+              <Input
+                value={searchQuery}
+                onChange={(e) => setSearchQuery(e.target.value)}
+                placeholder="Поиск: имя, телефон, email, Telegram, адрес"
+              />
+              <Button type="submit" variant="outline" disabled={isSearching}>
+                Найти
+              </Button>
+              {searchResults !== null && (
+                <Button type="button" variant="ghost" onClick={clearSearch}>
+                  Сбросить
+                </Button>
+              )}
+            </form>
+            {selectedOrderIds.length > 0 && (
+              <div className="flex flex-wrap items-center gap-2 mb-4">
+                <span className="text-sm text-muted-foreground mr-2">
+                  Выбрано: {selectedOrderIds.length}
+                </span>
+                <Button variant="outline" size="sm" onClick={() => bulkUpdateStatus('processing')}>
+                  В обработку
+                </Button>
+                <Button variant="outline" size="sm" onClick={() => bulkUpdateStatus('completed')}>
+                  Выполнены
+                </Button>
+                <Button variant="destructive" size="sm" onClick={bulkDeleteOrders}>
+                  Удалить
+                </Button>
+              </div>
+            )}
             <OrdersTable
-              orders={orders}
+              orders={searchResults ?? orders}
               isLoading={isLoading}
               onSelectOrder={setSelectedOrder}
+              hasMore={searchResults !== null ? searchNextOffset !== null : nextCursor !== null}
+              isLoadingMore={searchResults !== null ? isSearching : isLoadingMore}
+              onLoadMore={searchResults !== null ? () => searchOrders(searchNextOffset ?? 0) : loadMoreOrders}
+              selectedIds={selectedOrderIds}
+              onSelectionChange={setSelectedOrderIds}
             />
           </TabsContent>
 
@@ -252,7 +518,7 @@ export default function Admin() {
           <TabsContent value="products" className="mt-6">
             <ProductsManager
               products={products}
-              onUpdate={fetchData}
+              onUpdate={refreshChanges}
             />
           </TabsContent>
         </Tabs>
@@ -9,6 +9,10 @@ import Cart from '@/components/Cart';
 import Checkout from '@/components/Checkout';
 import { Product, CartItem } from '@/types/product';
 import { useToast } from '@/hooks/use-toast';
+import { trackPageView, trackAddToCart } from '@/utils/analytics';
+import funcUrls from '../../backend/func2url.json';
+
+const CATALOG_URL = (funcUrls as Record<string, string>)['get-products'];
 
 
 
@@ -24,24 +28,9 @@ export default function Index() {
   const { toast } = useToast();
 
   useEffect(() => {
-    const trackPageView = async () => {
-      try {
-        await fetch('https://functions.poehali.dev/c6e2bd06-d47b-4b91-844f-57e0cfe14b09', {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({
-            event_type: 'page_view',
-            event_data: { page: window.location.pathname }
-          })
-        });
-      } catch (error) {
-        console.error('Failed to track page view:', error);
-      }
-    };
-    
     const fetchProducts = async () => {
       try {
-        const response = await fetch('https://functions.poehali.dev/af963a7f-06b4-41da-a8ed-362903dc16bb');
+        const response = await fetch(CATALOG_URL);
         const data = await response.json();
         
         if (data.products) {
@@ -57,22 +46,7 @@ export default function Index() {
   }, []);
 
   const handleAddToCart = (product: Product, size: string) => {
-    const trackAddToCart = async () => {
-      try {
-        await fetch('https://functions.poehali.dev/c6e2bd06-d47b-4b91-844f-57e0cfe14b09', {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({
-            event_type: 'add_to_cart',
-            event_data: { product_id: product.id, product_name: product.name }
-          })
-        });
-      } catch (error) {
-        console.error('Failed to track add to cart:', error);
-      }
-    };
-    
-    trackAddToCart();
+    trackAddToCart(product.id, product.name);
     
     const existingItem = cartItems.find(
       (item) => item.id === product.id && item.size === size
@@ -1,3 +1,25 @@
+export interface MediaSource {
+  type: string;
+  srcset: string;
+}
+
+export interface MediaVariant {
+  src: string;
+  width: number;
+  height: number;
+  sources: MediaSource[];
+}
+
+// Variant manifest for one product image, generated by the process-media function
+export interface ProductMedia {
+  source: string;
+  width: number;
+  height: number;
+  blurhash: string;
+  placeholder: string;
+  variants: Record<'thumbnail' | 'card' | 'zoom', MediaVariant>;
+}
+
 export interface Product {
   id: string;
   name: string;
@@ -8,6 +30,9 @@ export interface Product {
   description: string;
   sizes: string[];
   inStock?: boolean;
+  media?: ProductMedia[];
+  // Admin only: sellable quantity per size ('' for products without sizes); missing sizes are not tracked
+  stock?: Record<string, number | null>;
 }
 
 export interface CartItem extends Product {
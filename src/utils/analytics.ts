@@ -1,42 +1,86 @@
-const ANALYTICS_ENDPOINT = 'https://functions.poehali.dev/track-analytics';
-
-export const trackPageView = async () => {
-  try {
-    await fetch(ANALYTICS_ENDPOINT, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json'
-      },
-      body: JSON.stringify({
-        event_type: 'page_view',
-        event_data: {
-          page: window.location.pathname,
-          timestamp: new Date().toISOString()
-        }
-      })
-    });
-  } catch (error) {
-    console.error('Failed to track page view:', error);
+import funcUrls from '../../backend/func2url.json';
+
+const ANALYTICS_ENDPOINT = funcUrls['track-analytics'];
+const FLUSH_INTERVAL_MS = 5000;
+const MAX_BATCH_SIZE = 20;
+
+interface AnalyticsEvent {
+  event_type: string;
+  event_data: Record<string, unknown>;
+}
+
+let queue: AnalyticsEvent[] = [];
+let flushTimer: ReturnType<typeof setTimeout> | null = null;
+let unloadListenersAttached = false;
+
+const flush = (useBeacon = false) => {
+  if (flushTimer) {
+    clearTimeout(flushTimer);
+    flushTimer = null;
   }
+  if (queue.length === 0) return;
+
+  const events = queue;
+  queue = [];
+  const body = JSON.stringify({ events });
+
+  // sendBeacon survives page unload; a plain string body avoids a CORS preflight
+  if (useBeacon && navigator.sendBeacon && navigator.sendBeacon(ANALYTICS_ENDPOINT, body)) {
+    return;
+  }
+
+  fetch(ANALYTICS_ENDPOINT, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json'
+    },
+    body,
+    keepalive: true
+  }).catch((error) => {
+    console.error('Failed to send analytics events:', error);
+  });
 };
 
-export const trackAddToCart = async (productId: string, productName: string) => {
-  try {
-    await fetch(ANALYTICS_ENDPOINT, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json'
-      },
-      body: JSON.stringify({
-        event_type: 'add_to_cart',
-        event_data: {
-          product_id: productId,
-          product_name: productName,
-          timestamp: new Date().toISOString()
-        }
-      })
-    });
-  } catch (error) {
-    console.error('Failed to track add to cart:', error);
+const attachUnloadListeners = () => {
+  if (unloadListenersAttached) return;
+  unloadListenersAttached = true;
+
+  document.addEventListener('visibilitychange', () => {
+    if (document.visibilityState === 'hidden') {
+      flush(true);
+    }
+  });
+  window.addEventListener('pagehide', () => flush(true));
+};
+
+const enqueue = (event: AnalyticsEvent) => {
+  attachUnloadListeners();
+  queue.push(event);
+
+  if (queue.length >= MAX_BATCH_SIZE) {
+    flush();
+  } else if (!flushTimer) {
+    flushTimer = setTimeout(() => flush(), FLUSH_INTERVAL_MS);
   }
 };
+
+export const trackPageView = () => {
+  enqueue({
+    event_type: 'page_view',
+    event_data: {
+      page: window.location.pathname,
+      timestamp: new Date().toISOString()
+    }
+  });
+};
+
+export const trackAddToCart = (productId: string, productName: string) => {
+  enqueue({
+    event_type: 'add_to_cart',
+    event_data: {
+      product_id: productId,
+      product_name: productName,
+      timestamp: new Date().toISOString()
+    }
+  });
+};